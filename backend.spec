@@ -8,7 +8,7 @@
 block_cipher = None
 
 a = Analysis(
-    ['backend/app.py'],
+    ['backend/serve.py'],
     pathex=[],
     binaries=[],
     datas=[],
@@ -16,6 +16,11 @@ a = Analysis(
         'flask',
         'flask_cors',
         'notion_client',
+        'waitress',
+        'app',
+        'routes.config_routes',
+        'routes.chat_routes',
+        'routes.history_routes',
         'sqlite3',
         'json',
         'contextlib'
@@ -6,6 +6,7 @@ from flask_cors import CORS
 from db import init_db
 from routes.config_routes import config_bp
 from routes.chat_routes import chat_bp
+from routes.history_routes import history_bp
 
 app = Flask(__name__)
 CORS(app)
@@ -16,6 +17,7 @@ init_db()
 # Enregistrer les blueprints
 app.register_blueprint(config_bp)
 app.register_blueprint(chat_bp)
+app.register_blueprint(history_bp)
 
 
 @app.route('/api/health', methods=['GET'])
@@ -25,6 +27,19 @@ def health_check():
 
 
 if __name__ == '__main__':
-    # WARNING: debug=True is for development only!
-    # In production, set debug=False and use a production WSGI server like Gunicorn
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        # Serveur de production (waitress) : python app.py serve --threads 8 ...
+        from serve import main
+        main(sys.argv[2:], app)
+    else:
+        import os
+        from services.outbox import start_outbox_drainer
+
+        # Avec le reloader, seul le processus enfant (WERKZEUG_RUN_MAIN) livre l'outbox
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_outbox_drainer()
+        # WARNING: debug=True is for development only!
+        # In production, use `python app.py serve` (waitress WSGI server)
+        app.run(debug=True, host='0.0.0.0', port=5000)
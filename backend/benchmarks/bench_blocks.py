@@ -0,0 +1,90 @@
+"""
+Benchmark de la représentation des blocs
+
+Compare, pour un chat généré de N lignes (paragraphes, listes, titres, code) :
+- blocs compacts (TextBlock, sérialisés directement en octets JSON) ;
+- dicts Notion imbriqués (représentation historique, via to_dict).
+
+Pour chaque représentation : mémoire retenue par la liste de blocs, pic
+mémoire (tracemalloc) jusqu'à la fin de la planification des lots, et débit
+parsing + planification. La variante dicts passe par to_dict : son pic et sa
+durée incluent la conversion, la mémoire retenue est celle des seuls dicts.
+
+Usage (depuis backend/) :
+    python benchmarks/bench_blocks.py [--lines 10000] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers.content_parser import parse_content_to_notion_blocks  # noqa: E402
+from services.batch_planner import plan_block_batches  # noqa: E402
+
+
+def generate_chat(lines):
+    """Génère un chat représentatif (majorité de paragraphes)"""
+    out = []
+    for i in range(lines):
+        kind = i % 20
+        if kind == 0:
+            out.append(f"## Section {i}")
+        elif kind in (1, 2):
+            out.append(f"- point {i} de la liste")
+        elif kind == 3:
+            out.append(f"```python\nprint({i})\n```")
+        else:
+            out.append(f"Ligne {i} : un paragraphe de conversation d'une longueur moyenne, é à ü.")
+    return "\n".join(out)
+
+
+def compact_blocks(content):
+    return parse_content_to_notion_blocks(content)
+
+
+def dict_blocks(content):
+    return [block if isinstance(block, dict) else block.to_dict()
+            for block in parse_content_to_notion_blocks(content)]
+
+
+def measure(build, content, runs):
+    """Retourne (mémoire retenue, pic mémoire en octets, durées en secondes)"""
+    tracemalloc.start()
+    blocks = build(content)
+    retained = tracemalloc.get_traced_memory()[0]
+    plan_block_batches(blocks)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del blocks
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        plan_block_batches(build(content))
+        timings.append(time.perf_counter() - start)
+    return retained, peak, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    content = generate_chat(args.lines)
+    blocks_count = len(compact_blocks(content))
+    print(f"Chat de {args.lines} lignes, {blocks_count} blocs")
+    print(f"{'représentation':<16} {'retenue':>10} {'pic':>10} {'médiane':>10} {'blocs/s':>10}")
+    for name, build in (('compacte', compact_blocks), ('dicts', dict_blocks)):
+        retained, peak, timings = measure(build, content, args.runs)
+        median = statistics.median(timings)
+        print(f"{name:<16} {retained / 1024 / 1024:>7.1f} Mo {peak / 1024 / 1024:>7.1f} Mo "
+              f"{median * 1000:>7.0f} ms {blocks_count / median:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
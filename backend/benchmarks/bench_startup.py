@@ -0,0 +1,112 @@
+"""
+Benchmark du démarrage du backend
+
+Mesure :
+- le profil d'import de l'application (`python -X importtime -c "import app"`),
+  avec les modules les plus coûteux en temps cumulé ;
+- le temps jusqu'à ce que `/api/health` réponde (time-to-healthy) pour le
+  serveur de production (`python serve.py`).
+
+Usage (depuis backend/) :
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(db_path):
+    env = dict(os.environ)
+    env['DB_PATH'] = db_path
+    return env
+
+
+def parse_importtime(stderr):
+    """
+    Parse la sortie de -X importtime
+
+    Returns:
+        list: Tuples (module, self_us, cumulative_us)
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_part, cumulative_part, module = line[len('import time:'):].split('|', 2)
+        entries.append((module.strip(), int(self_part), int(cumulative_part)))
+    return entries
+
+
+def profile_imports(db_path):
+    """Profile l'import de l'application"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BACKEND_DIR, env=_env(db_path), capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_to_healthy(db_path, timeout=30):
+    """Lance serve.py et mesure le délai jusqu'à la première réponse de /api/health"""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'serve.py', '--port', str(port)],
+        cwd=BACKEND_DIR, env=_env(db_path), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("Le serveur n'a pas répondu à /api/health")
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+
+        entries = profile_imports(db_path)
+        total = next((cumulative for module, _, cumulative in entries if module == 'app'), 0)
+        print(f"Import de app : {total / 1000:.1f} ms (cumulé)")
+        print(f"{'module':<45} {'self ms':>9} {'cumul ms':>9}")
+        for module, self_us, cumulative_us in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+            print(f"{module:<45} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+
+        heavy = [m for m in ('notion_client', 'httpx', 'parsers.content_parser') if any(e[0] == m for e in entries)]
+        print(f"Modules lourds importés au démarrage : {', '.join(heavy) if heavy else 'aucun'}")
+
+        timings = [time_to_healthy(db_path) for _ in range(args.runs)]
+        print(f"Time-to-healthy (serve.py, {args.runs} runs) : "
+              f"médiane {statistics.median(timings) * 1000:.0f} ms, "
+              f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Ligne de commande de Chat to Notion : import en masse de transcriptions
+
+Usage (depuis la racine du dépôt ou depuis backend/) :
+    python -m backend.cli import <dossier|fichier|motif glob> [--workers 4] [--state FICHIER]
+    python backend/cli.py import "exports/**/*.md"
+
+Chaque fichier est envoyé comme une conversation (une page) avec la
+configuration enregistrée, directement par la couche service (sans Flask ni
+HTTP). Les fichiers sont parcourus au fil de l'eau (os.scandir, glob.iglob)
+et envoyés par un pool de workers borné, dans la file « bulk » du limiteur de
+débit. Les fichiers importés sont ajoutés au fichier d'état (JSON Lines) :
+une relance ignore ceux déjà importés. Un résumé (débit, échecs) termine
+l'import ; le code de sortie est 1 si un fichier a échoué.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+# Les modules du backend s'importent à plat (from db import ...)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db import init_db, get_config  # noqa: E402
+from services.rate_limiter import PRIORITY_BULK  # noqa: E402
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_EXTENSIONS = '.md,.txt'
+DEFAULT_STATE_FILE = '.chat-import-state.jsonl'
+
+
+def iter_source_files(source, extensions):
+    """
+    Itère (sans tout lister d'avance) les fichiers d'un dossier (récursivement),
+    d'un motif glob ou un fichier seul
+    """
+    if os.path.isdir(source):
+        yield from _walk(source, extensions)
+    elif glob.has_magic(source):
+        for path in glob.iglob(source, recursive=True):
+            if os.path.isfile(path):
+                yield path
+    elif os.path.isfile(source):
+        yield source
+
+
+def _walk(directory, extensions):
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            subdirectories = []
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+                    yield entry.path
+            stack.extend(reversed(subdirectories))
+
+
+def load_imported(state_path):
+    """Chemins déjà importés d'après le fichier d'état"""
+    imported = set()
+    if not os.path.exists(state_path):
+        return imported
+    with open(state_path, encoding='utf-8') as state_file:
+        for line in state_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Ligne tronquée par un arrêt brutal
+            if record.get('status') == 'sent':
+                imported.add(record['path'])
+    return imported
+
+
+def import_file(path, date=None):
+    """
+    Envoie un fichier de transcription à Notion
+
+    Returns:
+        tuple: (id de la page créée, taille en octets)
+    """
+    from services.outbox import deliver_chat
+
+    with open(path, encoding='utf-8', errors='replace') as transcript:
+        content = transcript.read()
+    if not content.strip():
+        raise ValueError("fichier vide")
+    if date is None:
+        date = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d')
+    page_id = deliver_chat(
+        {"content": content, "date": date},
+        priority=PRIORITY_BULK,
+        image_base_dir=os.path.dirname(path)
+    )
+    return page_id, len(content.encode('utf-8'))
+
+
+def run_import(source, workers=DEFAULT_WORKERS, state_path=DEFAULT_STATE_FILE,
+               extensions=DEFAULT_EXTENSIONS, date=None, out=sys.stdout):
+    """
+    Importe les fichiers de `source` et affiche la progression puis le résumé
+
+    Returns:
+        dict: Compteurs (sent, skipped, failed, bytes, seconds)
+    """
+    from services.chat_history import flush_history
+
+    extensions = {ext if ext.startswith('.') else f'.{ext}' for ext in extensions.lower().split(',') if ext}
+    imported = load_imported(state_path)
+    stats = {"sent": 0, "skipped": 0, "failed": 0, "bytes": 0}
+    state_lock = threading.Lock()
+    started_at = time.monotonic()
+
+    def record(path, status, **fields):
+        with state_lock:
+            stats[status] += 1
+            done = stats['sent'] + stats['failed']
+            with open(state_path, 'a', encoding='utf-8') as state_file:
+                state_file.write(json.dumps({"path": path, "status": status, **fields}, ensure_ascii=False) + '\n')
+            if status == 'sent':
+                stats['bytes'] += fields['bytes']
+                print(f"[{done}] {path} -> {fields['pageId']}", file=out, flush=True)
+            else:
+                print(f"[{done}] ÉCHEC {path} : {fields['error']}", file=out, flush=True)
+
+    def process(path):
+        try:
+            page_id, size = import_file(path, date)
+        except Exception as e:
+            # Page tronquée : son id permet de la compléter ou de la supprimer
+            page = {"pageId": e.page_id} if getattr(e, 'page_id', None) else {}
+            record(path, 'failed', error=str(e), **page)
+        else:
+            record(path, 'sent', pageId=page_id, bytes=size)
+
+    # Au plus 2 fichiers en attente par worker : le parcours avance au rythme des envois
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for path in iter_source_files(source, extensions):
+            path = os.path.abspath(path)
+            if path in imported:
+                stats['skipped'] += 1
+                continue
+            if len(in_flight) >= workers * 2:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight.add(executor.submit(process, path))
+        wait(in_flight)
+
+    flush_history()
+    stats['seconds'] = time.monotonic() - started_at
+    print_summary(stats, out)
+    return stats
+
+
+def print_summary(stats, out=sys.stdout):
+    """Affiche le résumé d'un import"""
+    seconds = max(stats['seconds'], 1e-9)
+    print(
+        f"{stats['sent']} importé(s), {stats['skipped']} déjà importé(s), {stats['failed']} en échec "
+        f"en {stats['seconds']:.1f} s ({stats['sent'] / seconds:.2f} fichiers/s, "
+        f"{stats['bytes'] / 1024 / seconds:.1f} Ko/s)",
+        file=out
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='cli', description="Chat to Notion en ligne de commande")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="Importe un dossier de transcriptions (une page par fichier)")
+    import_parser.add_argument('source', help="Dossier (parcouru récursivement), fichier ou motif glob")
+    import_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Envois simultanés")
+    import_parser.add_argument('--state', default=DEFAULT_STATE_FILE,
+                               help="Fichier d'état pour la reprise (JSON Lines)")
+    import_parser.add_argument('--ext', default=DEFAULT_EXTENSIONS,
+                               help="Extensions retenues dans un dossier (séparées par des virgules)")
+    import_parser.add_argument('--date', help="Date des pages (YYYY-MM-DD), par défaut la date de modification du fichier")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers doit être au moins 1")
+    init_db()
+    if get_config() is None:
+        print("Notion n'est pas configuré. Enregistrez la configuration depuis l'application.", file=sys.stderr)
+        return 2
+
+    stats = run_import(args.source, args.workers, args.state, args.ext, args.date)
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
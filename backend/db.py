@@ -1,6 +1,11 @@
 import sqlite3
 import os
 import json
+import copy
+import queue
+import threading
+import uuid
+from concurrent.futures import Future
 from contextlib import contextmanager
 
 # Chemin vers la base de données SQLite
@@ -8,6 +13,31 @@ from contextlib import contextmanager
 # Otherwise, use the default path in the backend directory
 DB_PATH = os.environ.get('DB_PATH', os.path.join(os.path.dirname(__file__), 'notion_config.db'))
 
+# Cache mémoire de la configuration : l'application est seule à écrire dans
+# notion_config, chaque save_config incrémente la version et vide le cache.
+# L'époque distingue les versions de deux lancements successifs.
+_config_cache = {}
+_config_lock = threading.Lock()
+_config_epoch = uuid.uuid4().hex[:8]
+_config_version = 0
+
+# Accès concurrent (serveur multi-thread) : les connexions sont réutilisées
+# (pool, avec leur cache de requêtes préparées), en journal WAL (les lectures
+# ne sont pas bloquées par une écriture) avec un busy_timeout. Les écritures
+# passent par un unique thread qui regroupe celles en attente dans une seule
+# transaction (voir run_write).
+DB_POOL_SIZE = 8
+DB_BUSY_TIMEOUT_MS = 5000
+DB_STATEMENT_CACHE_SIZE = 256
+DB_WRITE_BATCH_SIZE = 64
+# Attente maximale (s) du résultat d'une écriture
+DB_WRITE_TIMEOUT = 30
+
+_pool = queue.LifoQueue()
+_writes = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
 def init_db():
     """Initialise la base de données SQLite et crée la table si elle n'existe pas"""
     with get_db_connection() as conn:
@@ -41,21 +71,197 @@ def init_db():
             cursor.execute('ALTER TABLE notion_config ADD COLUMN dynamic_fields TEXT')
         except sqlite3.OperationalError:
             pass  # La colonne existe déjà
+        try:
+            cursor.execute('ALTER TABLE notion_config ADD COLUMN parser_rules TEXT')
+        except sqlite3.OperationalError:
+            pass  # La colonne existe déjà
+        # Outbox : chats acceptés en attente d'envoi vers Notion
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                notion_page_id TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_outbox_status ON chat_outbox (status, id)')
+        # Historique des chats envoyés
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sent_chats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                page_id TEXT,
+                database_id TEXT NOT NULL,
+                title TEXT,
+                date TEXT,
+                blocks_count INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                duration_ms INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sent_chats_date ON sent_chats (date, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sent_chats_database ON sent_chats (database_id, id)')
+        # Index plein texte des chats envoyés (optionnel : nécessite FTS5)
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS chat_search USING fts5(
+                    title, content, date UNINDEXED, page_id UNINDEXED, database_id UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            pass  # SQLite compilé sans FTS5 : la recherche est désactivée
         conn.commit()
 
+def _connect():
+    """Ouvre une connexion configurée pour l'accès concurrent"""
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE_SIZE
+    )
+    conn.row_factory = sqlite3.Row  # Permet d'accéder aux colonnes par nom
+    conn.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
 @contextmanager
 def get_db_connection():
-    """Context manager pour gérer les connexions à la base de données"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Permet d'accéder aux colonnes par nom
+    """
+    Context manager prêtant une connexion du pool
+
+    La connexion est rendue au pool en fin de bloc (une transaction non
+    validée est annulée) ; au-delà de DB_POOL_SIZE connexions libres, elle
+    est fermée.
+    """
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
     try:
         yield conn
     finally:
-        conn.close()
+        if conn.in_transaction:
+            conn.rollback()
+        if _pool.qsize() < DB_POOL_SIZE:
+            _pool.put(conn)
+        else:
+            conn.close()
+
+def close_db_connections():
+    """Arrête le thread d'écriture (après les écritures en attente) et ferme les connexions libres du pool"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        _writes.put(None)
+        writer.join()
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+def run_write(operation):
+    """
+    Exécute `operation(conn)` dans le thread d'écriture et retourne son résultat
+
+    Les écritures en attente sont regroupées (DB_WRITE_BATCH_SIZE au plus) dans
+    une seule transaction ; chacune est isolée par un savepoint, si bien
+    qu'une opération en échec (exception relancée ici) n'annule pas les
+    autres. `operation` ne doit pas appeler commit.
+    """
+    _start_db_writer()
+    future = Future()
+    _writes.put((operation, future))
+    return future.result(timeout=DB_WRITE_TIMEOUT)
+
+def _start_db_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run_db_writer, name='db-writer', daemon=True)
+            _writer.start()
+
+def _run_db_writer():
+    global _writer
+    conn = None
+    try:
+        conn = _connect()
+        stopping = False
+        while not stopping:
+            batch = [_writes.get()]
+            while len(batch) < DB_WRITE_BATCH_SIZE:
+                try:
+                    batch.append(_writes.get_nowait())
+                except queue.Empty:
+                    break
+            # None : arrêt demandé par close_db_connections
+            stopping = None in batch
+            batch = [write for write in batch if write is not None]
+            if batch:
+                _write_batch(conn, batch)
+    except Exception as e:
+        # Connexion impossible (chemin, droits...) : le prochain run_write relance un thread
+        print(f"Erreur du thread d'écriture SQLite : {str(e)}")
+        with _writer_lock:
+            if _writer is threading.current_thread():
+                _writer = None
+        _fail_pending_writes(e)
+    finally:
+        if conn is not None:
+            conn.close()
+
+def _fail_pending_writes(error):
+    """Fait échouer les écritures en attente (leur appelant relève l'erreur)"""
+    while True:
+        try:
+            write = _writes.get_nowait()
+        except queue.Empty:
+            return
+        if write is not None:
+            write[1].set_exception(error)
+
+def _write_batch(conn, batch):
+    """Exécute un lot d'écritures dans une transaction, puis publie les résultats"""
+    outcomes = []
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        for operation, future in batch:
+            conn.execute('SAVEPOINT write')
+            try:
+                outcomes.append((future, operation(conn), None))
+                conn.execute('RELEASE write')
+            except Exception as e:
+                conn.execute('ROLLBACK TO write')
+                conn.execute('RELEASE write')
+                outcomes.append((future, None, e))
+        conn.commit()
+    except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
+        for _, future in batch:
+            future.set_exception(e)
+        return
+
+    for future, result, error in outcomes:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
 
-def save_config(api_key, database_id, title_property=None, date_property=None, additional_properties=None, dynamic_fields=None):
+def save_config(api_key, database_id, title_property=None, date_property=None, additional_properties=None, dynamic_fields=None,
+                parser_rules=None):
     """Sauvegarde ou met à jour la configuration Notion"""
-    with get_db_connection() as conn:
+    def write(conn):
         cursor = conn.cursor()
         
         # Convertir additional_properties en JSON si c'est un dict
@@ -68,8 +274,13 @@ def save_config(api_key, database_id, title_property=None, date_property=None, a
         if dynamic_fields:
             dynamic_fields_json = json.dumps(dynamic_fields)
         
+        # Règles de parsing actives, dans l'ordre (liste de noms)
+        parser_rules_json = None
+        if parser_rules is not None:
+            parser_rules_json = json.dumps(parser_rules)
+        
         # Vérifier si une configuration existe déjà pour cette database_id
-        cursor.execute('SELECT id, dynamic_fields, additional_properties FROM notion_config WHERE database_id = ? LIMIT 1', (database_id,))
+        cursor.execute('SELECT id, dynamic_fields, additional_properties, parser_rules FROM notion_config WHERE database_id = ? LIMIT 1', (database_id,))
         existing = cursor.fetchone()
         
         if existing:
@@ -81,26 +292,56 @@ def save_config(api_key, database_id, title_property=None, date_property=None, a
             if additional_properties_json is None and existing['additional_properties']:
                 additional_properties_json = existing['additional_properties']
             
+            # Si parser_rules n'est pas fourni, conserver la valeur existante
+            if parser_rules_json is None:
+                parser_rules_json = existing['parser_rules']
+            
             # Mettre à jour la configuration existante
             cursor.execute('''
                 UPDATE notion_config 
-                SET api_key = ?, database_id = ?, title_property = ?, date_property = ?, additional_properties = ?, dynamic_fields = ?, updated_at = CURRENT_TIMESTAMP
+                SET api_key = ?, database_id = ?, title_property = ?, date_property = ?, additional_properties = ?, dynamic_fields = ?, parser_rules = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
-            ''', (api_key, database_id, title_property, date_property, additional_properties_json, dynamic_fields_json, existing['id']))
+            ''', (api_key, database_id, title_property, date_property, additional_properties_json, dynamic_fields_json, parser_rules_json, existing['id']))
         else:
             # Créer une nouvelle configuration
             cursor.execute('''
-                INSERT INTO notion_config (api_key, database_id, title_property, date_property, additional_properties, dynamic_fields)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (api_key, database_id, title_property, date_property, additional_properties_json, dynamic_fields_json))
-        
-        conn.commit()
+                INSERT INTO notion_config (api_key, database_id, title_property, date_property, additional_properties, dynamic_fields, parser_rules)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (api_key, database_id, title_property, date_property, additional_properties_json, dynamic_fields_json, parser_rules_json))
+    
+    run_write(write)
+    invalidate_config_cache()
+
+def get_config_version():
+    """Version de la configuration (change à chaque sauvegarde), sans accès à SQLite"""
+    return f"{_config_epoch}-{_config_version}"
+
+def invalidate_config_cache():
+    """Oublie la configuration en cache (à appeler après une écriture directe dans la table)"""
+    global _config_version
+    with _config_lock:
+        _config_version += 1
+        _config_cache.clear()
 
 def get_config():
-    """Récupère la configuration Notion"""
+    """Récupère la configuration Notion (depuis le cache mémoire si possible)"""
+    with _config_lock:
+        if 'config' in _config_cache:
+            return copy.deepcopy(_config_cache['config'])
+        version = _config_version
+
+    config = _load_config()
+    with _config_lock:
+        # Ne pas mettre en cache une lecture concurrente d'une sauvegarde
+        if version == _config_version:
+            _config_cache['config'] = config
+    return copy.deepcopy(config)
+
+def _load_config():
+    """Lit la configuration Notion dans SQLite"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT api_key, database_id, title_property, date_property, additional_properties, dynamic_fields FROM notion_config LIMIT 1')
+        cursor.execute('SELECT api_key, database_id, title_property, date_property, additional_properties, dynamic_fields, parser_rules FROM notion_config LIMIT 1')
         row = cursor.fetchone()
         
         if row:
@@ -118,13 +359,21 @@ def get_config():
                 except json.JSONDecodeError:
                     dynamic_fields = []
             
+            parser_rules = None
+            if row['parser_rules']:
+                try:
+                    parser_rules = json.loads(row['parser_rules'])
+                except json.JSONDecodeError:
+                    parser_rules = None
+            
             return {
                 'api_key': row['api_key'],
                 'database_id': row['database_id'],
                 'title_property': row['title_property'],
                 'date_property': row['date_property'],
                 'additional_properties': additional_properties or {},
-                'dynamic_fields': dynamic_fields or []
+                'dynamic_fields': dynamic_fields or [],
+                'parser_rules': parser_rules
             }
         return None
 
@@ -133,3 +382,134 @@ def has_config():
     config = get_config()
     return config is not None
 
+
+def add_outbox_entry(payload):
+    """Ajoute un chat à l'outbox et retourne son id"""
+    payload_json = json.dumps(payload)
+    return run_write(
+        lambda conn: conn.execute('INSERT INTO chat_outbox (payload) VALUES (?)', (payload_json,)).lastrowid
+    )
+
+def _outbox_entry(row):
+    if row is None:
+        return None
+    entry = dict(row)
+    entry['payload'] = json.loads(entry['payload'])
+    return entry
+
+def get_outbox_entry(entry_id):
+    """Récupère une entrée de l'outbox par son id"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM chat_outbox WHERE id = ?', (entry_id,))
+        return _outbox_entry(cursor.fetchone())
+
+def get_next_outbox_entry():
+    """Récupère l'entrée en attente la plus ancienne (ordre d'acceptation)"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM chat_outbox WHERE status = 'pending' ORDER BY id LIMIT 1")
+        return _outbox_entry(cursor.fetchone())
+
+def update_outbox_entry(entry_id, status, attempts, next_attempt_at=0, last_error=None, notion_page_id=None):
+    """Enregistre le résultat d'une tentative d'envoi"""
+    run_write(lambda conn: conn.execute('''
+        UPDATE chat_outbox
+        SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, notion_page_id = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (status, attempts, next_attempt_at, last_error, notion_page_id, entry_id)))
+
+def count_pending_outbox_entries():
+    """Nombre d'entrées de l'outbox en attente d'envoi"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM chat_outbox WHERE status = 'pending'")
+        return cursor.fetchone()[0]
+
+def has_chat_search():
+    """Indique si l'index plein texte des chats (FTS5) est disponible"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_search'")
+        return cursor.fetchone() is not None
+
+def insert_sent_chats(chats, index_content=False):
+    """
+    Enregistre des chats envoyés dans l'historique, en une seule transaction
+
+    Args:
+        chats: Liste de dicts (page_id, database_id, title, date, blocks_count,
+            bytes, duration_ms, status, content)
+        index_content: Ajouter aussi les chats à l'index plein texte (FTS5)
+    """
+    def write(conn):
+        conn.executemany('''
+            INSERT INTO sent_chats (page_id, database_id, title, date, blocks_count, bytes, duration_ms, status)
+            VALUES (:page_id, :database_id, :title, :date, :blocks_count, :bytes, :duration_ms, :status)
+        ''', chats)
+        if index_content:
+            conn.executemany('''
+                INSERT INTO chat_search (title, content, date, page_id, database_id)
+                VALUES (:title, :content, :date, :page_id, :database_id)
+            ''', [chat for chat in chats if chat['page_id']])
+    
+    run_write(write)
+
+def _sent_chats_filters(database_id, date_from, date_to):
+    """Conditions SQL (et paramètres) des filtres de l'historique"""
+    conditions = []
+    params = []
+    if database_id:
+        conditions.append('database_id = ?')
+        params.append(database_id)
+    if date_from:
+        conditions.append('date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('date <= ?')
+        params.append(date_to)
+    return conditions, params
+
+def list_sent_chats(limit, before_id=None, database_id=None, date_from=None, date_to=None):
+    """
+    Liste les chats envoyés du plus récent au plus ancien (pagination par clé :
+    `before_id` est l'id du dernier chat de la page précédente)
+    """
+    conditions, params = _sent_chats_filters(database_id, date_from, date_to)
+    if before_id is not None:
+        conditions.append('id < ?')
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT * FROM sent_chats {where} ORDER BY id DESC LIMIT ?', (*params, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+def get_sent_chats_stats(date_from=None, date_to=None, database_id=None):
+    """Agrégats par date (nombre de chats, blocs, octets, durée) de l'historique"""
+    conditions, params = _sent_chats_filters(database_id, date_from, date_to)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT date, COUNT(*) AS chats, SUM(status = 'sent') AS sent,
+                   SUM(blocks_count) AS blocks_count, SUM(bytes) AS bytes, SUM(duration_ms) AS duration_ms
+            FROM sent_chats {where}
+            GROUP BY date
+            ORDER BY date DESC
+        ''', params)
+        return [dict(row) for row in cursor.fetchall()]
+
+def search_sent_chats(match_query, limit=20):
+    """Recherche dans l'index plein texte (requête FTS5), par pertinence"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT page_id, database_id, title, date,
+                   snippet(chat_search, 1, '[', ']', '…', 12) AS snippet
+            FROM chat_search
+            WHERE chat_search MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ''', (match_query, limit))
+        return [dict(row) for row in cursor.fetchall()]
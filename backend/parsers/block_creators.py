@@ -1,77 +1,138 @@
 """
 Créateurs de blocs Notion spécifiques
 """
+import json
 from .chunk_splitter import split_content_into_chunks
+from .block_types import TextBlock
+from .code_languages import normalize_code_language, detect_code_language
 
 
-def create_code_blocks(code_content_list, language):
-    """Crée des blocs de code Notion"""
+MAX_RICH_TEXT_LENGTH = 2000
+MAX_CODE_SEGMENTS = 100
+# Nombre maximal d'enfants d'un bloc (lignes d'un tableau, sous-éléments d'une liste)
+MAX_CHILDREN = 100
+# Taille maximale du rich_text sérialisé d'un bloc de code (échappement JSON
+# compris : guillemets, antislashs et caractères de contrôle peuvent doubler,
+# voire sextupler, la taille du texte) : un bloc doit tenir dans un lot
+# (MAX_PAYLOAD_BYTES)
+MAX_CODE_BLOCK_BYTES = 220_000
+# Enveloppe JSON d'un segment : {"type":"text","text":{"content":...}},
+RICH_TEXT_SEGMENT_OVERHEAD = 36
+
+
+def create_code_blocks(code_content_list, language, detect_language=True):
+    """
+    Crée des blocs de code Notion
+
+    Le contenu est découpé une seule fois en segments de 2000 caractères,
+    regroupés par 100 (rich_text) dans un même bloc. Le langage du fence est
+    normalisé vers la liste Notion ; absent ou inconnu, il est détecté
+    (detect_language) ou vaut « plain text ».
+    """
     code_content = '\n'.join(code_content_list)
     if not code_content:
         return []
-    
-    code_chunks = split_content_into_chunks(code_content, max_length=2000)
-    blocks = []
-    for idx, chunk in enumerate(code_chunks):
-        blocks.append({
-            "object": "block",
-            "type": "code",
-            "code": {
-                "rich_text": [{
-                    "type": "text",
-                    "text": {"content": chunk}
-                }],
-                "language": language if language else "plain text",
-                "caption": [{"type": "text", "text": {"content": f"Partie {idx + 1}"}}] if len(code_chunks) > 1 else []
-            }
-        })
-    return blocks
+
+    language = normalize_code_language(language)
+    if language is None and detect_language:
+        language = detect_code_language(code_content)
+    language = language or "plain text"
+    return [TextBlock("code", segments, language=language) for segments in _pack_segments(code_content)]
+
+
+def _pack_segments(content):
+    """
+    Découpe le contenu en segments de 2000 caractères, regroupés par bloc
+    (MAX_CODE_SEGMENTS segments, MAX_CODE_BLOCK_BYTES octets sérialisés au plus)
+    """
+    segments = []
+    segments_bytes = 0
+    for segment in split_content_into_chunks(content, max_length=MAX_RICH_TEXT_LENGTH):
+        size = len(json.dumps(segment, ensure_ascii=False).encode('utf-8')) + RICH_TEXT_SEGMENT_OVERHEAD
+        if segments and (len(segments) >= MAX_CODE_SEGMENTS or segments_bytes + size > MAX_CODE_BLOCK_BYTES):
+            yield tuple(segments)
+            segments = []
+            segments_bytes = 0
+        segments.append(segment)
+        segments_bytes += size
+    yield segments[0] if len(segments) == 1 else tuple(segments)
+
+
+def _rich_text(text):
+    """rich_text Notion d'un texte, découpé en segments de 2000 caractères"""
+    if not text:
+        return []
+    return [
+        {"type": "text", "text": {"content": chunk}}
+        for chunk in split_content_into_chunks(text, max_length=MAX_RICH_TEXT_LENGTH)
+    ]
 
 
 def create_paragraph_blocks(line):
     """Crée des blocs paragraphe"""
     stripped = line.strip()
     if not stripped:
-        return [{
-            "object": "block",
-            "type": "paragraph",
-            "paragraph": {
-                "rich_text": []
-            }
-        }]
+        return [TextBlock("paragraph")]
     
     paragraph_chunks = split_content_into_chunks(line, max_length=2000)
-    blocks = []
-    for chunk in paragraph_chunks:
-        blocks.append({
-            "object": "block",
-            "type": "paragraph",
-            "paragraph": {
-                "rich_text": [{
-                    "type": "text",
-                    "text": {"content": chunk}
-                }]
-            }
-        })
-    return blocks
+    return [TextBlock("paragraph", chunk) for chunk in paragraph_chunks]
 
 
 def create_list_item_blocks(item_text, list_type="bulleted"):
     """Crée des blocs de liste (bulleted ou numbered)"""
     item_chunks = split_content_into_chunks(item_text, max_length=2000)
-    blocks = []
     block_type = f"{list_type}_list_item"
-    
-    for chunk in item_chunks:
-        blocks.append({
+    return [TextBlock(block_type, chunk) for chunk in item_chunks]
+
+
+
+def create_todo_blocks(item_text, checked=False):
+    """Crée des blocs case à cocher (to_do)"""
+    return [
+        {"object": "block", "type": "to_do", "to_do": {"rich_text": _rich_text(chunk), "checked": checked}}
+        for chunk in split_content_into_chunks(item_text, max_length=MAX_RICH_TEXT_LENGTH)
+    ]
+
+
+def create_quote_blocks(quote_lines):
+    """Crée des blocs citation (les lignes d'une même citation forment un seul bloc)"""
+    quote_content = '\n'.join(quote_lines).strip('\n')
+    if not quote_content:
+        return []
+    return [TextBlock("quote", segments) for segments in _pack_segments(quote_content)]
+
+
+def create_divider_block():
+    """Crée un bloc séparateur"""
+    return {"object": "block", "type": "divider", "divider": {}}
+
+
+def create_table_blocks(header, rows):
+    """
+    Crée des blocs tableau (table et ses lignes table_row)
+
+    Notion limite un bloc à MAX_CHILDREN enfants : un tableau plus long est
+    réparti en plusieurs tableaux qui reprennent chacun la ligne d'en-tête.
+    """
+    width = len(header)
+
+    def table_row(cells):
+        cells = (list(cells) + [''] * width)[:width]
+        return {"object": "block", "type": "table_row", "table_row": {"cells": [_rich_text(cell) for cell in cells]}}
+
+    header_row = table_row(header)
+    body_rows = [table_row(row) for row in rows]
+    rows_per_table = MAX_CHILDREN - 1
+    return [
+        {
             "object": "block",
-            "type": block_type,
-            block_type: {
-                "rich_text": [{
-                    "type": "text",
-                    "text": {"content": chunk}
-                }]
+            "type": "table",
+            "table": {
+                "table_width": width,
+                "has_column_header": True,
+                "has_row_header": False,
+                "children": [header_row] + body_rows[start:start + rows_per_table]
             }
-        })
-    return blocks
-
+        }
+        for start in range(0, max(len(body_rows), 1), rows_per_table)
+    ]
@@ -0,0 +1,72 @@
+"""
+Représentation compacte des blocs texte Notion
+
+Un paragraphe Notion sous forme de dict imbriqué alloue une demi-douzaine de
+petits dicts et listes ; un TextBlock ne conserve que le type, le texte et
+la langue (blocs de code), et se sérialise directement en octets JSON lors
+de la construction des lots (voir services/batch_planner.py). Le JSON produit
+est identique à celui du dict équivalent (to_dict).
+
+Le texte d'un bloc de code peut être un tuple de segments : chacun devient un
+élément rich_text (2000 caractères au plus, 100 éléments par bloc).
+"""
+import json
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+class TextBlock:
+    """Bloc texte (paragraphe, titre, élément de liste, code)"""
+
+    __slots__ = ('type', 'text', 'language')
+
+    def __init__(self, block_type, text=None, language=None):
+        self.type = block_type
+        self.text = text
+        self.language = language
+
+    def _segments(self):
+        if self.text is None:
+            return ()
+        if isinstance(self.text, str):
+            return (self.text,)
+        return self.text
+
+    def _rich_text(self):
+        return [{"type": "text", "text": {"content": segment}} for segment in self._segments()]
+
+    def to_dict(self):
+        """Retourne le bloc sous forme de dict Notion"""
+        content = {"rich_text": self._rich_text()}
+        if self.type == 'code':
+            content["language"] = self.language
+            content["caption"] = []
+        return {"object": "block", "type": self.type, self.type: content}
+
+    def to_json(self):
+        """Sérialise le bloc en JSON compact (octets UTF-8), sans dict intermédiaire"""
+        parts = [b'{"object":"block","type":"', self.type.encode(), b'","', self.type.encode(), b'":{"rich_text":']
+        parts.append(self._rich_text_json())
+        if self.type == 'code':
+            parts.append(b',"language":')
+            parts.append(_dumps(self.language))
+            parts.append(b',"caption":[]')
+        parts.append(b'}}')
+        return b''.join(parts)
+
+    def _rich_text_json(self):
+        return b'[' + b','.join(
+            b'{"type":"text","text":{"content":' + _dumps(segment) + b'}}' for segment in self._segments()
+        ) + b']'
+
+    def __eq__(self, other):
+        if isinstance(other, TextBlock):
+            return (self.type, self._segments(), self.language) == (
+                other.type, other._segments(), other.language
+            )
+        return NotImplemented
+
+    def __repr__(self):
+        return f"TextBlock({self.type!r}, {self.text!r})"
@@ -5,6 +5,9 @@ from datetime import datetime
 import re
 
 
+SPEAKER_PREFIX_PATTERN = re.compile(r'^(User|Assistant|ChatGPT|AI)\s*:', re.IGNORECASE)
+
+
 def parse_chat(content, date=None):
     """
     Parse chat content and extract relevant information
@@ -33,3 +36,30 @@ def parse_chat(content, date=None):
         "content": content
     }
 
+
+
+def split_chat_turns(content):
+    """
+    Découpe une conversation en tours de parole
+
+    Un nouveau tour commence à chaque ligne préfixée par un locuteur
+    (User:, Assistant:, ChatGPT:, AI:). Le texte précédant le premier
+    préfixe est rattaché au premier tour.
+    """
+    turns = []
+    current_lines = []
+    current_role = None
+
+    for line in content.strip().split('\n'):
+        match = SPEAKER_PREFIX_PATTERN.match(line.strip())
+        if match and current_role is not None:
+            turns.append({"role": current_role, "content": '\n'.join(current_lines).strip()})
+            current_lines = []
+        if match:
+            current_role = match.group(1)
+        current_lines.append(line)
+
+    if current_lines and any(l.strip() for l in current_lines):
+        turns.append({"role": current_role, "content": '\n'.join(current_lines).strip()})
+
+    return turns
@@ -0,0 +1,96 @@
+"""
+Langages des blocs de code Notion
+
+Notion refuse un bloc de code dont le langage n'est pas dans sa liste (et
+avec lui tout le lot). Le langage d'un fence (```py, ```{.python}, ```js title=a)
+est donc normalisé par une table de correspondance précalculée ; s'il est
+absent ou inconnu, une détection heuristique peu coûteuse (premières lignes)
+est tentée, sinon le bloc est en « plain text ».
+"""
+import re
+
+
+NOTION_CODE_LANGUAGES = frozenset({
+    "abap", "agda", "arduino", "ascii art", "assembly", "bash", "basic", "bnf", "c", "c#", "c++",
+    "clojure", "coffeescript", "coq", "css", "dart", "dhall", "diff", "docker", "ebnf", "elixir",
+    "elm", "erlang", "f#", "flow", "fortran", "gherkin", "glsl", "go", "graphql", "groovy",
+    "haskell", "hcl", "html", "idris", "java", "javascript", "json", "julia", "kotlin", "latex",
+    "less", "lisp", "livescript", "llvm ir", "lua", "makefile", "markdown", "markup", "matlab",
+    "mathematica", "mermaid", "nix", "notion formula", "objective-c", "ocaml", "pascal", "perl",
+    "php", "plain text", "powershell", "prolog", "protobuf", "purescript", "python", "r",
+    "racket", "reason", "ruby", "rust", "sass", "scala", "scheme", "scss", "shell", "smalltalk",
+    "solidity", "sql", "swift", "toml", "typescript", "vb.net", "verilog", "vhdl",
+    "visual basic", "webassembly", "xml", "yaml", "java/c/c++/c#"
+})
+
+CODE_LANGUAGE_ALIASES = {
+    "sh": "bash", "zsh": "bash", "console": "shell", "shell-session": "shell", "terminal": "shell",
+    "bat": "shell", "cmd": "shell", "ps1": "powershell", "pwsh": "powershell", "ps": "powershell",
+    "py": "python", "py3": "python", "python3": "python", "ipython": "python", "pycon": "python",
+    "js": "javascript", "jsx": "javascript", "mjs": "javascript", "cjs": "javascript", "node": "javascript",
+    "ts": "typescript", "tsx": "typescript",
+    "rb": "ruby", "rs": "rust", "kt": "kotlin", "kts": "kotlin", "golang": "go",
+    "cs": "c#", "csharp": "c#", "cpp": "c++", "cc": "c++", "cxx": "c++", "hpp": "c++", "h": "c",
+    "objc": "objective-c", "objective c": "objective-c", "fsharp": "f#", "fs": "f#",
+    "vb": "visual basic", "vba": "visual basic", "vbnet": "vb.net",
+    "yml": "yaml", "json5": "json", "jsonc": "json", "jsonl": "json", "ndjson": "json",
+    "md": "markdown", "htm": "html", "xhtml": "html", "svg": "xml", "plist": "xml",
+    "dockerfile": "docker", "containerfile": "docker", "make": "makefile", "mk": "makefile",
+    "tf": "hcl", "terraform": "hcl", "proto": "protobuf", "gql": "graphql",
+    "tex": "latex", "wasm": "webassembly", "wat": "webassembly", "ml": "ocaml",
+    "hs": "haskell", "ex": "elixir", "exs": "elixir", "erl": "erlang", "clj": "clojure",
+    "cljs": "clojure", "jl": "julia", "pl": "perl", "coffee": "coffeescript", "patch": "diff",
+    "asm": "assembly", "nasm": "assembly", "sol": "solidity", "ll": "llvm ir", "llvm": "llvm ir",
+    "postgres": "sql", "postgresql": "sql", "mysql": "sql", "sqlite": "sql", "plsql": "sql",
+    "text": "plain text", "txt": "plain text", "plaintext": "plain text", "plain": "plain text",
+    "log": "plain text", "output": "plain text", "ini": "plain text", "cfg": "plain text"
+}
+
+# Table précalculée : toute forme acceptée (nom Notion ou alias) -> nom Notion
+_LANGUAGE_LOOKUP = {**{name: name for name in NOTION_CODE_LANGUAGES}, **CODE_LANGUAGE_ALIASES}
+
+# Heuristiques sur le début du code : (motif, langage), la première qui correspond l'emporte
+_DETECTION_SAMPLE_CHARS = 500
+_LANGUAGE_HEURISTICS = [
+    (re.compile(r'^#!.*\b(?:ba|z)?sh\b'), "bash"),
+    (re.compile(r'^#!.*\bpython'), "python"),
+    (re.compile(r'^#!.*\bnode\b'), "javascript"),
+    (re.compile(r'^diff --git |^--- \S.*\n\+\+\+ |^@@ -\d'), "diff"),
+    (re.compile(r'^<\?xml\b'), "xml"),
+    (re.compile(r'^<!doctype html|^<html\b', re.IGNORECASE), "html"),
+    (re.compile(r'^\s*[{\[]\s*("|\]|\}|$)'), "json"),
+    (re.compile(r'^(?:SELECT|INSERT INTO|UPDATE|DELETE FROM|CREATE TABLE|WITH)\b', re.IGNORECASE), "sql"),
+    (re.compile(r'^FROM \S+(?:\s+AS\s+\S+)?\s*$', re.MULTILINE), "docker"),
+    (re.compile(r'^package main\b|^func \w+\('), "go"),
+    (re.compile(r'^(?:fn |use std::|pub fn |impl )'), "rust"),
+    (re.compile(r'^#include\s*[<"]'), "c++"),
+    (re.compile(r'^(?:def |class \w+[:(]|from \w[\w.]* import |import \w+\s*$)', re.MULTILINE), "python"),
+    (re.compile(r'^(?:function |const |let |export |import .* from )|=> ?\{', re.MULTILINE), "javascript"),
+    (re.compile(r'^<\?php'), "php"),
+    (re.compile(r'^\$ \w'), "shell"),
+]
+
+
+def normalize_code_language(info):
+    """
+    Normalise le langage d'un fence markdown vers un nom accepté par Notion
+
+    Returns:
+        str: Nom Notion, ou None si le langage est absent ou inconnu
+    """
+    if not info:
+        return None
+    # Premier mot du fence, sans décorations ({.python}, title=..., language-xxx)
+    token = info.strip().split()[0].strip('{}.').lower()
+    if token.startswith('language-'):
+        token = token[len('language-'):]
+    return _LANGUAGE_LOOKUP.get(token) or _LANGUAGE_LOOKUP.get(info.strip().lower())
+
+
+def detect_code_language(code):
+    """Détecte le langage d'un extrait de code par quelques motifs sur son début (ou None)"""
+    sample = code.lstrip()[:_DETECTION_SAMPLE_CHARS]
+    for pattern, language in _LANGUAGE_HEURISTICS:
+        if pattern.search(sample):
+            return language
+    return None
@@ -1,99 +1,60 @@
 """
 Module principal pour parser le contenu markdown/text et créer les blocs Notion
 """
-from .block_creators import create_code_blocks, create_paragraph_blocks
-from .markdown_parsers import (
-    parse_image_markdown,
-    parse_heading,
-    parse_bulleted_list,
-    parse_numbered_list,
-    parse_image_url
-)
+from .block_creators import create_paragraph_blocks
+from .parser_rules import DEFAULT_PARSER_RULES, compile_parser_rules
 
 
-def parse_content_to_notion_blocks(content):
+PARSE_CHECK_INTERVAL = 500
+
+
+def parse_content_to_notion_blocks(content, check=None, rules=None):
     """
     Parse le contenu markdown/text et crée les blocs Notion appropriés
-    Supporte : titres, listes, code, images, paragraphes
+    Supporte : titres, listes (imbriquées, cases à cocher), code, tableaux,
+    citations, séparateurs, images, paragraphes
+
+    Le contenu est parcouru en une seule passe : chaque ligne est lue une fois,
+    les éléments sur plusieurs lignes (code, tableau, citation, liste)
+    consomment leurs lignes d'un coup. Pour chaque ligne, seules les règles
+    dont le préfixe peut correspondre sont essayées (voir parsers/parser_rules.py).
+
+    `rules` est la liste ordonnée des règles actives (DEFAULT_PARSER_RULES par
+    défaut). `check`, si fourni, est appelé toutes les PARSE_CHECK_INTERVAL
+    lignes et peut lever une exception pour interrompre le parsing
+    (annulation, délai).
     """
     if not content:
         return []
     
+    by_char, anywhere = compile_parser_rules(tuple(rules) if rules is not None else DEFAULT_PARSER_RULES)
     blocks = []
     lines = content.split('\n')
     i = 0
-    in_code_block = False
-    code_block_content = []
-    code_language = ''
+    next_check = PARSE_CHECK_INTERVAL
     
     while i < len(lines):
+        if check is not None and i >= next_check:
+            check()
+            next_check = i + PARSE_CHECK_INTERVAL
         line = lines[i]
         stripped = line.strip()
         
-        # Détection des blocs de code (```)
-        if stripped.startswith('```'):
-            if in_code_block:
-                # Fin du bloc de code
-                blocks.extend(create_code_blocks(code_block_content, code_language))
-                code_block_content = []
-                code_language = ''
-                in_code_block = False
-            else:
-                # Début du bloc de code
-                in_code_block = True
-                code_language = stripped[3:].strip() if len(stripped) > 3 else ''
-            i += 1
-            continue
-        
-        if in_code_block:
-            code_block_content.append(line)
-            i += 1
-            continue
-        
-        # Détection des images markdown
-        image_block = parse_image_markdown(stripped)
-        if image_block:
-            blocks.append(image_block)
-            i += 1
-            continue
-        
-        # Détection des titres
-        heading_block = parse_heading(stripped)
-        if heading_block:
-            blocks.append(heading_block)
-            i += 1
-            continue
-        
-        # Détection des listes à puces
-        bulleted_items, consumed_lines = parse_bulleted_list(lines, i)
-        if bulleted_items:
-            blocks.extend(bulleted_items)
-            i += consumed_lines
-            continue
+        consumed = 0
+        for rule in by_char.get(stripped[:1], anywhere):
+            if rule.predicate is not None and not rule.predicate(stripped):
+                continue
+            rule_blocks, consumed = rule.parse(lines, i, stripped)
+            if consumed:
+                blocks.extend(rule_blocks)
+                break
         
-        # Détection des listes numérotées
-        numbered_items, consumed_lines = parse_numbered_list(lines, i)
-        if numbered_items:
-            blocks.extend(numbered_items)
-            i += consumed_lines
+        if consumed:
+            i += consumed
             continue
         
-        # Détection des URLs d'images directes
-        image_url_block, remaining_line = parse_image_url(line)
-        if image_url_block:
-            blocks.append(image_url_block)
-            if not remaining_line.strip():
-                i += 1
-                continue
-            line = remaining_line
-        
         # Par défaut, créer un paragraphe
         blocks.extend(create_paragraph_blocks(line))
         i += 1
     
-    # Si on est encore dans un bloc de code à la fin, le fermer
-    if in_code_block and code_block_content:
-        blocks.extend(create_code_blocks(code_block_content, code_language))
-    
     return blocks
-
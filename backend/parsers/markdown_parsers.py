@@ -2,7 +2,23 @@
 Parsers pour les éléments markdown spécifiques
 """
 import re
-from .block_creators import create_list_item_blocks
+from .block_creators import (
+    MAX_CHILDREN,
+    create_list_item_blocks,
+    create_todo_blocks,
+    create_quote_blocks,
+    create_divider_block,
+    create_table_blocks
+)
+from .block_types import TextBlock
+
+
+# Niveaux d'imbrication d'une liste acceptés par Notion dans une requête
+MAX_LIST_DEPTH = 2
+DIVIDER_PATTERN = re.compile(r'^(?:(?:-[ \t]*){3,}|(?:\*[ \t]*){3,}|(?:_[ \t]*){3,})$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?$')
+TABLE_CELL_SEPARATOR = re.compile(r'(?<!\\)\|')
+LIST_ITEM_PATTERN = re.compile(r'^([ \t]*)(?:[-*+]|(\d+)[.)])[ \t]+(?:\[([ xX])\][ \t]+)?(\S.*)$')
 
 
 def parse_image_markdown(stripped):
@@ -46,68 +62,120 @@ def parse_heading(stripped):
     if not title_text:
         return None
     
-    heading_type = f"heading_{min(level, 3)}"
-    return {
-        "object": "block",
-        "type": heading_type,
-        heading_type: {
-            "rich_text": [{
-                "type": "text",
-                "text": {"content": title_text}
-            }]
-        }
-    }
+    return TextBlock(f"heading_{min(level, 3)}", title_text)
 
 
-def parse_bulleted_list(lines, start_index):
-    """Parse une liste à puces (- ou *)"""
-    if start_index >= len(lines):
-        return [], 0
-    
+def parse_divider(stripped):
+    """Parse un séparateur (---, ***, ___)"""
+    if not stripped or stripped[0] not in '-*_' or not DIVIDER_PATTERN.match(stripped):
+        return None
+    return create_divider_block()
+
+
+def parse_table(lines, start_index):
+    """
+    Parse un tableau markdown : ligne d'en-tête, ligne de séparation
+    (|---|:---:|), puis les lignes contenant un « | »
+    """
     stripped = lines[start_index].strip()
-    if not (stripped.startswith('- ') or stripped.startswith('* ')):
+    if '|' not in stripped or start_index + 1 >= len(lines):
         return [], 0
-    
-    list_items = []
+
+    separator = lines[start_index + 1].strip()
+    if '|' not in separator or not TABLE_SEPARATOR_PATTERN.match(separator):
+        return [], 0
+    header = _split_table_row(stripped)
+    if len(header) != len(_split_table_row(separator)):
+        return [], 0
+
+    rows = []
+    i = start_index + 2
+    while i < len(lines) and '|' in lines[i]:
+        rows.append(_split_table_row(lines[i].strip()))
+        i += 1
+
+    return create_table_blocks(header, rows), i - start_index
+
+
+def _split_table_row(row):
+    """Découpe une ligne de tableau en cellules (les « \\| » restent dans la cellule)"""
+    if row.startswith('|'):
+        row = row[1:]
+    if row.endswith('|') and not row.endswith('\\|'):
+        row = row[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in TABLE_CELL_SEPARATOR.split(row)]
+
+
+def parse_quote(lines, start_index):
+    """Parse une citation (lignes consécutives commençant par >)"""
+    quote_lines = []
     i = start_index
-    while i < len(lines) and (lines[i].strip().startswith('- ') or lines[i].strip().startswith('* ')):
-        item_text = lines[i].strip()[2:].strip()
-        if item_text:
-            list_items.append(item_text)
+    while i < len(lines):
+        stripped = lines[i].strip()
+        if not stripped.startswith('>'):
+            break
+        quote_lines.append(stripped[2:] if stripped.startswith('> ') else stripped[1:])
         i += 1
-    
-    blocks = []
-    for item_text in list_items:
-        blocks.extend(create_list_item_blocks(item_text, "bulleted"))
-    
-    return blocks, i - start_index
 
+    return create_quote_blocks(quote_lines), i - start_index
 
-def parse_numbered_list(lines, start_index):
-    """Parse une liste numérotée (1. 2. etc.)"""
-    if start_index >= len(lines):
-        return [], 0
-    
-    stripped = lines[start_index].strip()
-    numbered_match = re.match(r'^\d+\.\s+(.+)', stripped)
-    if not numbered_match:
-        return [], 0
-    
-    list_items = []
+
+def parse_list(lines, start_index):
+    """
+    Parse une liste (puces - * +, numérotée 1. 1), cases à cocher - [ ] / - [x])
+
+    Les éléments plus indentés que le précédent deviennent ses enfants. Notion
+    n'accepte que MAX_LIST_DEPTH niveaux d'imbrication par requête et
+    MAX_CHILDREN enfants par bloc : au-delà, les éléments sont rattachés au
+    niveau supérieur.
+    """
+    roots = []
+    # Éléments ouverts (indentation, noeud), du plus externe au plus interne
+    stack = []
     i = start_index
     while i < len(lines):
-        match = re.match(r'^\d+\.\s+(.+)', lines[i].strip())
-        if match:
-            list_items.append(match.group(1))
-            i += 1
-        else:
+        match = LIST_ITEM_PATTERN.match(lines[i])
+        if not match:
             break
-    
-    blocks = []
-    for item_text in list_items:
-        blocks.extend(create_list_item_blocks(item_text, "numbered"))
-    
-    return blocks, i - start_index
+        indent = len(match.group(1).expandtabs(4))
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+
+        nodes = [[block, []] for block in _list_item_blocks(match)]
+        siblings = roots
+        level = min(len(stack), MAX_LIST_DEPTH)
+        while level:
+            children = stack[level - 1][1][1]
+            if len(children) + len(nodes) <= MAX_CHILDREN:
+                siblings = children
+                break
+            level -= 1
+        siblings.extend(nodes)
+        stack.append((indent, nodes[-1]))
+        i += 1
+
+    return [_build_list_block(node) for node in roots], i - start_index
+
+
+def _list_item_blocks(match):
+    """Blocs d'un élément de liste selon son marqueur"""
+    item_text = match.group(4).strip()
+    checkbox = match.group(3)
+    if checkbox is not None:
+        return create_todo_blocks(item_text, checked=checkbox != ' ')
+    return create_list_item_blocks(item_text, "numbered" if match.group(2) else "bulleted")
+
+
+def _build_list_block(node, nested=False):
+    """Construit le bloc d'un noeud de liste avec ses enfants (dicts Notion)"""
+    block, children = node
+    if not children and (not nested or isinstance(block, dict)):
+        return block
+    if not isinstance(block, dict):
+        block = block.to_dict()
+    if children:
+        block[block["type"]]["children"] = [_build_list_block(child, nested=True) for child in children]
+    return block
 
 
 def parse_image_url(line):
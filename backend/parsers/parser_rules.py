@@ -0,0 +1,133 @@
+"""
+Registre des règles de parsing du contenu
+
+Chaque règle déclare un prédicat de préfixe peu coûteux (premiers caractères
+possibles de la ligne, ou test sur la ligne) et un parser complet
+`parse(lines, index, stripped) -> (blocs, lignes consommées)`. Le dispatcher
+(parsers/content_parser.py) ne lance que les règles dont le préfixe peut
+correspondre ; une ligne qu'aucune règle ne consomme devient un paragraphe.
+
+Les règles actives et leur ordre sont ceux de la configuration
+(`parser_rules`), DEFAULT_PARSER_RULES sinon.
+"""
+from functools import lru_cache
+from .block_creators import create_code_blocks, create_paragraph_blocks
+from .markdown_parsers import (
+    parse_image_markdown,
+    parse_heading,
+    parse_divider,
+    parse_table,
+    parse_quote,
+    parse_list,
+    parse_image_url
+)
+
+
+class ParserRule:
+    """Règle de parsing : nom, préfixes possibles (None : toute ligne), prédicat optionnel, parser"""
+
+    __slots__ = ('name', 'parse', 'prefixes', 'predicate')
+
+    def __init__(self, name, parse, prefixes=None, predicate=None):
+        self.name = name
+        self.parse = parse
+        self.prefixes = frozenset(prefixes) if prefixes is not None else None
+        self.predicate = predicate
+
+
+def _parse_code_fence(lines, start_index, stripped):
+    """Bloc de code (```langage ... ```), jusqu'au fence fermant ou à la fin du contenu"""
+    language = stripped[3:].strip()
+    i = start_index + 1
+    while i < len(lines) and not lines[i].strip().startswith('```'):
+        i += 1
+    blocks = create_code_blocks(lines[start_index + 1:i], language)
+    return blocks, min(i + 1, len(lines)) - start_index
+
+
+def _single_line(parser):
+    """Adapte un parser d'une ligne (stripped -> bloc ou None) au format des règles"""
+    def parse(lines, start_index, stripped):
+        block = parser(stripped)
+        return ([block], 1) if block else ([], 0)
+    return parse
+
+
+def _multi_line(parser):
+    """Adapte un parser sur plusieurs lignes (lines, index) au format des règles"""
+    def parse(lines, start_index, stripped):
+        return parser(lines, start_index)
+    return parse
+
+
+def _parse_image_url(lines, start_index, stripped):
+    """URL d'image directe ; le reste de la ligne devient un paragraphe"""
+    image_block, remaining_line = parse_image_url(lines[start_index])
+    if not image_block:
+        return [], 0
+    blocks = [image_block]
+    if remaining_line.strip():
+        blocks.extend(create_paragraph_blocks(remaining_line))
+    return blocks, 1
+
+
+PARSER_RULES = {
+    rule.name: rule for rule in (
+        ParserRule('code', _parse_code_fence, '`', lambda stripped: stripped.startswith('```')),
+        # Avant les listes : « * * * » est un séparateur
+        ParserRule('divider', _single_line(parse_divider), '-*_'),
+        ParserRule('image_markdown', _single_line(parse_image_markdown), '!'),
+        ParserRule('heading', _single_line(parse_heading), '#'),
+        ParserRule('table', _multi_line(parse_table), predicate=lambda stripped: '|' in stripped),
+        ParserRule('quote', _multi_line(parse_quote), '>'),
+        ParserRule('list', _multi_line(parse_list), '-*+0123456789'),
+        ParserRule('image_url', _parse_image_url, predicate=lambda stripped: '://' in stripped)
+    )
+}
+
+DEFAULT_PARSER_RULES = tuple(PARSER_RULES)
+
+
+def register_parser_rule(rule):
+    """
+    Ajoute (ou remplace) une règle. Elle n'est active que si la configuration
+    la liste dans `parser_rules`.
+    """
+    PARSER_RULES[rule.name] = rule
+    compile_parser_rules.cache_clear()
+
+
+def validate_parser_rules(names):
+    """
+    Vérifie une liste ordonnée de noms de règles
+
+    Raises:
+        ValueError: si un nom est inconnu ou répété
+    """
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError("parserRules doit être une liste de noms de règles")
+    unknown = [name for name in names if name not in PARSER_RULES]
+    if unknown:
+        raise ValueError(f"Règles de parsing inconnues : {', '.join(unknown)}")
+    if len(set(names)) != len(names):
+        raise ValueError("Une règle de parsing ne peut apparaître qu'une fois")
+    return names
+
+
+@lru_cache(maxsize=32)
+def compile_parser_rules(names=DEFAULT_PARSER_RULES):
+    """
+    Table de dispatch des règles actives, dans l'ordre donné
+
+    Returns:
+        tuple: ({premier caractère: règles candidates}, règles candidates pour
+        tout autre premier caractère)
+    """
+    rules = [PARSER_RULES[name] for name in names if name in PARSER_RULES]
+    anywhere = tuple(rule for rule in rules if rule.prefixes is None)
+    chars = {char for rule in rules if rule.prefixes is not None for char in rule.prefixes}
+    by_char = {
+        char: tuple(rule for rule in rules if rule.prefixes is None or char in rule.prefixes)
+        for char in chars
+    }
+    return by_char, anywhere
@@ -1,14 +1,28 @@
 """
 Routes pour l'envoi de chats vers Notion
 """
-from flask import Blueprint, request, jsonify
-from notion_client import Client
-from db import get_config, save_config
-from parsers.chat_parser import parse_chat
+import json
+import time
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify
+from db import get_config, get_outbox_entry, count_pending_outbox_entries
+from parsers.chat_parser import parse_chat, split_chat_turns
+from utils.property_formatter import format_notion_property
+from services.schema_cache import get_database_schema, ensure_select_options
+from services.rate_limiter import PRIORITY_WEIGHTS, PRIORITY_INTERACTIVE
+from services.jobs import JobCancelled, start_job, cancel_job, end_job
+from services.outbox import enqueue_chat
+from services.chat_history import record_sent_chat
+from services.config_writer import save_discovered_properties
+from services.memory_profiler import MemoryProfile, memory_profiling_enabled, profile_stage
 from services.notion_service import (
-    detect_database_properties,
+    get_notion_client,
     build_notion_properties,
-    create_notion_page_with_blocks
+    create_notion_page_with_blocks,
+    iter_create_notion_page_with_blocks,
+    create_message_pages,
+    iter_create_message_pages,
+    PartialPagesError
 )
 
 chat_bp = Blueprint('chat', __name__)
@@ -17,6 +31,7 @@ chat_bp = Blueprint('chat', __name__)
 @chat_bp.route('/api/chat', methods=['POST'])
 def process_chat():
     """Process and send chat data to Notion"""
+    job = None
     try:
         config = get_config()
         if not config:
@@ -28,75 +43,366 @@ def process_chat():
         chat_content = data.get('content')
         chat_date = data.get('date')
         additional_property_values = data.get('additionalProperties', {})
+        mode = data.get('mode', 'conversation')
+        relation_property = data.get('relationProperty')
+        stream = bool(data.get('stream'))
+        auto_create_options = bool(data.get('autoCreateOptions'))
+        deferred = bool(data.get('deferred'))
+        priority = data.get('priority', PRIORITY_INTERACTIVE)
+        timeout = data.get('timeout')
         
         if not chat_content:
             return jsonify({"error": "Le contenu du chat est requis"}), 400
         
+        if mode not in ('conversation', 'per_message'):
+            return jsonify({"error": f"Mode d'envoi inconnu : {mode}"}), 400
+        
+        if priority not in PRIORITY_WEIGHTS:
+            return jsonify({"error": f"Priorité inconnue : {priority}"}), 400
+        
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+            return jsonify({"error": "Le délai (timeout) doit être un nombre de secondes positif"}), 400
+        
+        if deferred:
+            if mode != 'conversation':
+                return jsonify({"error": "L'envoi différé n'est disponible qu'en mode conversation"}), 400
+            # Écrire le chat dans l'outbox et acquitter immédiatement ; la date est figée à l'acceptation
+            entry_id = enqueue_chat({
+                "content": chat_content,
+                "date": chat_date or datetime.now().strftime('%Y-%m-%d'),
+                "additionalProperties": additional_property_values,
+                "autoCreateOptions": auto_create_options
+            })
+            return jsonify({
+                "message": "Chat accepté, envoi vers Notion en cours",
+                "outboxId": entry_id,
+                "status": "pending",
+                "pending": count_pending_outbox_entries()
+            }), 202
+        
+        # Enregistrer l'envoi pour permettre son annulation (jobId) et appliquer le délai
+        try:
+            job = start_job(data.get('jobId'), timeout, priority, config['database_id'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409
+        job.parser_rules = config.get('parser_rules')
+        
+        # Profilage mémoire par étape : ?profileMemory=1 (réponse) ou MEMORY_PROFILE=1 (log)
+        profile_in_response = request.args.get('profileMemory', '').lower() in ('1', 'true')
+        if profile_in_response or memory_profiling_enabled():
+            job.profile = MemoryProfile(respond=profile_in_response, log=memory_profiling_enabled())
+        
         # Parse chat content
-        parsed_data = parse_chat(chat_content, chat_date)
+        with profile_stage(job, 'parse_chat'):
+            parsed_data = parse_chat(chat_content, chat_date)
         
         # Send to Notion
-        notion = Client(auth=config['api_key'])
+        notion = get_notion_client(config['api_key'])
         
         # Récupérer les noms des propriétés depuis la config, ou les détecter automatiquement
         title_property = config.get('title_property')
         date_property = config.get('date_property')
         
-        # Récupérer la base de données pour avoir accès aux propriétés
-        _, _, db_properties = detect_database_properties(notion, config['database_id'])
+        # Un seul instantané du schéma (en cache) sert à la détection, à la
+        # construction et à la validation des propriétés
+        created_options = {}
+        if auto_create_options:
+            # Créer toutes les options select/multi_select manquantes en une seule mise à jour
+            schema, created_options = ensure_select_options(
+                notion, config['database_id'], [additional_property_values]
+            )
+        else:
+            schema = get_database_schema(notion, config['database_id'])
+        db_properties = schema.properties
         
-        # Si les propriétés ne sont pas configurées, les détecter automatiquement
+        # Si les propriétés ne sont pas configurées, les détecter dans le schéma
         if not title_property or date_property is None:
-            try:
-                title_property, date_property, _ = detect_database_properties(notion, config['database_id'])
-                
-                # Mettre à jour la configuration avec les propriétés détectées
-                if title_property:
-                    save_config(
-                        config['api_key'],
-                        config['database_id'],
-                        title_property,
-                        date_property,
-                        config.get('additional_properties'),
-                        config.get('dynamic_fields')
-                    )
-                else:
-                    return jsonify({
-                        "error": "Aucune propriété de type 'title' trouvée dans la base de données. Veuillez créer une propriété de type titre."
-                    }), 400
-            except Exception as e:
-                return jsonify({"error": f"Erreur lors de la détection des propriétés : {str(e)}"}), 500
+            detected_title, detected_date, _ = schema.detect()
+            title_property = title_property or detected_title
+            if date_property is None:
+                date_property = detected_date
+            if not title_property:
+                return jsonify({
+                    "error": "Aucune propriété de type 'title' trouvée dans la base de données. Veuillez créer une propriété de type titre."
+                }), 400
+            
+            # Mettre à jour la configuration avec les propriétés détectées
+            # (écriture différée, seulement si elles ont changé)
+            save_discovered_properties(config, title_property, date_property)
+            config = dict(config, title_property=title_property, date_property=date_property)
         
         # Construire les propriétés Notion
         properties, date_property, missing_properties = build_notion_properties(
             config,
             parsed_data,
             additional_property_values,
-            db_properties
+            db_properties,
+            schema.formatters
         )
         
+        if mode == 'per_message':
+            if not relation_property or db_properties.get(relation_property, {}).get('type') != 'relation':
+                return jsonify({
+                    "error": "Le mode une page par message nécessite une propriété de type 'relation' (relationProperty)."
+                }), 400
+            message_job = job
+            if stream:
+                # Le job est terminé par le générateur du stream
+                job = None
+            return _process_chat_per_message(
+                notion, config, parsed_data, properties, title_property, date_property,
+                relation_property, db_properties[relation_property], missing_properties,
+                created_options, message_job, stream
+            )
+        
+        if stream:
+            # Le job est terminé par le générateur du stream
+            stream_job, job = job, None
+            return _stream_chat(
+                notion, config, parsed_data, properties, date_property, missing_properties,
+                created_options, stream_job
+            )
+        
         # Créer la page Notion avec les blocs
         page_id, blocks_count = create_notion_page_with_blocks(
             notion,
             config['database_id'],
             properties,
-            parsed_data['content']
+            parsed_data['content'],
+            job
+        )
+        record_sent_chat(
+            page_id, config['database_id'], parsed_data, blocks_count, time.monotonic() - job.started_at
         )
         
-        # Construire le message de succès
-        message = f"Chat envoyé à Notion avec succès ({blocks_count} blocs créés)"
-        if date_property and date_property in properties:
-            message += f" - Date: {parsed_data['date']}"
-        elif not date_property:
-            message += " - ⚠️ Aucune propriété date trouvée dans votre base de données"
+        return jsonify(_finish_profile(job, _success_payload(
+            page_id, blocks_count, parsed_data, properties, date_property, missing_properties,
+            created_options
+        ))), 200
         
+    except JobCancelled as e:
+        if e.page_id:
+            # Page partiellement écrite : la garder dans l'historique
+            record_sent_chat(e.page_id, config['database_id'], parsed_data, 0,
+                             time.monotonic() - job.started_at, 'cancelled')
+        payload = {
+            "error": str(e),
+            "cancelled": True,
+            "reason": e.reason,
+            "notionPageId": e.page_id
+        }
+        if e.page_ids:
+            payload["messagePageIds"] = e.page_ids
+        return jsonify(payload), 408 if e.reason == 'deadline' else 409
+    except PartialPagesError as e:
+        # Pages créées avant l'échec : les signaler pour pouvoir les nettoyer
+        record_sent_chat(e.page_id, config['database_id'], parsed_data, 0,
+                         time.monotonic() - job.started_at, 'partial')
         return jsonify({
-            "message": message,
-            "notionPageId": page_id,
-            "dateSent": date_property in properties if date_property else False,
-            "missingProperties": missing_properties
-        }), 200
-        
+            "error": str(e),
+            "partial": True,
+            "notionPageId": e.page_id,
+            "messagePageIds": e.page_ids
+        }), 502
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    finally:
+        if job is not None:
+            end_job(job)
+
+
+@chat_bp.route('/api/chat/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_chat_job(job_id):
+    """Annule un envoi en cours (identifié par le jobId fourni ou renvoyé)"""
+    if not cancel_job(job_id):
+        return jsonify({"error": f"Aucun envoi en cours avec l'identifiant '{job_id}'"}), 404
+    return jsonify({"message": "Annulation demandée", "jobId": job_id}), 200
+
+
+@chat_bp.route('/api/chat/outbox/<int:entry_id>', methods=['GET'])
+def get_outbox_status(entry_id):
+    """Retourne l'état de livraison d'un chat accepté en différé"""
+    entry = get_outbox_entry(entry_id)
+    if entry is None:
+        return jsonify({"error": f"Aucun envoi différé avec l'identifiant {entry_id}"}), 404
+    return jsonify({
+        "outboxId": entry['id'],
+        "status": entry['status'],
+        "attempts": entry['attempts'],
+        "lastError": entry['last_error'],
+        "notionPageId": entry['notion_page_id'],
+        "createdAt": entry['created_at']
+    }), 200
+
+
+def _finish_profile(job, payload):
+    """Ajoute/écrit le rapport de profilage mémoire du job, s'il est profilé"""
+    if job.profile is not None:
+        job.profile.finish(payload, jobId=job.id)
+    return payload
+
+
+def _success_payload(page_id, blocks_count, parsed_data, properties, date_property, missing_properties,
+                     created_options):
+    """Construit la réponse de succès d'un envoi de chat"""
+    message = f"Chat envoyé à Notion avec succès ({blocks_count} blocs créés)"
+    if date_property and date_property in properties:
+        message += f" - Date: {parsed_data['date']}"
+    elif not date_property:
+        message += " - ⚠️ Aucune propriété date trouvée dans votre base de données"
+    
+    return {
+        "message": message,
+        "notionPageId": page_id,
+        "dateSent": date_property in properties if date_property else False,
+        "missingProperties": missing_properties,
+        "createdOptions": created_options
+    }
+
+
+def _stream_chat(notion, config, parsed_data, properties, date_property, missing_properties,
+                 created_options, job):
+    """
+    Envoie le chat en renvoyant la progression en NDJSON (un événement par ligne)
+
+    Si le client se déconnecte, le générateur est fermé et les lots restants
+    ne sont pas envoyés. Le job est libéré par le générateur et, si le corps
+    n'est jamais lu, à la fermeture de la réponse.
+    """
+    def generate():
+        try:
+            yield {"event": "started", "jobId": job.id}
+            page_id, blocks_count = yield from iter_create_notion_page_with_blocks(
+                notion,
+                config['database_id'],
+                properties,
+                parsed_data['content'],
+                job
+            )
+            record_sent_chat(
+                page_id, config['database_id'], parsed_data, blocks_count, time.monotonic() - job.started_at
+            )
+            done = _finish_profile(job, _success_payload(
+                page_id, blocks_count, parsed_data, properties, date_property, missing_properties,
+                created_options
+            ))
+            yield {"event": "done", **done}
+        except JobCancelled as e:
+            if e.page_id:
+                record_sent_chat(e.page_id, config['database_id'], parsed_data, 0,
+                                 time.monotonic() - job.started_at, 'cancelled')
+            yield {"event": "cancelled", "reason": e.reason, "error": str(e), "notionPageId": e.page_id}
+        except PartialPagesError as e:
+            record_sent_chat(e.page_id, config['database_id'], parsed_data, 0,
+                             time.monotonic() - job.started_at, 'partial')
+            yield {"event": "error", "error": str(e), "partial": True, "notionPageId": e.page_id}
+        except Exception as e:
+            yield {"event": "error", "error": str(e)}
+        finally:
+            job.cancel()
+            end_job(job)
+
+    return _ndjson_response(generate(), job)
+
+
+def _ndjson_response(events, job):
+    """
+    Réponse NDJSON (un événement par ligne) d'un envoi en stream
+
+    Le corps peut ne jamais être lu (client déconnecté avant la première
+    lecture) : le job est aussi libéré à la fermeture de la réponse.
+    """
+    def encode():
+        for event in events:
+            yield json.dumps(event, ensure_ascii=False) + '\n'
+
+    def release_job():
+        job.cancel()
+        end_job(job)
+
+    response = Response(encode(), mimetype='application/x-ndjson', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+    response.call_on_close(release_job)
+    return response
+
+
+def _process_chat_per_message(notion, config, parsed_data, properties, title_property, date_property,
+                              relation_property, relation_data, missing_properties, created_options, job,
+                              stream=False):
+    """
+    Crée une page de conversation et une page par message, reliées par une relation
+
+    En mode stream, un événement est renvoyé à chaque page créée.
+    """
+    turns = split_chat_turns(parsed_data['content'])
+
+    def build_turn_properties(index, turn, parent_page_id):
+        turn_data = parse_chat(turn['content'], parsed_data['date'])
+        turn_properties = dict(properties)
+        turn_properties[title_property] = {
+            "title": [{
+                "text": {"content": f"{index}. {turn_data['title']}"[:100]}
+            }]
+        }
+        turn_properties[relation_property] = format_notion_property(
+            'relation', parent_page_id, relation_data
+        )
+        return turn_properties
+
+    def finish(parent_page_id, turn_pages):
+        blocks_count = sum(count for _, count in turn_pages)
+        record_sent_chat(
+            parent_page_id, config['database_id'], parsed_data, blocks_count, time.monotonic() - job.started_at
+        )
+        return _finish_profile(job, {
+            "message": f"Conversation envoyée à Notion avec succès ({len(turn_pages)} messages, {blocks_count} blocs créés)",
+            "notionPageId": parent_page_id,
+            "messagePageIds": [page_id for page_id, _ in turn_pages],
+            "dateSent": date_property in properties if date_property else False,
+            "missingProperties": missing_properties,
+            "createdOptions": created_options
+        })
+
+    if not stream:
+        parent_page_id, turn_pages = create_message_pages(
+            notion,
+            config['database_id'],
+            properties,
+            turns,
+            build_turn_properties,
+            job=job
+        )
+        return jsonify(finish(parent_page_id, turn_pages)), 200
+
+    def generate():
+        try:
+            yield {"event": "started", "jobId": job.id}
+            parent_page_id, turn_pages = yield from iter_create_message_pages(
+                notion,
+                config['database_id'],
+                properties,
+                turns,
+                build_turn_properties,
+                job=job
+            )
+            yield {"event": "done", **finish(parent_page_id, turn_pages)}
+        except JobCancelled as e:
+            if e.page_id:
+                record_sent_chat(e.page_id, config['database_id'], parsed_data, 0,
+                                 time.monotonic() - job.started_at, 'cancelled')
+            yield {"event": "cancelled", "reason": e.reason, "error": str(e), "notionPageId": e.page_id,
+                   "messagePageIds": e.page_ids}
+        except PartialPagesError as e:
+            record_sent_chat(e.page_id, config['database_id'], parsed_data, 0,
+                             time.monotonic() - job.started_at, 'partial')
+            yield {"event": "error", "error": str(e), "partial": True, "notionPageId": e.page_id,
+                   "messagePageIds": e.page_ids}
+        except Exception as e:
+            yield {"event": "error", "error": str(e)}
+        finally:
+            job.cancel()
+            end_job(job)
 
+    return _ndjson_response(generate(), job)
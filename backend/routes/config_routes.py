@@ -1,15 +1,94 @@
 """
 Routes pour la configuration Notion
 """
-from flask import Blueprint, request, jsonify
-from notion_client import Client
-from db import save_config, get_config
-from services.notion_service import detect_database_properties, get_database_structure
-from services.property_validator import validate_properties_batch
+import threading
+import time
+from flask import Blueprint, Response, request, jsonify
+from db import save_config, get_config, get_config_version
+from services.notion_service import get_notion_client, retrieve_database
+from services.property_validator import validate_properties_batch, validate_property_rows
+from services.schema_cache import (
+    SCHEMA_CACHE_TTL,
+    get_database_schema,
+    peek_database_schema,
+    store_database_schema
+)
 
 config_bp = Blueprint('config', __name__)
 
 
+def _etag_response(response, etag):
+    """
+    Ajoute un ETag fort ; Cache-Control: no-cache fait revalider le navigateur
+    (If-None-Match) à chaque chargement
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _not_modified(etag):
+    """Réponse 304 lorsque If-None-Match correspond à l'ETag courant"""
+    if request.if_none_match.contains(etag):
+        return _etag_response(Response(status=304), etag)
+    return None
+
+
+def _cached_schema(config):
+    """Schéma de la base configurée : le cache mémoire, sinon Notion"""
+    schema = peek_database_schema(config['api_key'], config['database_id'])
+    if schema is None:
+        schema = get_database_schema(get_notion_client(config['api_key']), config['database_id'])
+    return schema
+
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _refresh_schema_in_background(config):
+    """Recharge depuis Notion un schéma expiré, hors de la requête (une fois par base)"""
+    key = (config['api_key'], config['database_id'])
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh():
+        try:
+            get_database_schema(get_notion_client(config['api_key']), config['database_id'])
+        except Exception as e:
+            print(f"Erreur lors du rafraîchissement du schéma : {str(e)}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=refresh, name='schema-refresh', daemon=True).start()
+
+
+def _schema_response(config, prefix, build):
+    """
+    Réponse dérivée du schéma, avec ETag (version de la configuration et
+    empreinte du schéma)
+
+    If-None-Match est comparé au dernier schéma connu avant tout
+    rafraîchissement : un 304 n'appelle jamais Notion. Si ce schéma a expiré,
+    il est rechargé en tâche de fond et la revalidation suivante verra les
+    changements.
+    """
+    known = peek_database_schema(config['api_key'], config['database_id'], max_age=float('inf'))
+    if known is not None:
+        not_modified = _not_modified(f"{prefix}-{get_config_version()}-{known.fingerprint}")
+        if not_modified is not None:
+            if time.monotonic() - known.fetched_at >= SCHEMA_CACHE_TTL:
+                _refresh_schema_in_background(config)
+            return not_modified
+
+    schema = _cached_schema(config)
+    etag = f"{prefix}-{get_config_version()}-{schema.fingerprint}"
+    return _etag_response(jsonify(build(schema)), etag)
+
+
 @config_bp.route('/api/config', methods=['POST'])
 def save_config_endpoint():
     """Save Notion API configuration"""
@@ -23,11 +102,12 @@ def save_config_endpoint():
         
         # Validate Notion credentials
         try:
-            notion = Client(auth=api_key)
-            database = notion.databases.retrieve(database_id=database_id)
+            notion = get_notion_client(api_key)
+            # Un seul appel à Notion : l'instantané sert à la détection et remplace le cache
+            schema = store_database_schema(notion, database_id, retrieve_database(notion, database_id))
             
             # Détecter automatiquement les propriétés title et date
-            title_property, date_property, _ = detect_database_properties(notion, database_id)
+            title_property, date_property, _ = schema.detect()
             
             if not title_property:
                 return jsonify({
@@ -52,16 +132,31 @@ def save_config_endpoint():
 @config_bp.route('/api/config', methods=['GET'])
 def get_config_endpoint():
     """Get current Notion configuration status"""
+    # La version est connue en mémoire : un 304 ne lit pas SQLite
+    etag = f"config-{get_config_version()}"
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    
     config = get_config()
     is_configured = config is not None
-    return jsonify({
+    return _etag_response(jsonify({
         "configured": is_configured,
         "databaseId": config.get('database_id', '') if config else '',
         "titleProperty": config.get('title_property', '') if config else '',
         "dateProperty": config.get('date_property', '') if config else '',
         "additionalProperties": config.get('additional_properties', {}) if config else {},
-        "dynamicFields": config.get('dynamic_fields', []) if config else []
-    }), 200
+        "dynamicFields": config.get('dynamic_fields', []) if config else [],
+        "parserRules": _active_parser_rules(config)
+    }), etag)
+
+
+def _active_parser_rules(config):
+    """Règles de parsing actives (configurées, sinon celles par défaut)"""
+    from parsers.parser_rules import DEFAULT_PARSER_RULES
+
+    rules = config.get('parser_rules') if config else None
+    return list(rules) if rules is not None else list(DEFAULT_PARSER_RULES)
 
 
 @config_bp.route('/api/config/database-structure', methods=['GET'])
@@ -74,10 +169,7 @@ def get_database_structure_endpoint():
                 "error": "Notion n'est pas configuré. Veuillez configurer les identifiants d'abord."
             }), 400
         
-        notion = Client(auth=config['api_key'])
-        structure = get_database_structure(notion, config['database_id'])
-        
-        return jsonify(structure), 200
+        return _schema_response(config, 'structure', lambda schema: schema.structure)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -92,16 +184,10 @@ def get_database_properties():
                 "error": "Notion n'est pas configuré. Veuillez configurer les identifiants d'abord."
             }), 400
         
-        notion = Client(auth=config['api_key'])
-        structure = get_database_structure(notion, config['database_id'])
-        
-        # Filtrer pour exclure title et date (gérés séparément) et enrichir avec métadonnées
-        properties = []
-        for prop in structure['properties']:
-            if prop['type'] not in ['title', 'date']:
-                properties.append(prop)
-        
-        return jsonify({"properties": properties}), 200
+        # Exclure title et date (gérés séparément)
+        return _schema_response(config, 'properties', lambda schema: {"properties": [
+            prop for prop in schema.structure['properties'] if prop['type'] not in ['title', 'date']
+        ]})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -162,6 +248,54 @@ def save_dynamic_fields():
         return jsonify({"error": str(e)}), 500
 
 
+@config_bp.route('/api/config/parser-rules', methods=['GET'])
+def get_parser_rules():
+    """Liste les règles de parsing : actives dans l'ordre d'application, puis désactivées"""
+    from parsers.parser_rules import PARSER_RULES
+
+    active = _active_parser_rules(get_config())
+    inactive = [name for name in PARSER_RULES if name not in active]
+    return jsonify({
+        "rules": [{"name": name, "enabled": True} for name in active if name in PARSER_RULES]
+        + [{"name": name, "enabled": False} for name in inactive]
+    }), 200
+
+
+@config_bp.route('/api/config/parser-rules', methods=['POST'])
+def save_parser_rules():
+    """Enregistre les règles de parsing actives et leur ordre (null : règles par défaut)"""
+    from parsers.parser_rules import DEFAULT_PARSER_RULES, validate_parser_rules
+
+    try:
+        config = get_config()
+        if not config:
+            return jsonify({
+                "error": "Notion n'est pas configuré. Veuillez configurer les identifiants d'abord."
+            }), 400
+        
+        parser_rules = (request.json or {}).get('parserRules')
+        if parser_rules is None:
+            parser_rules = list(DEFAULT_PARSER_RULES)
+        try:
+            validate_parser_rules(parser_rules)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        save_config(
+            config['api_key'],
+            config['database_id'],
+            config.get('title_property'),
+            config.get('date_property'),
+            config.get('additional_properties'),
+            config.get('dynamic_fields'),
+            parser_rules
+        )
+        
+        return jsonify({"message": "Règles de parsing enregistrées avec succès", "parserRules": parser_rules}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @config_bp.route('/api/config/validate-properties', methods=['POST'])
 def validate_properties():
     """Valide si des propriétés existent dans la base de données Notion"""
@@ -175,9 +309,8 @@ def validate_properties():
         data = request.json
         properties_to_validate = data.get('properties', [])
         
-        notion = Client(auth=config['api_key'])
-        database = notion.databases.retrieve(database_id=config['database_id'])
-        db_properties = database.get('properties', {})
+        notion = get_notion_client(config['api_key'])
+        db_properties = get_database_schema(notion, config['database_id']).properties
         
         validation_results = {}
         for prop in properties_to_validate:
@@ -215,17 +348,42 @@ def validate_property_values():
         data = request.json
         property_values = data.get('propertyValues', {})
         
-        # Récupérer la structure de la base de données
-        notion = Client(auth=config['api_key'])
-        structure = get_database_structure(notion, config['database_id'])
+        # Récupérer le schéma de la base (en cache, validateurs compilés)
+        notion = get_notion_client(config['api_key'])
+        schema = get_database_schema(notion, config['database_id'])
         
         # Valider les valeurs
         validation_results = validate_properties_batch(
-            structure['properties'],
-            property_values
+            schema.structure['properties'],
+            property_values,
+            schema.validators
         )
         
         return jsonify({"validation": validation_results}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+
+@config_bp.route('/api/config/validate-property-values/batch', methods=['POST'])
+def validate_property_values_batch():
+    """Valide de nombreux jeux de valeurs (ex. lignes d'un CSV) contre un seul instantané du schéma"""
+    try:
+        config = get_config()
+        if not config:
+            return jsonify({
+                "error": "Notion n'est pas configuré. Veuillez configurer les identifiants d'abord."
+            }), 400
+        
+        data = request.json
+        rows = data.get('rows')
+        if not isinstance(rows, list):
+            return jsonify({"error": "Le champ 'rows' doit être une liste de valeurs de propriétés"}), 400
+        
+        # Un seul instantané du schéma pour toutes les lignes
+        notion = get_notion_client(config['api_key'])
+        schema = get_database_schema(notion, config['database_id'])
+        
+        return jsonify(validate_property_rows(schema.validators, rows)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
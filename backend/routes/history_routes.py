@@ -0,0 +1,121 @@
+"""
+Routes pour l'historique des chats envoyés
+"""
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from db import list_sent_chats, get_sent_chats_stats
+from services.chat_index import search_index_available, search_chats
+
+history_bp = Blueprint('history', __name__)
+
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+
+
+def _date_filters():
+    """
+    Lit les filtres databaseId, from et to (dates YYYY-MM-DD incluses)
+
+    Raises:
+        ValueError: si une date n'est pas au format YYYY-MM-DD
+    """
+    filters = {"database_id": request.args.get('databaseId')}
+    for arg, key in (('from', 'date_from'), ('to', 'date_to')):
+        value = request.args.get(arg)
+        if value:
+            datetime.strptime(value, '%Y-%m-%d')
+        filters[key] = value
+    return filters
+
+
+@history_bp.route('/api/chats', methods=['GET'])
+def list_sent_chats_endpoint():
+    """Liste les chats envoyés, du plus récent au plus ancien (pagination par curseur)"""
+    try:
+        limit = request.args.get('limit', HISTORY_DEFAULT_LIMIT, type=int)
+        if not 1 <= limit <= HISTORY_MAX_LIMIT:
+            return jsonify({"error": f"Le paramètre 'limit' doit être compris entre 1 et {HISTORY_MAX_LIMIT}"}), 400
+        
+        cursor = request.args.get('cursor')
+        if cursor is not None and not cursor.isdigit():
+            return jsonify({"error": "Curseur de pagination invalide"}), 400
+        
+        try:
+            filters = _date_filters()
+        except ValueError:
+            return jsonify({"error": "Les dates 'from' et 'to' doivent être au format YYYY-MM-DD"}), 400
+        
+        rows = list_sent_chats(limit, int(cursor) if cursor else None, **filters)
+        chats = [{
+            "id": row['id'],
+            "notionPageId": row['page_id'],
+            "databaseId": row['database_id'],
+            "title": row['title'],
+            "date": row['date'],
+            "blocksCount": row['blocks_count'],
+            "bytes": row['bytes'],
+            "durationMs": row['duration_ms'],
+            "status": row['status'],
+            "createdAt": row['created_at']
+        } for row in rows]
+        
+        return jsonify({
+            "chats": chats,
+            "nextCursor": str(rows[-1]['id']) if len(rows) == limit else None
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@history_bp.route('/api/chats/stats', methods=['GET'])
+def sent_chats_stats_endpoint():
+    """Débit par date : nombre de chats, blocs, octets et durée cumulée"""
+    try:
+        try:
+            filters = _date_filters()
+        except ValueError:
+            return jsonify({"error": "Les dates 'from' et 'to' doivent être au format YYYY-MM-DD"}), 400
+        
+        days = [{
+            "date": row['date'],
+            "chats": row['chats'],
+            "sent": row['sent'],
+            "blocksCount": row['blocks_count'],
+            "bytes": row['bytes'],
+            "durationMs": row['duration_ms']
+        } for row in get_sent_chats_stats(**filters)]
+        
+        return jsonify({"days": days}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@history_bp.route('/api/chats/search', methods=['GET'])
+def search_sent_chats_endpoint():
+    """Recherche plein texte dans les chats déjà envoyés (index local)"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Le paramètre de recherche 'q' est requis"}), 400
+        
+        limit = request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int)
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            return jsonify({"error": f"Le paramètre 'limit' doit être compris entre 1 et {SEARCH_MAX_LIMIT}"}), 400
+        
+        if not search_index_available():
+            return jsonify({"error": "La recherche n'est pas disponible (SQLite sans FTS5)"}), 501
+        
+        results = [{
+            "notionPageId": row['page_id'],
+            "databaseId": row['database_id'],
+            "title": row['title'],
+            "date": row['date'],
+            "snippet": row['snippet']
+        } for row in search_chats(query, limit)]
+        
+        return jsonify({"results": results}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
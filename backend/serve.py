@@ -0,0 +1,204 @@
+"""
+Serveur de production (WSGI, waitress) pour Chat to Notion
+
+Usage :
+    python serve.py [--host 127.0.0.1] [--port 5000] [--threads 8] ...
+    python app.py serve [...]
+
+Contrairement à `app.run(debug=True)`, les requêtes sont traitées en parallèle
+par un pool de threads. À la réception de SIGTERM/SIGINT, le serveur cesse
+d'accepter de nouvelles connexions et termine les requêtes en cours (drain)
+avant de s'arrêter.
+
+Lancé via `python serve.py` (exécutable empaqueté), le port est lié avant
+l'import de Flask et des routes : l'application est chargée en tâche de fond et
+`/api/health` répond dès que le serveur écoute.
+"""
+import argparse
+import json
+import signal
+import threading
+import time
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 5000
+DEFAULT_THREADS = 8
+DEFAULT_BACKLOG = 1024
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_CHANNEL_TIMEOUT = 120
+DEFAULT_DRAIN_TIMEOUT = 30
+HEALTH_PATH = '/api/health'
+
+
+class LazyApplication:
+    """
+    Application WSGI chargée à la première utilisation
+
+    Tant que l'application n'est pas chargée, `/api/health` est servi
+    directement ; les autres requêtes attendent la fin du chargement. Si le
+    chargement a échoué, toutes les requêtes (health comprise) reçoivent une
+    503 avec l'erreur.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._application = None
+        self._error = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Charge l'application (une seule fois, thread-safe) ; relève l'erreur de chargement"""
+        if self._application is None:
+            with self._lock:
+                if self._error is not None:
+                    raise self._error
+                if self._application is None:
+                    try:
+                        self._application = self._loader()
+                    except Exception as e:
+                        self._error = e
+                        raise
+        return self._application
+
+    def __call__(self, environ, start_response):
+        if self._error is not None:
+            return self._unavailable(start_response)
+        if self._application is None and environ.get('PATH_INFO') == HEALTH_PATH:
+            return self._respond(start_response, '200 OK', {"status": "healthy"})
+        try:
+            application = self.load()
+        except Exception:
+            return self._unavailable(start_response)
+        return application(environ, start_response)
+
+    def _unavailable(self, start_response):
+        return self._respond(start_response, '503 Service Unavailable', {
+            "status": "unavailable",
+            "error": f"Échec du chargement de l'application : {str(self._error)}"
+        })
+
+    @staticmethod
+    def _respond(start_response, status, payload):
+        start_response(status, [
+            ('Content-Type', 'application/json'),
+            ('Access-Control-Allow-Origin', '*')
+        ])
+        return [json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n']
+
+
+def _load_app():
+    """Importe l'application Flask (routes, base de données) et démarre l'outbox"""
+    from app import app
+    from services.outbox import start_outbox_drainer
+    start_outbox_drainer()
+    return app
+
+
+def parse_args(argv=None):
+    """Analyse les options du serveur de production"""
+    parser = argparse.ArgumentParser(prog='serve', description="Serveur de production Chat to Notion")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help="Adresse d'écoute (0.0.0.0 pour un déploiement serveur)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port d'écoute")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help="Nombre de threads traitant les requêtes")
+    parser.add_argument('--backlog', type=int, default=DEFAULT_BACKLOG,
+                        help="Taille de la file de connexions en attente (listen backlog)")
+    parser.add_argument('--connection-limit', type=int, default=DEFAULT_CONNECTION_LIMIT,
+                        help="Nombre maximum de connexions ouvertes simultanément")
+    parser.add_argument('--channel-timeout', type=int, default=DEFAULT_CHANNEL_TIMEOUT,
+                        help="Durée (s) avant fermeture d'une connexion keep-alive inactive")
+    parser.add_argument('--drain-timeout', type=float, default=DEFAULT_DRAIN_TIMEOUT,
+                        help="Durée maximale (s) du drain des requêtes en cours à l'arrêt")
+    return parser.parse_args(argv)
+
+
+def create_production_server(application, options):
+    """Crée (et lie au port) le serveur waitress avec les réglages donnés"""
+    from waitress.server import create_server
+
+    return create_server(
+        application,
+        host=options.host,
+        port=options.port,
+        threads=options.threads,
+        backlog=options.backlog,
+        connection_limit=options.connection_limit,
+        channel_timeout=options.channel_timeout,
+        ident='chat-to-notion'
+    )
+
+
+def _has_pending_work(server):
+    """Indique si des requêtes sont en cours ou des réponses restent à envoyer"""
+    return any(
+        channel.requests or channel.total_outbufs_len
+        for channel in list(server.active_channels.values())
+    )
+
+
+def _stop_accepting(server):
+    """Ferme le socket d'écoute : les nouvelles connexions sont refusées"""
+    server.accepting = False
+    server.del_channel()
+    server.socket.close()
+
+
+def run_until_drained(server, stop_event, drain_timeout=DEFAULT_DRAIN_TIMEOUT):
+    """
+    Fait tourner la boucle du serveur jusqu'à `stop_event`, puis draine les
+    requêtes en cours (au plus `drain_timeout` secondes) avant de fermer
+    """
+    from waitress import wasyncore
+
+    deadline = None
+    while True:
+        if stop_event.is_set() and deadline is None:
+            deadline = time.monotonic() + drain_timeout
+            _stop_accepting(server)
+        if deadline is not None and (not _has_pending_work(server) or time.monotonic() >= deadline):
+            break
+        wasyncore.loop(
+            timeout=0.1 if deadline is not None else server.adj.asyncore_loop_timeout,
+            map=server._map,
+            use_poll=server.adj.asyncore_use_poll,
+            count=1
+        )
+
+    server.task_dispatcher.shutdown(cancel_pending=True, timeout=1)
+    server.trigger.close()
+    for channel in list(server.active_channels.values()):
+        channel.close()
+
+
+def main(argv=None, application=None):
+    """Point d'entrée de la commande `serve`"""
+    options = parse_args(argv)
+
+    lazy = application is None
+    if lazy:
+        application = LazyApplication(_load_app)
+    else:
+        from services.outbox import start_outbox_drainer
+        start_outbox_drainer()
+
+    # Lier le port avant de charger l'application
+    server = create_production_server(application, options)
+    if lazy:
+        threading.Thread(target=application.load, daemon=True).start()
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    print(f"Serving on http://{options.host}:{server.effective_port} ({options.threads} threads)", flush=True)
+    run_until_drained(server, stop_event, options.drain_timeout)
+    print("Server stopped", flush=True)
+
+
+if __name__ == '__main__':
+    main()
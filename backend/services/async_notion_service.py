@@ -0,0 +1,117 @@
+"""
+Variante asyncio du service Notion, basée sur notion_client.AsyncClient
+
+Les appels réseau sont des coroutines : de nombreuses pages peuvent progresser
+en parallèle sur un seul thread (point d'entrée ASGI, imports en masse).
+La préparation des payloads et le limiteur de débit sont partagés avec le
+service synchrone.
+"""
+import asyncio
+import httpx
+from notion_client.errors import APIResponseError, HTTPResponseError, RequestTimeoutError
+from services.rate_limiter import get_rate_limiter, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from services.jobs import Job
+from services.notion_service import (
+    MAX_RETRIES,
+    get_notion_client,
+    extract_detected_properties,
+    build_database_structure,
+    plan_page_payloads,
+    parse_response,
+    is_retryable_error,
+    PartialPagesError,
+    retry_delay
+)
+
+
+MAX_CONCURRENT_PAGES = 8
+
+
+async def retrieve_database(notion, database_id):
+    """databases.retrieve après un jeton du limiteur de débit partagé (file interactive)"""
+    await get_rate_limiter(notion.options.auth).acquire_async(PRIORITY_INTERACTIVE, database_id)
+    return await notion.databases.retrieve(database_id=database_id)
+
+
+async def detect_database_properties(notion, database_id):
+    """Détecte les propriétés title et date d'une base de données Notion"""
+    database = await retrieve_database(notion, database_id)
+    return extract_detected_properties(database)
+
+
+async def get_database_structure(notion, database_id):
+    """Récupère la structure complète de la base de données Notion"""
+    database = await retrieve_database(notion, database_id)
+    return build_database_structure(database)
+
+
+async def send_payload(notion, method, path, payload, priority=PRIORITY_INTERACTIVE, flow=None):
+    """Envoie un corps JSON déjà sérialisé, avec nouvelles tentatives"""
+    limiter = get_rate_limiter(notion.options.auth)
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire_async(priority, flow)
+        request = notion.client.build_request(
+            method, path, content=payload, headers={"Content-Type": "application/json"}
+        )
+        try:
+            response = await notion.client.send(request)
+        except httpx.TimeoutException:
+            raise RequestTimeoutError()
+        try:
+            return parse_response(response)
+        except (APIResponseError, HTTPResponseError) as e:
+            if attempt >= MAX_RETRIES or not is_retryable_error(e):
+                raise
+            await asyncio.sleep(retry_delay(e, attempt))
+
+
+async def create_notion_page_with_blocks(notion, database_id, properties, content, priority=PRIORITY_INTERACTIVE,
+                                         image_base_dir=None):
+    """
+    Crée une page Notion avec tous les blocs (lots envoyés dans l'ordre)
+
+    Le parsing et l'envoi des images locales et data URI (bloquants, voir
+    services/image_uploads.py) s'exécutent dans un thread, avec un client
+    synchrone pour la même clé API et dans la même file du limiteur de débit.
+
+    Raises:
+        PartialPagesError: si l'ajout d'un lot échoue après création de la page
+    """
+    job = Job('async', priority=priority, flow=database_id)
+    job.image_base_dir = image_base_dir
+    create_payload, append_payloads, blocks_count = await asyncio.to_thread(
+        plan_page_payloads, database_id, properties, content, job, get_notion_client(notion.options.auth)
+    )
+
+    response = await send_payload(notion, "POST", "pages", create_payload, priority, database_id)
+    page_id = response['id']
+
+    for payload in append_payloads:
+        try:
+            await send_payload(notion, "PATCH", f"blocks/{page_id}/children", payload, priority, database_id)
+        except Exception as e:
+            raise PartialPagesError(e, page_id) from e
+
+    return page_id, blocks_count
+
+
+async def create_notion_pages(notion, database_id, pages, max_concurrency=MAX_CONCURRENT_PAGES,
+                              priority=PRIORITY_BULK):
+    """
+    Crée plusieurs pages en parallèle sur la boucle d'événements courante
+
+    Args:
+        pages: Liste de tuples (properties, content)
+        max_concurrency: Nombre maximum de pages en cours simultanément
+        priority: File du limiteur de débit (par défaut : import en masse)
+
+    Returns:
+        list: Tuples (page_id, blocks_count) dans l'ordre de `pages`
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def create_one(properties, content):
+        async with semaphore:
+            return await create_notion_page_with_blocks(notion, database_id, properties, content, priority)
+
+    return await asyncio.gather(*(create_one(properties, content) for properties, content in pages))
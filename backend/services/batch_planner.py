@@ -0,0 +1,100 @@
+"""
+Planification des lots de blocs envoyés à Notion
+
+Notion limite chaque requête à 100 blocs de premier niveau, à 1000 éléments de
+bloc au total (enfants compris) et à une taille de payload d'environ 500 Ko.
+Chaque bloc est sérialisé une seule fois : les lots sont construits à partir des
+octets déjà encodés et réutilisés tels quels en cas de nouvelle tentative.
+Les blocs sont soit des dicts Notion, soit des blocs compacts (TextBlock)
+sérialisés directement par leur méthode to_json.
+"""
+import json
+
+
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_ELEMENTS_PER_REQUEST = 1000
+# Limite Notion de 500 Ko, avec une marge pour l'enveloppe de la requête
+MAX_PAYLOAD_BYTES = 450_000
+
+
+def serialize_json(value):
+    """Sérialise une valeur en JSON compact (octets UTF-8)"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def serialize_block(block):
+    """Sérialise un bloc Notion (dict ou bloc compact) en octets JSON"""
+    if isinstance(block, dict):
+        return serialize_json(block)
+    return block.to_json()
+
+
+def count_block_elements(block):
+    """Compte le nombre d'éléments de bloc (le bloc et ses enfants imbriqués)"""
+    if not isinstance(block, dict):
+        return 1
+    block_type = block.get('type')
+    children = block.get(block_type, {}).get('children', []) if block_type else []
+    return 1 + sum(count_block_elements(child) for child in children)
+
+
+def plan_block_batches(blocks, max_blocks=MAX_BLOCKS_PER_REQUEST, max_bytes=MAX_PAYLOAD_BYTES,
+                       max_elements=MAX_ELEMENTS_PER_REQUEST, first_batch_overhead=0):
+    """
+    Regroupe les blocs en lots respectant à la fois la limite de nombre de blocs,
+    d'éléments et de taille de payload.
+
+    Args:
+        blocks: Liste de blocs Notion (dicts ou blocs compacts)
+        first_batch_overhead: Octets déjà occupés dans le premier lot
+            (propriétés de la page lors de la création)
+
+    Returns:
+        list: Lots de blocs sérialisés (liste de listes d'octets)
+    """
+    batches = []
+    current = []
+    current_bytes = first_batch_overhead
+    current_elements = 0
+
+    for block in blocks:
+        data = serialize_block(block)
+        elements = count_block_elements(block)
+        # +1 pour la virgule séparant les blocs dans le tableau JSON
+        size = len(data) + 1
+
+        if current and (
+            len(current) >= max_blocks
+            or current_bytes + size > max_bytes
+            or current_elements + elements > max_elements
+        ):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+            current_elements = 0
+
+        current.append(data)
+        current_bytes += size
+        current_elements += elements
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def build_children_payload(serialized_blocks, fields=None):
+    """
+    Construit le corps JSON d'une requête à partir de blocs déjà sérialisés
+
+    Args:
+        serialized_blocks: Liste de blocs sérialisés (octets)
+        fields: Champs supplémentaires du corps (parent, properties...)
+
+    Returns:
+        bytes: Corps de la requête, prêt à être envoyé
+    """
+    prefix = b'{'
+    if fields:
+        prefix = serialize_json(fields)[:-1] + b','
+    return prefix + b'"children":[' + b','.join(serialized_blocks) + b']}'
@@ -0,0 +1,94 @@
+"""
+Historique des chats envoyés (table sent_chats et index plein texte)
+
+Les envois sont enregistrés hors du chemin critique : record_sent_chat place
+l'enregistrement dans une file, et un thread d'écriture les insère par lots
+(une transaction par lot) dans sent_chats et, si FTS5 est disponible, dans
+l'index de recherche. Le calcul de la taille du contenu est lui aussi fait
+par ce thread.
+"""
+import queue
+import threading
+from db import insert_sent_chats
+from services.chat_index import SEARCH_CONTENT_MAX_CHARS, search_index_available
+
+
+HISTORY_BATCH_SIZE = 100
+
+_pending = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _prepare(record):
+    """Complète un enregistrement (taille, extrait indexé) dans le thread d'écriture"""
+    content = record.pop('full_content')
+    record['bytes'] = len(content.encode('utf-8'))
+    record['content'] = content[:SEARCH_CONTENT_MAX_CHARS]
+    return record
+
+
+def _write_batch(records):
+    prepared = []
+    for record in records:
+        try:
+            prepared.append(_prepare(record))
+        except Exception as e:
+            # Un enregistrement invalide ne fait pas perdre le reste du lot
+            print(f"Enregistrement d'historique ignoré ({record.get('page_id')}) : {str(e)}")
+    if prepared:
+        insert_sent_chats(prepared, index_content=search_index_available())
+
+
+def _run_writer():
+    while True:
+        records = [_pending.get()]
+        while len(records) < HISTORY_BATCH_SIZE:
+            try:
+                records.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write_batch(records)
+        except Exception as e:
+            # Le thread doit survivre : flush_history() et les envois suivants en dépendent
+            print(f"Erreur lors de l'enregistrement de l'historique : {str(e)}")
+        finally:
+            for _ in records:
+                _pending.task_done()
+
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run_writer, name='history-writer', daemon=True)
+            _writer.start()
+
+
+def record_sent_chat(page_id, database_id, parsed_data, blocks_count, duration, status='sent'):
+    """
+    Enregistre un envoi dans l'historique (écriture asynchrone)
+
+    Args:
+        parsed_data: Résultat de parse_chat (titre, contenu, date)
+        duration: Durée de l'envoi en secondes
+        status: 'sent', 'cancelled' pour un envoi interrompu ou 'partial' pour
+            un envoi en échec après création de pages (page partielle)
+    """
+    _start_writer()
+    _pending.put({
+        "page_id": page_id,
+        "database_id": database_id,
+        "title": parsed_data['title'],
+        "date": parsed_data['date'],
+        "blocks_count": blocks_count,
+        "duration_ms": round(duration * 1000),
+        "status": status,
+        "full_content": parsed_data['content']
+    })
+
+
+def flush_history():
+    """Attend que tous les enregistrements en file soient écrits"""
+    _pending.join()
@@ -0,0 +1,50 @@
+"""
+Index plein texte local des chats envoyés
+
+Chaque chat envoyé (titre, début du contenu, date) est indexé dans la table
+FTS5 chat_search avec l'id de la page Notion créée (voir
+services/chat_history.py) : retrouver une conversation ne demande plus de
+databases.query paginées vers Notion. L'index est optionnel : si SQLite n'a
+pas FTS5, rien n'est indexé et la recherche est indisponible.
+"""
+import re
+from db import has_chat_search, search_sent_chats
+
+
+# Taille maximale du contenu indexé par chat
+SEARCH_CONTENT_MAX_CHARS = 20000
+SEARCH_TOKEN_PATTERN = re.compile(r'\w+')
+
+_available = None
+
+
+def search_index_available():
+    """Indique (une fois pour toutes) si l'index FTS5 existe"""
+    global _available
+    if _available is None:
+        _available = has_chat_search()
+    return _available
+
+
+def build_match_query(text):
+    """
+    Convertit une saisie libre en requête FTS5 : chaque mot est cité (aucune
+    syntaxe FTS5 interprétée), tous doivent être présents, le dernier en préfixe
+
+    Returns:
+        str: Requête MATCH, ou None si la saisie ne contient aucun mot
+    """
+    tokens = SEARCH_TOKEN_PATTERN.findall(text or '')
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_chats(text, limit=20):
+    """Recherche les chats envoyés correspondant à une saisie libre"""
+    match_query = build_match_query(text)
+    if match_query is None:
+        return []
+    return search_sent_chats(match_query, limit)
@@ -0,0 +1,77 @@
+"""
+Enregistrement différé des propriétés détectées (titre, date)
+
+Lorsqu'un envoi détecte la propriété titre ou date d'une base, la
+configuration est mise à jour hors du chemin critique : les sauvegardes sont
+regroupées par base (la dernière valeur l'emporte) et écrites après
+DISCOVERY_SAVE_DELAY secondes sans nouvelle détection. Une valeur identique à
+celle de la configuration (ou déjà en attente) n'est pas réécrite : une fois
+la configuration stabilisée, un envoi n'écrit plus rien.
+"""
+import atexit
+import threading
+from db import get_config, save_config
+
+
+DISCOVERY_SAVE_DELAY = 1.0
+
+# database_id -> (title_property, date_property)
+_pending = {}
+_pending_lock = threading.Lock()
+_timer = None
+
+
+def save_discovered_properties(config, title_property, date_property):
+    """
+    Planifie l'enregistrement des propriétés détectées si elles ont changé
+
+    Returns:
+        bool: True si une écriture a été planifiée
+    """
+    database_id = config['database_id']
+    value = (title_property, date_property)
+    with _pending_lock:
+        current = _pending.get(database_id)
+        if current is None:
+            current = (config.get('title_property'), config.get('date_property'))
+        if value == current:
+            return False
+        _pending[database_id] = value
+        _schedule()
+    return True
+
+
+def _schedule():
+    """(Re)lance le délai avant écriture (à appeler sous verrou)"""
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+    _timer = threading.Timer(DISCOVERY_SAVE_DELAY, flush_discovered_properties)
+    _timer.daemon = True
+    _timer.start()
+
+
+def flush_discovered_properties():
+    """Écrit immédiatement les propriétés détectées en attente"""
+    global _timer
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+
+    for database_id, (title_property, date_property) in pending.items():
+        config = get_config()
+        # La base configurée a pu changer entre-temps
+        if config is None or config['database_id'] != database_id:
+            continue
+        if (config['title_property'], config['date_property']) == (title_property, date_property):
+            continue
+        try:
+            save_config(config['api_key'], database_id, title_property, date_property)
+        except Exception as e:
+            print(f"Erreur lors de l'enregistrement des propriétés détectées : {str(e)}")
+
+
+atexit.register(flush_discovered_properties)
@@ -0,0 +1,226 @@
+"""
+Envoi des images locales et data URI référencées par le contenu
+
+Notion ne peut pas récupérer une image locale (chemin, file://) ni une data
+URI : ces images sont envoyées par l'API d'envoi de fichiers de Notion
+(file_uploads) et le bloc est réécrit vers le fichier hébergé. Pour les
+tests, IMAGE_STORE_DIR remplace Notion par un dossier local (les blocs
+pointent alors vers IMAGE_STORE_URL).
+
+Les envois se font en parallèle, une seule fois par contenu (empreinte
+SHA-256) : une même capture répétée dans un chat, ou d'un chat à l'autre tant
+que l'envoi n'a pas expiré, n'est envoyée qu'une fois.
+
+Les fichiers locaux ne sont lus que sous le dossier du job (image_base_dir)
+ou sous IMAGE_LOCAL_ROOT : sans l'un ou l'autre, seules les data URI sont
+acceptées. Une image illisible devient un paragraphe plutôt que de faire
+échouer le lot.
+"""
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+from parsers.block_types import TextBlock
+from services.batch_planner import serialize_json
+from services.jobs import JobCancelled
+from services.notion_service import send_payload
+
+
+MAX_UPLOAD_WORKERS = 4
+# Limite Notion d'un envoi en une seule partie
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# Notion supprime un fichier envoyé qui n'est rattaché à aucun bloc au bout d'une heure
+UPLOAD_CACHE_TTL = 50 * 60
+IMAGE_CONTENT_TYPES = frozenset({
+    'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/svg+xml', 'image/bmp',
+    'image/tiff', 'image/heic', 'image/x-icon', 'image/vnd.microsoft.icon'
+})
+
+IMAGE_LOCAL_ROOT = os.environ.get('IMAGE_LOCAL_ROOT')
+IMAGE_STORE_DIR = os.environ.get('IMAGE_STORE_DIR')
+IMAGE_STORE_URL = os.environ.get('IMAGE_STORE_URL')
+
+# (destination, empreinte) -> (contenu du bloc image, expiration)
+_upload_cache = {}
+_cache_lock = threading.Lock()
+
+
+class ImageUnavailable(Exception):
+    """Image illisible, trop grande ou hors des dossiers autorisés"""
+
+
+def needs_upload(block):
+    """Indique si le bloc est une image locale ou data URI à envoyer"""
+    return isinstance(block, dict) and block.get('type') == 'image' and block['image'].get('type') == 'file'
+
+
+def load_image_source(src, base_dir=None):
+    """
+    Lit une image locale ou une data URI
+
+    Returns:
+        tuple: (octets, type MIME, nom de fichier)
+
+    Raises:
+        ImageUnavailable
+    """
+    if src.startswith('data:'):
+        return _decode_data_uri(src)
+
+    path = unquote(urlparse(src).path) if src.startswith('file://') else src
+    roots = [os.path.realpath(root) for root in (base_dir, IMAGE_LOCAL_ROOT) if root]
+    if not roots:
+        raise ImageUnavailable("images locales désactivées (IMAGE_LOCAL_ROOT non défini)")
+    try:
+        path = os.path.realpath(os.path.join(roots[0], os.path.expanduser(path)))
+        # commonpath lève ValueError entre lecteurs Windows différents
+        allowed = any(os.path.commonpath([root, path]) == root for root in roots)
+    except ValueError:
+        allowed = False
+    if not allowed:
+        raise ImageUnavailable("chemin hors des dossiers autorisés")
+
+    content_type = mimetypes.guess_type(path)[0]
+    if content_type not in IMAGE_CONTENT_TYPES:
+        raise ImageUnavailable("type de fichier non pris en charge")
+    try:
+        if os.path.getsize(path) > MAX_IMAGE_BYTES:
+            raise ImageUnavailable("image trop volumineuse")
+        with open(path, 'rb') as image_file:
+            data = image_file.read()
+    except OSError as e:
+        raise ImageUnavailable(str(e))
+    return data, content_type, os.path.basename(path)
+
+
+def _decode_data_uri(src):
+    """Décode une data URI image (data:image/png;base64,...)"""
+    header, separator, payload = src[5:].partition(',')
+    if not separator:
+        raise ImageUnavailable("data URI invalide")
+    params = header.split(';')
+    content_type = params[0].lower() or 'text/plain'
+    if content_type not in IMAGE_CONTENT_TYPES:
+        raise ImageUnavailable("type de fichier non pris en charge")
+    try:
+        data = base64.b64decode(payload, validate=True) if 'base64' in params[1:] else unquote(payload).encode('utf-8')
+    except (binascii.Error, ValueError):
+        raise ImageUnavailable("data URI invalide")
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageUnavailable("image trop volumineuse")
+    extension = mimetypes.guess_extension(content_type) or ''
+    return data, content_type, f"image{extension}"
+
+
+def upload_image(notion, data, content_type, filename, job=None):
+    """Envoie une image par l'API file_uploads et retourne le contenu du bloc image"""
+    upload = send_payload(
+        notion, "POST", "file_uploads",
+        serialize_json({"filename": filename, "content_type": content_type}),
+        job
+    )
+    send_payload(
+        notion, "POST", f"file_uploads/{upload['id']}/send", None, job,
+        files={"file": (filename, data, content_type)}
+    )
+    return {"type": "file_upload", "file_upload": {"id": upload['id']}}
+
+
+def store_image_locally(data, digest, filename):
+    """Copie l'image dans IMAGE_STORE_DIR (remplaçant local de Notion) et retourne le contenu du bloc image"""
+    name = digest + os.path.splitext(filename)[1]
+    os.makedirs(IMAGE_STORE_DIR, exist_ok=True)
+    path = os.path.join(IMAGE_STORE_DIR, name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as image_file:
+            image_file.write(data)
+    base_url = IMAGE_STORE_URL or f"file://{os.path.abspath(IMAGE_STORE_DIR)}"
+    return {"type": "external", "external": {"url": f"{base_url.rstrip('/')}/{name}"}}
+
+
+def _hosted_image(notion, digest, data, content_type, filename, job):
+    """Référence hébergée d'une image, depuis le cache si elle a déjà été envoyée"""
+    # Un fichier envoyé appartient à l'intégration (clé API) ou au dossier local
+    key = (f"store:{IMAGE_STORE_DIR}" if IMAGE_STORE_DIR else notion.options.auth, digest)
+    with _cache_lock:
+        cached = _upload_cache.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+    if IMAGE_STORE_DIR:
+        image = store_image_locally(data, digest, filename)
+    else:
+        image = upload_image(notion, data, content_type, filename, job)
+    with _cache_lock:
+        _upload_cache[key] = (image, time.monotonic() + UPLOAD_CACHE_TTL)
+    return image
+
+
+def _unavailable_block(block, src):
+    """Paragraphe remplaçant une image qui n'a pas pu être envoyée"""
+    caption = ''.join(part['text']['content'] for part in block['image'].get('caption', []))
+    label = caption or ('data URI' if src.startswith('data:') else src)
+    return TextBlock("paragraph", f"[Image indisponible : {label[:1900]}]")
+
+
+def clear_upload_cache():
+    """Oublie les images déjà envoyées"""
+    with _cache_lock:
+        _upload_cache.clear()
+
+
+def resolve_block_images(notion, blocks, job=None, base_dir=None, max_workers=MAX_UPLOAD_WORKERS):
+    """
+    Remplace, dans `blocks` (modifiée en place), les images locales et data
+    URI par leur fichier hébergé
+
+    Returns:
+        int: Nombre d'images distinctes (par contenu)
+    """
+    targets = []
+    sources = {}
+    for index, block in enumerate(blocks):
+        if not needs_upload(block):
+            continue
+        src = block['image']['file']['url']
+        try:
+            data, content_type, filename = load_image_source(src, base_dir)
+        except ImageUnavailable as e:
+            print(f"Image ignorée ({e}): {src[:100]}")
+            blocks[index] = _unavailable_block(block, src)
+            continue
+        digest = hashlib.sha256(data).hexdigest()
+        sources.setdefault(digest, (data, content_type, filename))
+        targets.append((index, digest))
+
+    if not sources:
+        return 0
+
+    images = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sources))) as executor:
+        futures = {
+            digest: executor.submit(_hosted_image, notion, digest, *source, job)
+            for digest, source in sources.items()
+        }
+        for digest, future in futures.items():
+            try:
+                images[digest] = future.result()
+            except JobCancelled:
+                raise
+            except Exception as e:
+                print(f"Erreur lors de l'envoi d'une image: {str(e)}")
+                images[digest] = None
+
+    for index, digest in targets:
+        block = blocks[index]
+        image = images[digest]
+        if image is None:
+            blocks[index] = _unavailable_block(block, block['image']['file']['url'])
+        else:
+            blocks[index] = {**block, "image": {"caption": block['image'].get('caption', []), **image}}
+    return len(sources)
@@ -0,0 +1,112 @@
+"""
+Suivi des envois en cours : annulation et délais (deadlines)
+
+Chaque envoi de chat est enregistré comme un job identifié par un id (fourni par
+le client ou généré). Le job est vérifié pendant le parsing, entre les lots et
+pendant l'attente du limiteur de débit : une annulation ou un délai dépassé
+interrompt le travail immédiatement, sans consommer de jeton ni de slot.
+"""
+import threading
+import time
+import uuid
+from services.rate_limiter import PRIORITY_INTERACTIVE
+
+
+class JobCancelled(Exception):
+    """Levée lorsqu'un job est annulé ou a dépassé son délai"""
+
+    def __init__(self, reason='cancelled'):
+        super().__init__("Envoi annulé" if reason == 'cancelled' else "Délai d'envoi dépassé")
+        self.reason = reason
+        self.page_id = None
+        # Pages de tours déjà créées (mode par message)
+        self.page_ids = []
+
+
+class Job:
+    """
+    Envoi en cours, annulable, avec délai optionnel
+
+    `priority` et `flow` (la base de données visée) déterminent la file du
+    limiteur de débit dans laquelle le job attend ses jetons.
+    """
+
+    def __init__(self, job_id, timeout=None, priority=PRIORITY_INTERACTIVE, flow=None):
+        self.id = job_id
+        self.started_at = time.monotonic()
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.priority = priority
+        self.flow = flow
+        # Profil mémoire par étape (services.memory_profiler), si activé
+        self.profile = None
+        # Règles de parsing actives (configuration), None pour celles par défaut
+        self.parser_rules = None
+        # Dossier des images locales référencées par le contenu (None : IMAGE_LOCAL_ROOT)
+        self.image_base_dir = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Demande l'annulation du job"""
+        self._cancelled.set()
+
+    def remaining(self):
+        """Temps restant avant le délai (None si pas de délai)"""
+        if self.deadline is None:
+            return None
+        return max(0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Lève JobCancelled si le job est annulé ou a dépassé son délai"""
+        if self._cancelled.is_set():
+            raise JobCancelled('cancelled')
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise JobCancelled('deadline')
+
+    def sleep(self, seconds):
+        """Attend `seconds`, en se réveillant dès une annulation ou au délai"""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._cancelled.wait(seconds)
+        self.check()
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_job(job_id=None, timeout=None, priority=PRIORITY_INTERACTIVE, flow=None):
+    """
+    Enregistre un nouveau job
+
+    Raises:
+        ValueError: si un job avec le même id est déjà en cours
+    """
+    job = Job(job_id or uuid.uuid4().hex, timeout, priority, flow)
+    with _jobs_lock:
+        if job.id in _jobs:
+            raise ValueError(f"Un envoi avec l'identifiant '{job.id}' est déjà en cours")
+        _jobs[job.id] = job
+    return job
+
+
+def get_job(job_id):
+    """Retourne le job en cours pour un id, ou None"""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def cancel_job(job_id):
+    """Annule un job en cours ; retourne False s'il n'existe pas"""
+    job = get_job(job_id)
+    if job is None:
+        return False
+    job.cancel()
+    return True
+
+
+def end_job(job):
+    """Retire un job terminé du registre"""
+    with _jobs_lock:
+        if _jobs.get(job.id) is job:
+            del _jobs[job.id]
@@ -0,0 +1,148 @@
+"""
+Profilage mémoire par étape des envois (mode opt-in)
+
+Activé par la variable d'environnement MEMORY_PROFILE=1 (rapport ajouté en
+JSON Lines au fichier MEMORY_PROFILE_LOG) ou par le paramètre de requête
+?profileMemory=1 (rapport renvoyé dans la section `debug` de la réponse).
+
+Pour chaque étape (parse_chat, parse_content_to_notion_blocks, images,
+batching, upload), tracemalloc mesure le pic mémoire, la mémoire encore allouée en fin
+d'étape et les sites d'allocation principaux. tracemalloc est global au
+processus : seuls son démarrage et les mesures sont protégés par un verrou
+(les étapes, envoi à Notion compris, s'exécutent en parallèle), si bien que
+les allocations des autres requêtes en cours sont comptées avec elles.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from db import DB_PATH
+
+
+MEMORY_PROFILE_TOP = 5
+MEMORY_PROFILE_FRAMES = 1
+MEMORY_PROFILE_LOG = os.environ.get(
+    'MEMORY_PROFILE_LOG', os.path.join(os.path.dirname(DB_PATH), 'memory_profile.log')
+)
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_log_lock = threading.Lock()
+
+
+def memory_profiling_enabled():
+    """Indique si le profilage est activé pour tous les envois (MEMORY_PROFILE)"""
+    return os.environ.get('MEMORY_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+def _start_tracing():
+    """Démarre tracemalloc pour une étape de plus (à appeler sous _tracing_lock)"""
+    global _tracing_users
+    if _tracing_users == 0 and not tracemalloc.is_tracing():
+        tracemalloc.start(MEMORY_PROFILE_FRAMES)
+        _tracing_users = 1
+    elif _tracing_users:
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    """Arrête tracemalloc après la dernière étape qui l'a démarré (à appeler sous _tracing_lock)"""
+    global _tracing_users
+    if _tracing_users:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+class MemoryProfile:
+    """Mesures mémoire des étapes d'un envoi"""
+
+    def __init__(self, respond=False, log=False, top=MEMORY_PROFILE_TOP):
+        self.respond = respond
+        self.log = log
+        self.top = top
+        self.stages = []
+        self._lock = threading.Lock()
+        self._active = False
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mesure une étape. Une étape lancée pendant une autre (pages en
+        parallèle du mode par message) est comptée dans l'étape en cours.
+        """
+        with self._lock:
+            nested = self._active
+            self._active = True
+        if nested:
+            yield
+            return
+
+        try:
+            with _tracing_lock:
+                _start_tracing()
+                tracemalloc.reset_peak()
+                before = tracemalloc.take_snapshot()
+                start_current = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                duration = time.perf_counter() - start
+                with _tracing_lock:
+                    current, peak = tracemalloc.get_traced_memory()
+                    after = tracemalloc.take_snapshot()
+                    _stop_tracing()
+                self.stages.append({
+                    "stage": name,
+                    "durationMs": round(duration * 1000, 1),
+                    "peakBytes": max(peak - start_current, 0),
+                    "retainedBytes": current - start_current,
+                    "top": self._top_sites(before, after)
+                })
+        finally:
+            with self._lock:
+                self._active = False
+
+    def _top_sites(self, before, after):
+        """Sites ayant le plus alloué (encore alloué en fin d'étape)"""
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        diffs = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+        return [
+            {
+                "site": f"{diff.traceback[0].filename}:{diff.traceback[0].lineno}",
+                "sizeBytes": diff.size_diff,
+                "count": diff.count_diff
+            }
+            for diff in diffs[:self.top] if diff.size_diff > 0
+        ]
+
+    def report(self):
+        """Rapport sérialisable des étapes mesurées"""
+        return {"stages": self.stages}
+
+    def write_log(self, path=None, **context):
+        """Ajoute le rapport (une ligne JSON) au fichier de log (MEMORY_PROFILE_LOG par défaut)"""
+        line = json.dumps({"time": datetime.now().isoformat(), **context, **self.report()}, ensure_ascii=False)
+        with _log_lock:
+            with open(path or MEMORY_PROFILE_LOG, 'a', encoding='utf-8') as log:
+                log.write(line + '\n')
+
+    def finish(self, payload, **context):
+        """Écrit le rapport dans le log et/ou l'ajoute à la section `debug` de la réponse"""
+        if self.log:
+            self.write_log(**context)
+        if self.respond:
+            payload.setdefault("debug", {})["memory"] = self.report()
+        return payload
+
+
+def profile_stage(job, name):
+    """Contexte de mesure d'une étape si le job est profilé, sinon sans effet"""
+    profile = getattr(job, 'profile', None)
+    if profile is None:
+        return nullcontext()
+    return profile.stage(name)
@@ -1,19 +1,70 @@
 """
 Service pour gérer les interactions avec Notion
 """
-from notion_client import Client
-from db import save_config, get_config
-from utils.property_formatter import format_notion_property
-from parsers.content_parser import parse_content_to_notion_blocks
-from parsers.chat_parser import parse_chat
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.config_writer import save_discovered_properties
+from utils.property_formatter import format_notion_property, split_multi_select_value
+from services.rate_limiter import get_rate_limiter
+from services.jobs import JobCancelled
+from services.memory_profiler import profile_stage
+from services.batch_planner import (
+    plan_block_batches,
+    build_children_payload,
+    serialize_json
+)
 
 
-MAX_BLOCKS_PER_REQUEST = 100
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRYABLE_ERROR_CODES = ('rate_limited', 'service_unavailable')
+MAX_PAGE_WORKERS = 4
+
+
+class PartialPagesError(Exception):
+    """
+    Échec d'un envoi alors que des pages ont déjà été créées dans Notion
+
+    `page_id` est la page créée (tronquée, ou page de conversation du mode par
+    message), `page_ids` les pages de tours de parole déjà créées : elles
+    restent dans Notion et peuvent être supprimées ou complétées.
+    """
+
+    def __init__(self, error, page_id, page_ids=()):
+        super().__init__(str(error))
+        self.error = error
+        self.page_id = page_id
+        self.page_ids = list(page_ids)
+
+
+def get_notion_client(api_key):
+    """
+    Crée un client Notion
+
+    notion_client (et httpx) sont importés à la première utilisation pour ne pas
+    ralentir le démarrage du serveur.
+    """
+    from notion_client import Client
+    return Client(auth=api_key)
+
+
+def retrieve_database(notion, database_id):
+    """
+    Récupère le schéma d'une base (databases.retrieve) après avoir pris un jeton
+    du limiteur de débit partagé (file interactive)
+    """
+    get_rate_limiter(notion.options.auth).acquire()
+    return notion.databases.retrieve(database_id=database_id)
 
 
 def detect_database_properties(notion, database_id):
     """Détecte les propriétés title et date d'une base de données Notion"""
-    database = notion.databases.retrieve(database_id=database_id)
+    database = retrieve_database(notion, database_id)
+    return extract_detected_properties(database)
+
+
+def extract_detected_properties(database):
+    """Extrait les propriétés title et date d'une base de données déjà récupérée"""
     properties = database.get('properties', {})
     
     title_property = None
@@ -33,7 +84,12 @@ def get_database_structure(notion, database_id):
     """
     Récupère la structure complète de la base de données Notion avec toutes les métadonnées
     """
-    database = notion.databases.retrieve(database_id=database_id)
+    database = retrieve_database(notion, database_id)
+    return build_database_structure(database)
+
+
+def build_database_structure(database):
+    """Construit la structure d'une base de données déjà récupérée"""
     properties = database.get('properties', {})
     
     # Extraire les informations de la base de données
@@ -125,8 +181,13 @@ def _extract_property_info(prop_name, prop_data):
     return property_info
 
 
-def build_notion_properties(config, parsed_data, additional_property_values, db_properties):
-    """Construit les propriétés Notion pour la création de page"""
+def build_notion_properties(config, parsed_data, additional_property_values, db_properties, formatters=None):
+    """
+    Construit les propriétés Notion pour la création de page
+
+    `formatters` (optionnel) : formateurs compilés du schéma {nom: formateur},
+    voir compile_property_formatters.
+    """
     title_property = config.get('title_property')
     date_property = config.get('date_property')
     
@@ -151,24 +212,19 @@ def build_notion_properties(config, parsed_data, additional_property_values, db_
                 properties[date_property] = {
                     "date": {"start": parsed_data['date']}
                 }
-                # Sauvegarder la propriété date trouvée
-                save_config(
-                    config['api_key'],
-                    config['database_id'],
-                    title_property,
-                    date_property,
-                    config.get('additional_properties'),
-                    config.get('dynamic_fields')
-                )
+                # Sauvegarder la propriété date trouvée (écriture différée)
+                save_discovered_properties(config, title_property, date_property)
                 break
     
     # Ajouter les propriétés supplémentaires
     missing_properties = []
     for prop_name, prop_value in additional_property_values.items():
         if prop_value and prop_name in db_properties:
-            prop_data = db_properties[prop_name]
-            prop_type = prop_data.get('type', '')
-            formatted_property = format_notion_property(prop_type, prop_value, prop_data)
+            if formatters is not None:
+                formatted_property = formatters[prop_name](prop_value)
+            else:
+                prop_data = db_properties[prop_name]
+                formatted_property = format_notion_property(prop_data.get('type', ''), prop_value, prop_data)
             if formatted_property:
                 properties[prop_name] = formatted_property
         elif prop_value:
@@ -177,32 +233,358 @@ def build_notion_properties(config, parsed_data, additional_property_values, db_
     return properties, date_property, missing_properties
 
 
-def create_notion_page_with_blocks(notion, database_id, properties, content):
-    """Crée une page Notion avec tous les blocs, en gérant la limite de 100 blocs"""
-    all_children = parse_content_to_notion_blocks(content)
-    
-    # Créer la page avec les 100 premiers blocs
-    initial_children = all_children[:MAX_BLOCKS_PER_REQUEST]
-    response = notion.pages.create(
-        parent={"database_id": database_id},
-        properties=properties,
-        children=initial_children
+def collect_missing_select_options(db_properties, value_sets):
+    """
+    Collecte les valeurs select/multi_select qui ne sont pas des options existantes
+
+    Args:
+        value_sets: Liste de dictionnaires {property_name: value}
+
+    Returns:
+        dict: {property_name: [nouveaux noms d'options]} (ordre d'apparition, sans doublon)
+    """
+    missing = {}
+    for values in value_sets:
+        for prop_name, value in values.items():
+            prop_data = db_properties.get(prop_name)
+            if not value or prop_data is None:
+                continue
+            prop_type = prop_data.get('type')
+            if prop_type == 'select':
+                names = [str(value)]
+            elif prop_type == 'multi_select':
+                names = [name for name in split_multi_select_value(value) if name]
+            else:
+                continue
+            existing = {opt['name'] for opt in prop_data.get(prop_type, {}).get('options', [])}
+            new_names = missing.setdefault(prop_name, [])
+            for name in names:
+                if name not in existing and name not in new_names:
+                    new_names.append(name)
+    return {prop_name: names for prop_name, names in missing.items() if names}
+
+
+def add_select_options(notion, database_id, db_properties, missing_options):
+    """
+    Ajoute les options manquantes en un seul appel databases.update
+
+    Returns:
+        dict: La base de données mise à jour (réponse de Notion)
+    """
+    properties = {}
+    for prop_name, new_names in missing_options.items():
+        prop_type = db_properties[prop_name]['type']
+        existing = db_properties[prop_name].get(prop_type, {}).get('options', [])
+        properties[prop_name] = {
+            prop_type: {
+                "options": [{"name": opt['name']} for opt in existing] + [{"name": name} for name in new_names]
+            }
+        }
+    get_rate_limiter(notion.options.auth).acquire()
+    return notion.databases.update(database_id=database_id, properties=properties)
+
+
+def send_payload(notion, method, path, payload, job=None, files=None):
+    """
+    Envoie un corps JSON déjà sérialisé à l'API Notion
+
+    Les nouvelles tentatives (rate limit, service indisponible) réutilisent les
+    mêmes octets, sans ré-encodage. Si `job` est annulé, l'attente du limiteur
+    ou d'une nouvelle tentative s'interrompt immédiatement. `files` envoie un
+    formulaire multipart à la place du JSON (envoi de fichiers).
+    """
+    import httpx
+    from notion_client.errors import APIResponseError, HTTPResponseError, RequestTimeoutError
+
+    limiter = get_rate_limiter(notion.options.auth)
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(job)
+        if files is not None:
+            request = notion.client.build_request(method, path, files=files)
+        else:
+            request = notion.client.build_request(
+                method, path, content=payload, headers={"Content-Type": "application/json"}
+            )
+        try:
+            response = notion.client.send(request)
+        except httpx.TimeoutException:
+            raise RequestTimeoutError()
+        try:
+            return parse_response(response)
+        except (APIResponseError, HTTPResponseError) as e:
+            if attempt >= MAX_RETRIES or not is_retryable_error(e):
+                raise
+            if job is not None:
+                job.sleep(retry_delay(e, attempt))
+            else:
+                time.sleep(retry_delay(e, attempt))
+
+
+def parse_response(response):
+    """
+    Décode la réponse de l'API Notion, ou lève l'erreur correspondant à son statut
+
+    Raises:
+        APIResponseError: erreur Notion avec un code connu (rate_limited...)
+        HTTPResponseError: autre réponse en erreur
+    """
+    from notion_client.errors import APIResponseError, HTTPResponseError, is_api_error_code
+
+    if response.is_error:
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        code = body.get('code') if isinstance(body, dict) else None
+        if is_api_error_code(code):
+            raise APIResponseError(response, body.get('message', ''), code)
+        raise HTTPResponseError(response)
+    return response.json()
+
+
+def is_retryable_error(error):
+    """Indique si une erreur Notion peut être retentée sans risque"""
+    from notion_client.errors import APIResponseError
+
+    if isinstance(error, APIResponseError):
+        return error.code in RETRYABLE_ERROR_CODES
+    return error.status in (429, 503)
+
+
+def retry_delay(error, attempt):
+    """Délai avant nouvelle tentative (Retry-After ou backoff exponentiel)"""
+    retry_after = error.headers.get('retry-after') if error.headers else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return RETRY_BASE_DELAY * (2 ** attempt)
+
+
+def plan_page_payloads(database_id, properties, content, job=None, notion=None):
+    """
+    Parse le contenu et prépare les corps de requête sérialisés d'une page
+
+    Si `notion` est fourni, les images locales et data URI sont d'abord
+    envoyées (services/image_uploads.py) et remplacées par leur référence.
+
+    Returns:
+        tuple: (payload de création, [payloads d'ajout de blocs], nombre de blocs)
+    """
+    from parsers.content_parser import parse_content_to_notion_blocks
+
+    with profile_stage(job, 'parse_content_to_notion_blocks'):
+        all_children = parse_content_to_notion_blocks(
+            content,
+            check=job.check if job else None,
+            rules=job.parser_rules if job else None
+        )
+
+    if notion is not None:
+        from services.image_uploads import needs_upload, resolve_block_images
+
+        if any(needs_upload(block) for block in all_children):
+            with profile_stage(job, 'images'):
+                resolve_block_images(notion, all_children, job, base_dir=job.image_base_dir if job else None)
+
+    with profile_stage(job, 'batching'):
+        page_fields = {
+            "parent": {"database_id": database_id},
+            "properties": properties
+        }
+        batches = plan_block_batches(
+            all_children,
+            first_batch_overhead=len(serialize_json(page_fields))
+        )
+
+        create_payload = build_children_payload(batches[0] if batches else [], page_fields)
+        append_payloads = [build_children_payload(batch) for batch in batches[1:]]
+    return create_payload, append_payloads, len(all_children)
+
+
+def iter_create_notion_page_with_blocks(notion, database_id, properties, content, job=None):
+    """
+    Crée une page Notion en émettant un événement de progression à chaque étape
+
+    Événements produits (dict) :
+        {"event": "parsed", "blocks": n, "batches": m}
+        {"event": "page_created", "pageId": id}
+        {"event": "batch", "batch": k, "batches": m}
+        {"event": "batch", "batch": k, "batches": m, "error": message}
+
+    Si l'ajout d'un lot échoue, l'envoi s'arrête et PartialPagesError est levée
+    avec l'id de la page (contenu tronqué). Si `job` est annulé ou dépasse son délai, JobCancelled est levée entre deux
+    lots (avec `page_id` renseigné si la page a déjà été créée).
+
+    Returns (valeur de retour du générateur, via `yield from`):
+        tuple: (page_id, blocks_count)
+    """
+    create_payload, append_payloads, blocks_count = plan_page_payloads(
+        database_id, properties, content, job, notion
     )
-    
-    page_id = response['id']
-    
-    # Ajouter les blocs restants par lots de 100
-    remaining_blocks = all_children[MAX_BLOCKS_PER_REQUEST:]
-    if remaining_blocks:
-        for i in range(0, len(remaining_blocks), MAX_BLOCKS_PER_REQUEST):
-            batch = remaining_blocks[i:i + MAX_BLOCKS_PER_REQUEST]
-            try:
-                notion.blocks.children.append(
-                    block_id=page_id,
-                    children=batch
-                )
-            except Exception as e:
-                print(f"Erreur lors de l'ajout des blocs supplémentaires: {str(e)}")
-    
-    return page_id, len(all_children)
+    batches_count = 1 + len(append_payloads)
+    yield {"event": "parsed", "blocks": blocks_count, "batches": batches_count}
+
+    with profile_stage(job, 'upload'):
+        # Créer la page avec le premier lot
+        response = send_payload(notion, "POST", "pages", create_payload, job)
+
+        page_id = response['id']
+        yield {"event": "page_created", "pageId": page_id}
+        yield {"event": "batch", "batch": 1, "batches": batches_count}
+
+        # Ajouter les lots restants ; un lot en échec (après nouvelles
+        # tentatives) arrête l'envoi : la page est signalée comme partielle
+        try:
+            for index, payload in enumerate(append_payloads, start=2):
+                try:
+                    send_payload(notion, "PATCH", f"blocks/{page_id}/children", payload, job)
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    yield {"event": "batch", "batch": index, "batches": batches_count, "error": str(e)}
+                    raise PartialPagesError(e, page_id) from e
+                yield {"event": "batch", "batch": index, "batches": batches_count}
+        except JobCancelled as cancelled:
+            cancelled.page_id = page_id
+            raise
+
+    return page_id, blocks_count
+
+
+def create_notion_page_with_blocks(notion, database_id, properties, content, job=None):
+    """
+    Crée une page Notion avec tous les blocs, en découpant les blocs en lots
+    selon les limites de nombre de blocs et de taille de payload
+    """
+    events = iter_create_notion_page_with_blocks(notion, database_id, properties, content, job)
+    while True:
+        try:
+            next(events)
+        except StopIteration as done:
+            return done.value
+
+
+def iter_create_message_pages(notion, database_id, parent_properties, turns, build_turn_properties,
+                              max_workers=MAX_PAGE_WORKERS, job=None):
+    """
+    Crée une page de conversation puis une page par tour de parole, en parallèle,
+    en émettant un événement à chaque page créée
+
+    Événements produits (dict) :
+        {"event": "page_created", "pageId": id}  (page de conversation)
+        {"event": "message", "message": k, "messages": n, "pageId": id, "blocks": b}
+            (dans l'ordre de fin des pages de tours)
+
+    Une fois les pages de tours créées, la page de conversation reçoit un lien
+    (bloc link_to_page) vers chacune, dans l'ordre des tours.
+
+    Si `job` est annulé, les pages non commencées sont abandonnées et les
+    workers libérés ; JobCancelled est levée avec l'id de la page parente et
+    ceux des pages de tours créées (`page_ids`). Si une page échoue, le job est
+    annulé, les pages en cours sont attendues, puis PartialPagesError est
+    levée avec les mêmes ids.
+
+    Returns (valeur de retour du générateur, via `yield from`):
+        tuple: (parent_page_id, [(page_id, blocks_count), ...] dans l'ordre des tours)
+    """
+    parent_page_id, _ = create_notion_page_with_blocks(notion, database_id, parent_properties, '', job)
+    yield {"event": "page_created", "pageId": parent_page_id}
+
+    def create_turn_page(index_turn):
+        index, turn = index_turn
+        if job is not None:
+            job.check()
+        properties = build_turn_properties(index, turn, parent_page_id)
+        return create_notion_page_with_blocks(notion, database_id, properties, turn['content'], job)
+
+    # Le pool borne la concurrence ; le limiteur partagé borne le débit
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(create_turn_page, item) for item in enumerate(turns, start=1)]
+    indexes = {future: index for index, future in enumerate(futures, start=1)}
+    try:
+        for future in as_completed(futures):
+            page_id, blocks_count = future.result()
+            yield {
+                "event": "message", "message": indexes[future], "messages": len(turns),
+                "pageId": page_id, "blocks": blocks_count
+            }
+    except GeneratorExit:
+        # Stream fermé par le client : arrêter les pages en cours
+        if job is not None:
+            job.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    except Exception as error:
+        # Arrêter les pages en cours (vérification du job) avant de lister celles créées
+        if job is not None:
+            job.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+        created = _created_page_ids(futures)
+        if isinstance(error, JobCancelled):
+            error.page_id = parent_page_id
+            error.page_ids = created
+            raise
+        raise PartialPagesError(error, parent_page_id, created) from error
+    executor.shutdown()
+    turn_pages = [future.result() for future in futures]
+
+    page_ids = [page_id for page_id, _ in turn_pages]
+    try:
+        link_child_pages(notion, parent_page_id, page_ids, job)
+    except JobCancelled as cancelled:
+        cancelled.page_id = parent_page_id
+        cancelled.page_ids = page_ids
+        raise
+    except Exception as e:
+        raise PartialPagesError(e, parent_page_id, page_ids) from e
+
+    return parent_page_id, turn_pages
+
+
+def create_message_pages(notion, database_id, parent_properties, turns, build_turn_properties,
+                         max_workers=MAX_PAGE_WORKERS, job=None):
+    """
+    Crée une page de conversation puis une page par tour de parole, en parallèle
+    (voir iter_create_message_pages)
+
+    Args:
+        parent_properties: Propriétés de la page de conversation
+        turns: Liste de tours ({"role", "content"}) issus de split_chat_turns
+        build_turn_properties: Fonction (index, turn, parent_page_id) -> propriétés
+            de la page du tour
+
+    Returns:
+        tuple: (parent_page_id, [(page_id, blocks_count), ...] dans l'ordre des tours)
+    """
+    events = iter_create_message_pages(
+        notion, database_id, parent_properties, turns, build_turn_properties, max_workers, job
+    )
+    while True:
+        try:
+            next(events)
+        except StopIteration as done:
+            return done.value
+
+
+def link_child_pages(notion, page_id, child_page_ids, job=None):
+    """Ajoute à une page un lien (bloc link_to_page) vers chacune des pages données"""
+    blocks = [
+        {"object": "block", "type": "link_to_page", "link_to_page": {"type": "page_id", "page_id": child_id}}
+        for child_id in child_page_ids
+    ]
+    for batch in plan_block_batches(blocks):
+        send_payload(notion, "PATCH", f"blocks/{page_id}/children", build_children_payload(batch), job)
+
 
+def _created_page_ids(futures):
+    """Ids des pages créées (même partiellement) par des envois terminés"""
+    page_ids = []
+    for future in futures:
+        if future.cancelled():
+            continue
+        error = future.exception()
+        if error is None:
+            page_ids.append(future.result()[0])
+        elif getattr(error, 'page_id', None):
+            page_ids.append(error.page_id)
+    return page_ids
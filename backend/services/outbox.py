@@ -0,0 +1,179 @@
+"""
+Outbox locale des chats acceptés en différé
+
+Un chat envoyé avec `deferred` est d'abord écrit dans la table chat_outbox
+(SQLite) puis acquitté immédiatement. Un thread de fond livre les entrées à
+Notion dans l'ordre d'acceptation :
+- une erreur temporaire (réseau, délai dépassé, 429, 5xx) bloque la file et
+  l'entrée est retentée avec un backoff exponentiel ;
+- une erreur définitive (requête refusée par Notion, titre introuvable...)
+  marque l'entrée 'failed' et la file continue.
+
+La livraison est « au moins une fois » : un arrêt entre la création de la page
+et l'enregistrement du succès peut produire un doublon au redémarrage.
+"""
+import threading
+import time
+from db import get_config, add_outbox_entry, get_next_outbox_entry, update_outbox_entry
+from parsers.chat_parser import parse_chat
+from services.rate_limiter import PRIORITY_BACKGROUND
+from services.jobs import Job
+from services.chat_history import record_sent_chat
+from services.schema_cache import get_database_schema, ensure_select_options
+from services.notion_service import (
+    get_notion_client,
+    build_notion_properties,
+    create_notion_page_with_blocks,
+    is_retryable_error,
+    PartialPagesError
+)
+
+
+OUTBOX_BASE_DELAY = 2.0
+OUTBOX_MAX_DELAY = 300.0
+OUTBOX_IDLE_INTERVAL = 30.0
+
+
+class OutboxNotReady(Exception):
+    """La livraison n'est pas possible pour l'instant (configuration absente)"""
+
+
+def is_transient_error(error):
+    """Indique si une livraison échouée doit être retentée plus tard"""
+    import httpx
+    from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+    if isinstance(error, (OutboxNotReady, RequestTimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, HTTPResponseError):
+        return is_retryable_error(error) or error.status >= 500
+    return False
+
+
+def deliver_chat(payload, priority=PRIORITY_BACKGROUND, image_base_dir=None):
+    """
+    Envoie à Notion un chat de l'outbox ou d'un import (mode conversation)
+
+    Les appels passent par la file `priority` du limiteur de débit (file de
+    fond par défaut) : les envois interactifs sont servis en priorité. `image_base_dir` est le
+    dossier des images locales référencées par le contenu (import en ligne de
+    commande).
+
+    Returns:
+        str: L'id de la page créée
+    """
+    config = get_config()
+    if not config:
+        raise OutboxNotReady("Notion n'est pas configuré")
+    started_at = time.monotonic()
+
+    notion = get_notion_client(config['api_key'])
+    parsed_data = parse_chat(payload['content'], payload.get('date'))
+    additional_property_values = payload.get('additionalProperties', {})
+
+    if payload.get('autoCreateOptions'):
+        schema, _ = ensure_select_options(notion, config['database_id'], [additional_property_values])
+    else:
+        schema = get_database_schema(notion, config['database_id'])
+
+    if not config.get('title_property'):
+        title_property, _, _ = schema.detect()
+        if not title_property:
+            raise ValueError("Aucune propriété de type 'title' trouvée dans la base de données")
+        config = dict(config, title_property=title_property)
+
+    properties, _, _ = build_notion_properties(
+        config,
+        parsed_data,
+        additional_property_values,
+        schema.properties,
+        schema.formatters
+    )
+    job = Job('outbox', priority=priority, flow=config['database_id'])
+    job.parser_rules = config.get('parser_rules')
+    job.image_base_dir = image_base_dir
+    try:
+        page_id, blocks_count = create_notion_page_with_blocks(
+            notion,
+            config['database_id'],
+            properties,
+            parsed_data['content'],
+            job
+        )
+    except PartialPagesError as e:
+        # Page tronquée : pas de nouvelle tentative, qui créerait un doublon
+        record_sent_chat(e.page_id, config['database_id'], parsed_data, 0,
+                         time.monotonic() - started_at, 'partial')
+        raise
+    record_sent_chat(page_id, config['database_id'], parsed_data, blocks_count, time.monotonic() - started_at)
+    return page_id
+
+
+def drain_outbox():
+    """
+    Livre les entrées en attente, dans l'ordre, jusqu'à ce que la file soit vide
+    ou que l'entrée en tête doive être retentée plus tard
+
+    Returns:
+        float: Délai (s) avant la prochaine tentative, ou None si la file est vide
+    """
+    while True:
+        entry = get_next_outbox_entry()
+        if entry is None:
+            return None
+
+        wait = entry['next_attempt_at'] - time.time()
+        if wait > 0:
+            return wait
+
+        attempts = entry['attempts'] + 1
+        try:
+            page_id = deliver_chat(entry['payload'])
+        except Exception as e:
+            if not is_transient_error(e):
+                update_outbox_entry(entry['id'], 'failed', attempts, last_error=str(e),
+                                    notion_page_id=getattr(e, 'page_id', None))
+                continue
+            delay = min(OUTBOX_MAX_DELAY, OUTBOX_BASE_DELAY * (2 ** (attempts - 1)))
+            update_outbox_entry(entry['id'], 'pending', attempts, time.time() + delay, str(e))
+            return delay
+
+        update_outbox_entry(entry['id'], 'sent', attempts, notion_page_id=page_id)
+
+
+_wake = threading.Event()
+_drainer = None
+_drainer_lock = threading.Lock()
+
+
+def _run_drainer():
+    while True:
+        _wake.clear()
+        try:
+            delay = drain_outbox()
+        except Exception as e:
+            print(f"Erreur de l'outbox : {e}", flush=True)
+            delay = OUTBOX_IDLE_INTERVAL
+        _wake.wait(OUTBOX_IDLE_INTERVAL if delay is None else delay)
+
+
+def start_outbox_drainer():
+    """Démarre (une seule fois) le thread de livraison de l'outbox"""
+    global _drainer
+    with _drainer_lock:
+        if _drainer is None:
+            _drainer = threading.Thread(target=_run_drainer, name='outbox-drainer', daemon=True)
+            _drainer.start()
+
+
+def enqueue_chat(payload):
+    """
+    Écrit un chat dans l'outbox et réveille le thread de livraison
+
+    Returns:
+        int: L'id de l'entrée
+    """
+    entry_id = add_outbox_entry(payload)
+    start_outbox_drainer()
+    _wake.set()
+    return entry_id
@@ -15,71 +15,96 @@ def validate_property_value(property_info, value):
     Returns:
         tuple: (is_valid, error_message)
     """
+    return compile_property_validator(property_info)(value)
+
+
+def compile_property_validator(property_info):
+    """
+    Compile le validateur d'une propriété : la dispatch sur le type et la
+    préparation des options ne sont faites qu'une fois par propriété
+
+    Returns:
+        function: value -> (is_valid, error_message)
+    """
     prop_type = property_info.get('type')
     prop_name = property_info.get('name', 'Unknown')
-    
-    if value is None or value == '':
-        if property_info.get('required', False):
-            return False, f"Property '{prop_name}' is required"
-        return True, None
-    
-    if prop_type == 'select':
-        return _validate_select(property_info, value, prop_name)
-    elif prop_type == 'multi_select':
-        return _validate_multi_select(property_info, value, prop_name)
-    elif prop_type == 'number':
-        return _validate_number(property_info, value, prop_name)
-    elif prop_type == 'date':
-        return _validate_date(property_info, value, prop_name)
-    elif prop_type == 'checkbox':
-        return _validate_checkbox(value, prop_name)
-    elif prop_type == 'url':
-        return _validate_url(value, prop_name)
-    elif prop_type == 'email':
-        return _validate_email(value, prop_name)
-    elif prop_type == 'phone_number':
-        return _validate_phone(value, prop_name)
-    elif prop_type in ['rich_text', 'title']:
-        return _validate_text(value, prop_name)
+    required = property_info.get('required', False)
+
+    compiler = _VALIDATOR_COMPILERS.get(prop_type)
+    if compiler:
+        check = compiler(property_info, prop_name)
+    elif prop_type in _SIMPLE_VALIDATORS:
+        simple_validator = _SIMPLE_VALIDATORS[prop_type]
+        check = lambda value: simple_validator(value, prop_name)
     else:
         # Pour les autres types, on accepte la valeur
-        return True, None
+        check = lambda value: (True, None)
+
+    def validate(value):
+        if value is None or value == '':
+            if required:
+                return False, f"Property '{prop_name}' is required"
+            return True, None
+        return check(value)
+
+    return validate
+
 
+def compile_property_validators(properties_info):
+    """Compile les validateurs de toutes les propriétés {nom: validateur}"""
+    return {prop['name']: compile_property_validator(prop) for prop in properties_info}
 
-def _validate_select(property_info, value, prop_name):
-    """Valide une valeur pour un champ select"""
+
+def _compile_select_validator(property_info, prop_name):
+    """Compile le validateur d'un champ select"""
     options = property_info.get('options', [])
     if not options:
-        return True, None  # Pas d'options définies, on accepte
-    
-    if isinstance(value, str):
-        if value in options:
-            return True, None
-        return False, f"Value '{value}' is not a valid option for '{prop_name}'. Valid options: {', '.join(options)}"
-    
-    return False, f"Invalid value type for select property '{prop_name}'"
+        return lambda value: (True, None)  # Pas d'options définies, on accepte
+    option_set = frozenset(options)
+
+    def validate_select(value):
+        if isinstance(value, str):
+            if value in option_set:
+                return True, None
+            return False, f"Value '{value}' is not a valid option for '{prop_name}'. Valid options: {', '.join(options)}"
+        return False, f"Invalid value type for select property '{prop_name}'"
 
+    return validate_select
 
-def _validate_multi_select(property_info, value, prop_name):
-    """Valide une valeur pour un champ multi_select"""
+
+def _compile_multi_select_validator(property_info, prop_name):
+    """Compile le validateur d'un champ multi_select"""
     options = property_info.get('options', [])
     if not options:
-        return True, None  # Pas d'options définies, on accepte
-    
-    if isinstance(value, list):
-        invalid_values = [v for v in value if v not in options]
-        if invalid_values:
-            return False, f"Invalid options for '{prop_name}': {', '.join(invalid_values)}. Valid options: {', '.join(options)}"
-        return True, None
-    elif isinstance(value, str):
-        # Accepter une chaîne séparée par des virgules
-        values = [v.strip() for v in value.split(',')]
-        invalid_values = [v for v in values if v not in options]
+        return lambda value: (True, None)  # Pas d'options définies, on accepte
+    option_set = frozenset(options)
+
+    def validate_multi_select(value):
+        if isinstance(value, list):
+            values = value
+        elif isinstance(value, str):
+            # Accepter une chaîne séparée par des virgules
+            values = [v.strip() for v in value.split(',')]
+        else:
+            return False, f"Invalid value type for multi_select property '{prop_name}'. Expected list or comma-separated string"
+
+        # Un élément non textuel (liste, dict...) n'est pas hachable : invalide sans recherche
+        invalid_values = [v for v in values if not isinstance(v, str) or v not in option_set]
         if invalid_values:
-            return False, f"Invalid options for '{prop_name}': {', '.join(invalid_values)}. Valid options: {', '.join(options)}"
+            return False, f"Invalid options for '{prop_name}': {', '.join(map(str, invalid_values))}. Valid options: {', '.join(options)}"
         return True, None
-    
-    return False, f"Invalid value type for multi_select property '{prop_name}'. Expected list or comma-separated string"
+
+    return validate_multi_select
+
+
+def _compile_number_validator(property_info, prop_name):
+    """Compile le validateur d'un champ number"""
+    return lambda value: _validate_number(property_info, value, prop_name)
+
+
+def _compile_date_validator(property_info, prop_name):
+    """Compile le validateur d'un champ date"""
+    return lambda value: _validate_date(property_info, value, prop_name)
 
 
 def _validate_number(property_info, value, prop_name):
@@ -186,24 +211,25 @@ def _validate_text(value, prop_name):
     return False, f"Invalid value type for text property '{prop_name}'"
 
 
-def validate_properties_batch(properties_info, property_values):
+def validate_properties_batch(properties_info, property_values, validators=None):
     """
     Valide plusieurs propriétés en une fois
     
     Args:
         properties_info: Liste de dictionnaires contenant les informations des propriétés
         property_values: Dictionnaire {property_name: value}
+        validators: Validateurs déjà compilés {nom: validateur} (optionnel)
     
     Returns:
         dict: {property_name: (is_valid, error_message)}
     """
-    # Créer un dictionnaire pour accès rapide
-    props_dict = {prop['name']: prop for prop in properties_info}
+    if validators is None:
+        validators = compile_property_validators(properties_info)
     
     results = {}
     for prop_name, value in property_values.items():
-        if prop_name in props_dict:
-            is_valid, error = validate_property_value(props_dict[prop_name], value)
+        if prop_name in validators:
+            is_valid, error = validators[prop_name](value)
             results[prop_name] = {
                 "valid": is_valid,
                 "error": error
@@ -216,3 +242,58 @@ def validate_properties_batch(properties_info, property_values):
     
     return results
 
+
+
+_SIMPLE_VALIDATORS = {
+    'checkbox': _validate_checkbox,
+    'url': _validate_url,
+    'email': _validate_email,
+    'phone_number': _validate_phone,
+    'rich_text': _validate_text,
+    'title': _validate_text,
+}
+
+_VALIDATOR_COMPILERS = {
+    'select': _compile_select_validator,
+    'multi_select': _compile_multi_select_validator,
+    'number': _compile_number_validator,
+    'date': _compile_date_validator,
+}
+
+
+def validate_property_rows(validators, rows):
+    """
+    Valide de nombreux jeux de valeurs contre un même schéma
+
+    Args:
+        validators: Validateurs compilés {nom: validateur}
+        rows: Liste de dictionnaires {property_name: value}
+
+    Returns:
+        dict: Rapport compact ; seules les lignes invalides sont détaillées
+            {"total", "valid", "invalid", "errors": [{"row": i, "errors": {nom: message}}]}
+    """
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": index, "errors": {"_row": "Row must be an object {property: value}"}})
+            continue
+
+        row_errors = {}
+        for prop_name, value in row.items():
+            validator = validators.get(prop_name)
+            if validator is None:
+                row_errors[prop_name] = f"Property '{prop_name}' not found in database"
+                continue
+            is_valid, error = validator(value)
+            if not is_valid:
+                row_errors[prop_name] = error
+        if row_errors:
+            errors.append({"row": index, "errors": row_errors})
+
+    return {
+        "total": len(rows),
+        "valid": len(rows) - len(errors),
+        "invalid": len(errors),
+        "errors": errors
+    }
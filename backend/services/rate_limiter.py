@@ -0,0 +1,173 @@
+"""
+Limiteur de débit et ordonnanceur des appels à l'API Notion
+
+Notion autorise en moyenne 3 requêtes par seconde par intégration, avec de
+courtes rafales. Un seau à jetons est partagé par clé API entre tous les
+threads et les coroutines.
+
+Lorsque plusieurs envois attendent un jeton, celui-ci est attribué par un
+ordonnancement équitable pondéré (stride scheduling) entre flux : un flux est
+un couple (priorité, base de données). Les envois interactifs de l'interface
+pèsent PRIORITY_WEIGHTS['interactive'] fois plus qu'un envoi de fond, si bien
+qu'un import en masse ne les affame pas, sans être lui-même bloqué.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+
+NOTION_REQUESTS_PER_SECOND = 3
+NOTION_BURST = 10
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BULK = 'bulk'
+PRIORITY_BACKGROUND = 'background'
+PRIORITY_WEIGHTS = {
+    PRIORITY_INTERACTIVE: 16,
+    PRIORITY_BULK: 4,
+    PRIORITY_BACKGROUND: 1
+}
+# Intervalle maximal entre deux vérifications d'annulation pendant l'attente
+CANCEL_POLL_INTERVAL = 0.05
+
+
+class RateLimiter:
+    """Seau à jetons thread-safe avec file d'attente équitable pondérée"""
+
+    def __init__(self, rate=NOTION_REQUESTS_PER_SECOND, burst=NOTION_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._cond = threading.Condition()
+        self._flows = {}
+        self._idle_passes = {}
+        self._virtual_time = 0.0
+        self._tickets = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _enqueue(self, priority, flow):
+        """Place un ticket dans la file de son flux (à appeler sous verrou)"""
+        key = (priority, flow)
+        state = self._flows.get(key)
+        if state is None:
+            # Un flux qui (re)devient actif repart de son « pass », sans retomber
+            # sous le temps virtuel courant
+            start = max(self._idle_passes.pop(key, 0.0), self._virtual_time)
+            state = {'queue': deque(), 'pass': start, 'weight': PRIORITY_WEIGHTS[priority]}
+            self._flows[key] = state
+        ticket = (next(self._tickets), key)
+        state['queue'].append(ticket)
+        return ticket
+
+    def _remove(self, ticket):
+        """Retire un ticket abandonné (annulation) de sa file"""
+        state = self._flows.get(ticket[1])
+        if state is not None and ticket in state['queue']:
+            state['queue'].remove(ticket)
+            if not state['queue']:
+                self._retire_flow(ticket[1])
+
+    def _retire_flow(self, key):
+        """Retire un flux vide en mémorisant son avance sur le temps virtuel"""
+        state = self._flows.pop(key)
+        self._idle_passes = {
+            idle_key: idle_pass for idle_key, idle_pass in self._idle_passes.items()
+            if idle_pass > self._virtual_time
+        }
+        if state['pass'] > self._virtual_time:
+            self._idle_passes[key] = state['pass']
+
+    def _next_ticket(self):
+        """Ticket servi au prochain jeton : tête du flux de plus petit « pass »"""
+        state = min(self._flows.values(), key=lambda s: (s['pass'], s['queue'][0][0]))
+        return state['queue'][0]
+
+    def _try_grant(self, ticket):
+        """
+        Attribue un jeton à `ticket` si c'est son tour (à appeler sous verrou)
+
+        Returns:
+            0 si le jeton est attribué, le temps d'attente avant le prochain jeton
+            si le ticket est le prochain servi, None s'il doit attendre son tour
+        """
+        self._refill()
+        if self._next_ticket() != ticket:
+            return None
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+
+        self._tokens -= 1
+        state = self._flows[ticket[1]]
+        state['queue'].popleft()
+        self._virtual_time = state['pass']
+        state['pass'] += 1 / state['weight']
+        if not state['queue']:
+            self._retire_flow(ticket[1])
+        self._cond.notify_all()
+        return 0
+
+    def acquire(self, job=None):
+        """
+        Attend qu'un jeton soit disponible puis le consomme
+
+        La priorité et le flux sont ceux du job (par défaut : interactif, sans
+        base). Si `job` est fourni, l'attente s'interrompt dès son annulation
+        (JobCancelled) sans consommer de jeton.
+        """
+        priority = job.priority if job is not None else PRIORITY_INTERACTIVE
+        flow = job.flow if job is not None else None
+        with self._cond:
+            ticket = self._enqueue(priority, flow)
+            try:
+                while True:
+                    if job is not None:
+                        job.check()
+                    wait = self._try_grant(ticket)
+                    if wait == 0:
+                        return
+                    if job is not None:
+                        wait = CANCEL_POLL_INTERVAL if wait is None else min(wait, CANCEL_POLL_INTERVAL)
+                    self._cond.wait(wait)
+            except BaseException:
+                self._remove(ticket)
+                self._cond.notify_all()
+                raise
+
+    async def acquire_async(self, priority=PRIORITY_INTERACTIVE, flow=None):
+        """Variante asyncio de acquire : attend sans bloquer la boucle d'événements"""
+        import asyncio
+
+        with self._cond:
+            ticket = self._enqueue(priority, flow)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_grant(ticket)
+                if wait == 0:
+                    return
+                await asyncio.sleep(CANCEL_POLL_INTERVAL if wait is None else wait)
+        except BaseException:
+            with self._cond:
+                self._remove(ticket)
+                self._cond.notify_all()
+            raise
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key):
+    """Retourne le limiteur partagé pour une clé API"""
+    with _limiters_lock:
+        limiter = _limiters.get(api_key)
+        if limiter is None:
+            limiter = RateLimiter()
+            _limiters[api_key] = limiter
+        return limiter
@@ -0,0 +1,135 @@
+"""
+Cache des schémas de bases de données Notion
+
+Un DatabaseSchema est un instantané du schéma (réponse de databases.retrieve)
+auquel sont rattachés, à la demande, la structure extraite ainsi que les
+formateurs et validateurs compilés de chaque propriété. Les instantanés sont
+conservés SCHEMA_CACHE_TTL secondes par (clé API, base de données) : les envois
+successifs ne refont ni l'appel réseau ni la compilation.
+"""
+import hashlib
+import threading
+import time
+from utils.property_formatter import compile_property_formatters
+from services.property_validator import compile_property_validators
+from services.batch_planner import serialize_json
+from services.notion_service import (
+    retrieve_database,
+    extract_detected_properties,
+    build_database_structure,
+    collect_missing_select_options,
+    add_select_options
+)
+
+
+SCHEMA_CACHE_TTL = 30
+
+
+class DatabaseSchema:
+    """Instantané du schéma d'une base Notion"""
+
+    def __init__(self, database):
+        self.database = database
+        self.properties = database.get('properties', {})
+        self.fetched_at = time.monotonic()
+        self._structure = None
+        self._fingerprint = None
+        self._formatters = None
+        self._validators = None
+
+    def detect(self):
+        """Retourne (title_property, date_property, properties)"""
+        return extract_detected_properties(self.database)
+
+    @property
+    def structure(self):
+        """Structure de la base (voir get_database_structure)"""
+        if self._structure is None:
+            self._structure = build_database_structure(self.database)
+        return self._structure
+
+    @property
+    def fingerprint(self):
+        """Empreinte de la structure (change si le schéma change), pour les ETags"""
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha256(serialize_json(self.structure)).hexdigest()[:16]
+        return self._fingerprint
+
+    @property
+    def formatters(self):
+        """Formateurs compilés {nom de propriété: formateur}"""
+        if self._formatters is None:
+            self._formatters = compile_property_formatters(self.properties)
+        return self._formatters
+
+    @property
+    def validators(self):
+        """Validateurs compilés {nom de propriété: validateur}"""
+        if self._validators is None:
+            self._validators = compile_property_validators(self.structure['properties'])
+        return self._validators
+
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def peek_database_schema(api_key, database_id, max_age=SCHEMA_CACHE_TTL):
+    """Retourne le schéma en cache s'il est récent, sinon None (sans appel à Notion)"""
+    with _schemas_lock:
+        schema = _schemas.get((api_key, database_id))
+    if schema is not None and time.monotonic() - schema.fetched_at < max_age:
+        return schema
+    return None
+
+
+def get_database_schema(notion, database_id, max_age=SCHEMA_CACHE_TTL):
+    """Retourne le schéma en cache s'il est récent, sinon le récupère depuis Notion"""
+    schema = peek_database_schema(notion.options.auth, database_id, max_age)
+    if schema is not None:
+        return schema
+
+    schema = DatabaseSchema(retrieve_database(notion, database_id))
+    with _schemas_lock:
+        _schemas[(notion.options.auth, database_id)] = schema
+    return schema
+
+
+def store_database_schema(notion, database_id, database):
+    """Remplace le schéma en cache par une base de données déjà récupérée"""
+    schema = DatabaseSchema(database)
+    with _schemas_lock:
+        _schemas[(notion.options.auth, database_id)] = schema
+    return schema
+
+
+def ensure_select_options(notion, database_id, value_sets):
+    """
+    Crée en une seule mise à jour du schéma toutes les options select/multi_select
+    manquantes pour un ensemble de jeux de valeurs (un envoi ou un lot d'imports)
+
+    Returns:
+        tuple: (schéma à jour, {property_name: [options créées]})
+    """
+    schema = get_database_schema(notion, database_id)
+    missing = collect_missing_select_options(schema.properties, value_sets)
+    if not missing:
+        return schema, {}
+
+    # databases.update remplace la liste d'options : partir du schéma actuel de
+    # Notion, pas d'un instantané qui peut avoir SCHEMA_CACHE_TTL secondes
+    schema = get_database_schema(notion, database_id, max_age=0)
+    missing = collect_missing_select_options(schema.properties, value_sets)
+    if not missing:
+        return schema, {}
+
+    database = add_select_options(notion, database_id, schema.properties, missing)
+    return store_database_schema(notion, database_id, database), missing
+
+
+def invalidate_database_schema(database_id=None):
+    """Oublie les schémas en cache (d'une base, ou de toutes)"""
+    with _schemas_lock:
+        for key in list(_schemas):
+            if database_id is None or key[1] == database_id:
+                del _schemas[key]
@@ -0,0 +1,31 @@
+"""
+Configuration commune des tests : base SQLite temporaire
+
+Les tests n'écrivent jamais dans la base de l'application (notion_config.db) :
+DB_PATH pointe vers un dossier temporaire dès l'import des modules (app.py
+initialise la base à l'import), puis chaque test reçoit sa propre base.
+"""
+import os
+import tempfile
+
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='chat-to-notion-tests-'), 'notion_config.db')
+
+import pytest  # noqa: E402
+import db  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path_factory, monkeypatch):
+    """Base SQLite propre à chaque test (pool et thread d'écriture réinitialisés)"""
+    from services.chat_history import flush_history
+    from services.config_writer import flush_discovered_properties
+
+    db.close_db_connections()
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path_factory.mktemp('db') / 'notion_config.db'))
+    db.invalidate_config_cache()
+    db.init_db()
+    yield
+    flush_discovered_properties()
+    flush_history()
+    db.close_db_connections()
+    db.invalidate_config_cache()
@@ -0,0 +1,424 @@
+"""
+Tests fonctionnels pour les routes d'envoi de chat
+"""
+import json
+import httpx
+import pytest
+from notion_client import Client
+from app import app
+from db import get_db_connection, save_config, invalidate_config_cache
+from services.jobs import cancel_job
+from services.schema_cache import invalidate_database_schema
+from services.outbox import drain_outbox
+from services.chat_history import flush_history
+from services.config_writer import flush_discovered_properties
+
+
+DATABASE = {
+    "object": "database",
+    "id": "db",
+    "title": [],
+    "properties": {
+        "Name": {"id": "title", "type": "title", "title": {}},
+        "Date": {"id": "date", "type": "date", "date": {}},
+        "Conversation": {"id": "rel", "type": "relation", "relation": {"database_id": "db"}}
+    }
+}
+
+
+@pytest.fixture
+def client():
+    """Fixture pour créer un client de test Flask configuré"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        with get_db_connection() as conn:
+            conn.execute('DELETE FROM notion_config')
+            conn.execute('DELETE FROM chat_outbox')
+            conn.commit()
+        invalidate_config_cache()
+        save_config('secret', 'db', 'Name', 'Date')
+        invalidate_database_schema()
+        yield client
+        flush_discovered_properties()
+
+
+@pytest.fixture
+def notion_api(mocker):
+    """Fausse API Notion : enregistre les requêtes reçues"""
+    calls = []
+
+    def handler(request):
+        body = json.loads(request.content) if request.content else None
+        calls.append((request.method, request.url.path, body))
+        if request.method == 'GET' and request.url.path == '/v1/databases/db':
+            return httpx.Response(200, json=DATABASE)
+        if request.url.path == '/v1/pages':
+            return httpx.Response(200, json={"id": f"page-{len(calls)}"})
+        return httpx.Response(200, json={"results": []})
+
+    def make_client(api_key):
+        return Client(auth=api_key, client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+    mocker.patch('routes.chat_routes.get_notion_client', side_effect=make_client)
+    mocker.patch('services.outbox.get_notion_client', side_effect=make_client)
+    return calls
+
+
+def test_chat_requires_content(client):
+    """Test envoi sans contenu"""
+    response = client.post('/api/chat', json={})
+    assert response.status_code == 400
+
+
+def test_chat_conversation_mode(client, notion_api):
+    """Test envoi classique d'une conversation sur une seule page"""
+    response = client.post('/api/chat', json={'content': 'User: Bonjour\nAssistant: Salut', 'date': '2024-01-15'})
+    assert response.status_code == 200
+    pages = [c for c in notion_api if c[1] == '/v1/pages']
+    assert len(pages) == 1
+    assert pages[0][2]['properties']['Date'] == {"date": {"start": "2024-01-15"}}
+
+    # Le chat envoyé est indexé pour la recherche locale
+    flush_history()
+    results = client.get('/api/chats/search?q=Salut').json['results']
+    assert response.json['notionPageId'] in [r['notionPageId'] for r in results]
+
+
+def test_chat_per_message_requires_relation(client, notion_api):
+    """Test que le mode par message exige une propriété relation"""
+    response = client.post('/api/chat', json={'content': 'User: a', 'mode': 'per_message', 'relationProperty': 'Date'})
+    assert response.status_code == 400
+
+
+def test_chat_per_message_mode(client, notion_api):
+    """Test création d'une page par message reliée à la conversation"""
+    response = client.post('/api/chat', json={
+        'content': 'User: Bonjour\nAssistant: Salut\nUser: Merci',
+        'date': '2024-01-15',
+        'mode': 'per_message',
+        'relationProperty': 'Conversation'
+    })
+    assert response.status_code == 200
+    parent_id = response.json['notionPageId']
+    assert len(response.json['messagePageIds']) == 3
+
+    pages = [c[2] for c in notion_api if c[1] == '/v1/pages']
+    assert len(pages) == 4
+    turn_pages = [p for p in pages if 'Conversation' in p['properties']]
+    assert len(turn_pages) == 3
+    assert all(p['properties']['Conversation'] == {"relation": [{"id": parent_id}]} for p in turn_pages)
+    titles = sorted(p['properties']['Name']['title'][0]['text']['content'] for p in turn_pages)
+    assert titles == ['1. Bonjour', '2. Salut', '3. Merci']
+
+    # La page de conversation renvoie vers chaque message, dans l'ordre
+    links = [c[2] for c in notion_api if c[1] == f'/v1/blocks/{parent_id}/children']
+    assert len(links) == 1
+    assert [b['link_to_page']['page_id'] for b in links[0]['children']] == response.json['messagePageIds']
+
+
+def test_chat_per_message_stream_events(client, notion_api):
+    """Test que le mode par message en stream émet un événement par page créée"""
+    response = client.post('/api/chat', json={
+        'content': 'User: Bonjour\nAssistant: Salut\nUser: Merci',
+        'mode': 'per_message',
+        'relationProperty': 'Conversation',
+        'stream': True
+    })
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [e['event'] for e in events] == ['started', 'page_created'] + ['message'] * 3 + ['done']
+    messages = [e for e in events if e['event'] == 'message']
+    assert sorted(e['message'] for e in messages) == [1, 2, 3]
+    assert {e['messages'] for e in messages} == {3}
+    assert events[-1]['notionPageId'] == events[1]['pageId']
+    assert sorted(events[-1]['messagePageIds']) == sorted(e['pageId'] for e in messages)
+
+
+def test_chat_stream_progress_events(client, notion_api):
+    """Test que le mode stream renvoie les événements de progression en NDJSON"""
+    content = "\n".join("ligne %d" % i for i in range(250))
+    response = client.post('/api/chat', json={'content': content, 'date': '2024-01-15', 'stream': True})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    events = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [e['event'] for e in events] == ['started', 'parsed', 'page_created', 'batch', 'batch', 'batch', 'done']
+    assert events[1] == {"event": "parsed", "blocks": 250, "batches": 3}
+    assert [e['batch'] for e in events if e['event'] == 'batch'] == [1, 2, 3]
+    assert events[-1]['notionPageId'] == events[2]['pageId']
+
+
+@pytest.fixture
+def failing_append(mocker):
+    """Fausse API Notion dont l'ajout du premier lot supplémentaire échoue"""
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.method == 'GET':
+            return httpx.Response(200, json=DATABASE)
+        if request.method == 'PATCH':
+            return httpx.Response(400, json={"object": "error", "code": "validation_error", "message": "bloc refusé"})
+        return httpx.Response(200, json={"id": "page-1"})
+
+    mocker.patch('routes.chat_routes.get_notion_client', side_effect=lambda api_key: Client(
+        auth=api_key, client=httpx.Client(transport=httpx.MockTransport(handler))
+    ))
+    return calls
+
+
+def test_chat_failed_batch_is_reported(client, failing_append):
+    """Test qu'un lot en échec donne une réponse partielle, sans envoyer les lots suivants"""
+    content = "\n".join("ligne %d" % i for i in range(250))
+    response = client.post('/api/chat', json={'content': content})
+    assert response.status_code == 502
+    assert response.json['partial'] is True
+    assert response.json['notionPageId'] == 'page-1'
+    assert "bloc refusé" in response.json['error']
+    assert len([c for c in failing_append if c[0] == 'PATCH']) == 1
+
+
+def test_chat_stream_failed_batch_event(client, failing_append):
+    """Test que le stream signale le lot en échec puis se termine en erreur"""
+    content = "\n".join("ligne %d" % i for i in range(250))
+    response = client.post('/api/chat', json={'content': content, 'stream': True})
+    events = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [e['event'] for e in events] == ['started', 'parsed', 'page_created', 'batch', 'batch', 'error']
+    assert events[4]['batch'] == 2 and "bloc refusé" in events[4]['error']
+    assert events[-1]['partial'] is True and events[-1]['notionPageId'] == 'page-1'
+
+
+def test_chat_stream_unread_body_releases_job(client, notion_api):
+    """Test qu'un stream fermé sans être lu libère le job (même jobId réutilisable)"""
+    from routes.chat_routes import process_chat
+
+    payload = {'content': 'User: Bonjour', 'stream': True, 'jobId': 'stream-1'}
+    with app.test_request_context('/api/chat', method='POST', json=payload):
+        response = process_chat()
+    # Client déconnecté avant la première lecture : le serveur ferme la réponse
+    response.close()
+
+    response = client.post('/api/chat', json=payload)
+    assert response.status_code == 200
+    assert json.loads(response.data.decode().splitlines()[-1])['event'] == 'done'
+
+
+def test_cancel_unknown_job(client):
+    """Test annulation d'un envoi inexistant"""
+    response = client.post('/api/chat/jobs/inconnu/cancel')
+    assert response.status_code == 404
+
+
+def test_chat_cancelled_between_batches(client, notion_api, mocker):
+    """Test qu'un envoi annulé n'envoie plus les lots restants"""
+    mocker.patch('routes.chat_routes.create_notion_page_with_blocks', side_effect=_cancel_after_page_created)
+    content = "\n".join("ligne %d" % i for i in range(250))
+    response = client.post('/api/chat', json={'content': content, 'jobId': 'job-1'})
+
+    assert response.status_code == 409
+    assert response.json['cancelled'] is True
+    assert response.json['notionPageId']
+    assert len([c for c in notion_api if c[0] == 'PATCH']) == 0
+
+    # Le job est retiré du registre une fois terminé
+    assert client.post('/api/chat/jobs/job-1/cancel').status_code == 404
+
+
+def _cancel_after_page_created(notion, database_id, properties, content, job):
+    """Crée la page puis simule une annulation reçue avant le lot suivant"""
+    from services.notion_service import iter_create_notion_page_with_blocks
+    for event in iter_create_notion_page_with_blocks(notion, database_id, properties, content, job):
+        if event['event'] == 'page_created':
+            assert cancel_job(job.id)
+
+
+def test_chat_auto_create_options(client, mocker):
+    """Test que les options manquantes sont créées en une seule mise à jour du schéma"""
+    calls = []
+    DATABASE_WITH_TAGS = dict(DATABASE, properties={
+        **DATABASE['properties'],
+        "Status": {"id": "st", "type": "select", "select": {"options": [{"name": "Done"}]}},
+        "Tags": {"id": "tg", "type": "multi_select", "multi_select": {"options": [{"name": "a"}]}}
+    })
+
+    def handler(request):
+        body = json.loads(request.content) if request.content else None
+        calls.append((request.method, request.url.path, body))
+        if request.url.path == '/v1/databases/db':
+            if request.method == 'PATCH':
+                properties = dict(DATABASE_WITH_TAGS['properties'])
+                for name, update in body['properties'].items():
+                    prop_type = properties[name]['type']
+                    properties[name] = {**properties[name], prop_type: update[prop_type]}
+                return httpx.Response(200, json=dict(DATABASE_WITH_TAGS, properties=properties))
+            return httpx.Response(200, json=DATABASE_WITH_TAGS)
+        return httpx.Response(200, json={"id": "page"})
+
+    mocker.patch('routes.chat_routes.get_notion_client', side_effect=lambda api_key: Client(
+        auth=api_key, client=httpx.Client(transport=httpx.MockTransport(handler))
+    ))
+
+    response = client.post('/api/chat', json={
+        'content': 'User: a',
+        'additionalProperties': {'Status': 'Blocked', 'Tags': 'a, b, c, b'},
+        'autoCreateOptions': True
+    })
+    assert response.status_code == 200
+    assert response.json['createdOptions'] == {'Status': ['Blocked'], 'Tags': ['b', 'c']}
+
+    updates = [c[2] for c in calls if c[0] == 'PATCH' and c[1] == '/v1/databases/db']
+    assert updates == [{"properties": {
+        "Status": {"select": {"options": [{"name": "Done"}, {"name": "Blocked"}]}},
+        "Tags": {"multi_select": {"options": [{"name": "a"}, {"name": "b"}, {"name": "c"}]}}
+    }}]
+    page = next(c[2] for c in calls if c[1] == '/v1/pages')
+    assert page['properties']['Status'] == {"select": {"name": "Blocked"}}
+    assert [o['name'] for o in page['properties']['Tags']['multi_select']] == ['a', 'b', 'c', 'b']
+
+    # Les options existent désormais : un second envoi ne met plus le schéma à jour
+    response = client.post('/api/chat', json={
+        'content': 'User: a', 'additionalProperties': {'Status': 'Blocked'}, 'autoCreateOptions': True
+    })
+    assert response.json['createdOptions'] == {}
+    assert len([c for c in calls if c[0] == 'PATCH' and c[1] == '/v1/databases/db']) == 1
+
+
+def test_chat_deferred_is_acknowledged_then_delivered(client, notion_api, mocker):
+    """Test qu'un envoi différé est acquitté avant tout appel à Notion puis livré par l'outbox"""
+    mocker.patch('services.outbox.start_outbox_drainer')
+
+    response = client.post('/api/chat', json={'content': 'User: Bonjour', 'date': '2024-01-15', 'deferred': True})
+    assert response.status_code == 202
+    entry_id = response.json['outboxId']
+    assert response.json['status'] == 'pending'
+    assert notion_api == []
+
+    assert drain_outbox() is None
+    status = client.get(f'/api/chat/outbox/{entry_id}').json
+    assert status['status'] == 'sent'
+    assert status['attempts'] == 1
+    page = next(c[2] for c in notion_api if c[1] == '/v1/pages')
+    assert status['notionPageId']
+    assert page['properties']['Date'] == {"date": {"start": "2024-01-15"}}
+
+
+def test_chat_deferred_requires_conversation_mode(client):
+    """Test que l'envoi différé est refusé en mode par message"""
+    response = client.post('/api/chat', json={
+        'content': 'User: a', 'deferred': True, 'mode': 'per_message', 'relationProperty': 'Conversation'
+    })
+    assert response.status_code == 400
+
+
+def test_outbox_status_unknown(client):
+    """Test l'état d'un envoi différé inexistant"""
+    assert client.get('/api/chat/outbox/999999').status_code == 404
+
+
+def test_chat_memory_profile_in_response(client, notion_api):
+    """Test que ?profileMemory=1 renvoie les mesures mémoire de chaque étape"""
+    content = "\n".join("ligne %d" % i for i in range(250))
+    response = client.post('/api/chat?profileMemory=1', json={'content': content})
+    assert response.status_code == 200
+
+    stages = response.json['debug']['memory']['stages']
+    assert [s['stage'] for s in stages] == ['parse_chat', 'parse_content_to_notion_blocks', 'batching', 'upload']
+    assert all(s['peakBytes'] >= 0 and isinstance(s['top'], list) for s in stages)
+    assert stages[1]['peakBytes'] > 0
+
+
+def test_chat_memory_profile_log(client, notion_api, tmp_path, monkeypatch):
+    """Test que MEMORY_PROFILE=1 écrit le rapport dans le fichier de log, sans section debug"""
+    log_path = tmp_path / 'memory.log'
+    monkeypatch.setenv('MEMORY_PROFILE', '1')
+    monkeypatch.setattr('services.memory_profiler.MEMORY_PROFILE_LOG', str(log_path))
+    response = client.post('/api/chat', json={'content': 'User: a', 'jobId': 'profiled'})
+    assert response.status_code == 200
+    assert 'debug' not in response.json
+
+    entry = json.loads(log_path.read_text().splitlines()[-1])
+    assert entry['jobId'] == 'profiled'
+    assert len(entry['stages']) == 4
+
+
+def test_chat_uses_configured_parser_rules(client, notion_api):
+    """Test que l'envoi applique les règles de parsing configurées"""
+    save_config('secret', 'db', 'Name', 'Date', parser_rules=['code'])
+    response = client.post('/api/chat', json={'content': 'User: Bonjour\n# Titre\n```py\nx = 1\n```'})
+    assert response.status_code == 200
+    children = [c for c in notion_api if c[1] == '/v1/pages'][0][2]['children']
+    assert [block['type'] for block in children] == ['paragraph', 'paragraph', 'code']
+    assert children[2]['code']['language'] == 'python'
+
+
+def test_chat_data_uri_image_rewritten(client, notion_api, monkeypatch, tmp_path):
+    """Test que les images data URI sont envoyées avant la création de la page"""
+    from services import image_uploads
+    monkeypatch.setattr(image_uploads, 'IMAGE_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(image_uploads, 'IMAGE_STORE_URL', 'https://images.test')
+    image_uploads.clear_upload_cache()
+
+    response = client.post('/api/chat', json={'content': 'User: Voici\n![](data:image/gif;base64,R0lGODlhAQABAAAAACw=)'})
+    assert response.status_code == 200
+    children = [c for c in notion_api if c[1] == '/v1/pages'][0][2]['children']
+    assert children[1]['image']['external']['url'].startswith('https://images.test/')
+    image_uploads.clear_upload_cache()
+
+
+def test_discovered_date_written_once(client, notion_api, mocker):
+    """Test : aucune écriture de configuration une fois stabilisée, une seule à la découverte"""
+    writes = mocker.patch('services.config_writer.save_config')
+    for _ in range(2):
+        assert client.post('/api/chat', json={'content': 'User: Bonjour'}).status_code == 200
+    flush_discovered_properties()
+    writes.assert_not_called()
+
+    save_config('secret', 'db', 'Name', None)
+    for _ in range(3):
+        assert client.post('/api/chat', json={'content': 'User: Bonjour'}).status_code == 200
+    flush_discovered_properties()
+    writes.assert_called_once_with('secret', 'db', 'Name', 'Date')
+
+
+def test_chat_fetches_schema_once(client, notion_api):
+    """Test : détection, construction et validation des propriétés sur un seul databases.retrieve"""
+    save_config('secret', 'db', None, None)
+    response = client.post('/api/chat', json={'content': 'User: Bonjour', 'date': '2024-01-15'})
+    assert response.status_code == 200
+    retrieves = [c for c in notion_api if c[1] == '/v1/databases/db']
+    assert len(retrieves) == 1
+    page = [c for c in notion_api if c[1] == '/v1/pages'][0][2]
+    assert set(page['properties']) == {'Name', 'Date'}
+
+    # Les envois suivants réutilisent l'instantané en cache
+    assert client.post('/api/chat', json={'content': 'User: Encore'}).status_code == 200
+    assert len([c for c in notion_api if c[1] == '/v1/databases/db']) == 1
+
+
+def test_chat_per_message_failure_reports_created_pages(client, mocker):
+    """Test qu'un échec en mode par message attend les pages en cours et les signale"""
+    created = []
+
+    def handler(request):
+        body = json.loads(request.content) if request.content else None
+        if request.method == 'GET':
+            return httpx.Response(200, json=DATABASE)
+        title = body['properties']['Name']['title'][0]['text']['content']
+        if title.startswith('2.'):
+            return httpx.Response(400, json={"object": "error", "code": "validation_error", "message": "refusé"})
+        created.append(f"page-{len(created) + 1}")
+        return httpx.Response(200, json={"id": created[-1]})
+
+    mocker.patch('routes.chat_routes.get_notion_client', side_effect=lambda api_key: Client(
+        auth=api_key, client=httpx.Client(transport=httpx.MockTransport(handler))
+    ))
+    response = client.post('/api/chat', json={
+        'content': 'User: Bonjour\nAssistant: Salut\nUser: Merci',
+        'mode': 'per_message',
+        'relationProperty': 'Conversation'
+    })
+    assert response.status_code == 502
+    assert response.json['partial'] is True
+    assert response.json['notionPageId'] == 'page-1'
+    # Aucune page n'est créée après la réponse : toutes les pages créées sont listées
+    assert sorted(response.json['messagePageIds']) == sorted(created[1:])
@@ -1,9 +1,11 @@
 """
 Tests fonctionnels pour les routes de configuration
 """
+import time
 import pytest
 from app import app
-from db import init_db, get_db_connection
+from db import init_db, get_db_connection, save_config, invalidate_config_cache
+from services.schema_cache import invalidate_database_schema
 import os
 import tempfile
 import sqlite3
@@ -21,6 +23,7 @@ def client():
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM notion_config')
                 conn.commit()
+            invalidate_config_cache()
         yield client
 
 
@@ -60,3 +63,174 @@ def test_get_properties_not_configured(client):
     response = client.get('/api/config/properties')
     assert response.status_code == 400
 
+
+
+def test_validate_property_values_batch(client, mocker):
+    """Test validation en lot de plusieurs lignes avec un seul appel à Notion"""
+    save_config('secret', 'db', 'Name', None)
+    invalidate_database_schema()
+    notion = mocker.MagicMock()
+    notion.options.auth = 'secret'
+    notion.databases.retrieve.return_value = {
+        "title": [],
+        "properties": {
+            "Name": {"id": "title", "type": "title"},
+            "Status": {"id": "s", "type": "select", "select": {"options": [{"name": "Done"}]}},
+            "Score": {"id": "n", "type": "number", "number": {}}
+        }
+    }
+    mocker.patch('routes.config_routes.get_notion_client', return_value=notion)
+
+    rows = [{'Status': 'Done', 'Score': '3'}] * 500 + [{'Status': 'Nope'}, {'Score': 'abc', 'Other': 1}]
+    response = client.post('/api/config/validate-property-values/batch', json={'rows': rows})
+
+    assert response.status_code == 200
+    report = response.json
+    assert (report['total'], report['valid'], report['invalid']) == (502, 500, 2)
+    assert [e['row'] for e in report['errors']] == [500, 501]
+    assert set(report['errors'][1]['errors']) == {'Score', 'Other'}
+    assert notion.databases.retrieve.call_count == 1
+
+
+def test_validate_property_values_batch_requires_rows(client):
+    """Test validation en lot sans liste de lignes"""
+    save_config('secret', 'db', 'Name', None)
+    response = client.post('/api/config/validate-property-values/batch', json={'rows': {}})
+    assert response.status_code == 400
+
+
+def test_get_config_etag(client):
+    """Test que GET /api/config renvoie un ETag et répond 304 tant que la config ne change pas"""
+    save_config('secret', 'db', 'Name', None)
+    response = client.get('/api/config')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+
+    response = client.get('/api/config', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    save_config('secret', 'db', 'Name', 'Date')
+    response = client.get('/api/config', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['dateProperty'] == 'Date'
+    assert response.headers['ETag'] != etag
+
+
+def test_database_structure_etag_uses_cached_schema(client, mocker):
+    """Test que la structure et les propriétés sont servies depuis le schéma en cache, avec 304"""
+    save_config('secret', 'db', 'Name', None)
+    invalidate_database_schema()
+    notion = mocker.MagicMock()
+    notion.options.auth = 'secret'
+    notion.databases.retrieve.return_value = {
+        "title": [{"plain_text": "Chats"}],
+        "properties": {
+            "Name": {"id": "title", "type": "title"},
+            "Status": {"id": "s", "type": "select", "select": {"options": [{"name": "Done"}]}}
+        }
+    }
+    get_client = mocker.patch('routes.config_routes.get_notion_client', return_value=notion)
+
+    structure = client.get('/api/config/database-structure')
+    properties = client.get('/api/config/properties')
+    assert structure.status_code == properties.status_code == 200
+    assert [p['name'] for p in properties.json['properties']] == ['Status']
+
+    assert client.get('/api/config/database-structure',
+                      headers={'If-None-Match': structure.headers['ETag']}).status_code == 304
+    assert client.get('/api/config/properties',
+                      headers={'If-None-Match': properties.headers['ETag']}).status_code == 304
+    assert notion.databases.retrieve.call_count == 1
+    assert get_client.call_count == 1
+
+    # Un schéma modifié dans Notion change l'ETag une fois le cache expiré
+    notion.databases.retrieve.return_value["properties"]["Score"] = {"id": "n", "type": "number", "number": {}}
+    invalidate_database_schema()
+    response = client.get('/api/config/properties', headers={'If-None-Match': properties.headers['ETag']})
+    assert response.status_code == 200
+    assert [p['name'] for p in response.json['properties']] == ['Status', 'Score']
+
+
+def test_expired_schema_revalidation_skips_notion(client, mocker):
+    """Test qu'un GET conditionnel après expiration du cache répond 304 sans appeler Notion"""
+    from services.schema_cache import peek_database_schema
+
+    save_config('secret', 'db', 'Name', None)
+    invalidate_database_schema()
+    notion = mocker.MagicMock()
+    notion.options.auth = 'secret'
+    notion.databases.retrieve.return_value = {
+        "title": [], "properties": {"Name": {"id": "title", "type": "title"}}
+    }
+    mocker.patch('routes.config_routes.get_notion_client', return_value=notion)
+    etag = client.get('/api/config/properties').headers['ETag']
+
+    # Cache expiré ; le schéma a changé dans Notion
+    peek_database_schema('secret', 'db').fetched_at -= 60
+    notion.databases.retrieve.return_value = {
+        "title": [], "properties": {"Name": {"id": "title", "type": "title"}, "Score": {"id": "n", "type": "number"}}
+    }
+    response = client.get('/api/config/properties', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    # Le schéma est rechargé en tâche de fond : la revalidation suivante voit le changement
+    deadline = time.monotonic() + 5
+    while peek_database_schema('secret', 'db') is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert notion.databases.retrieve.call_count == 2
+    response = client.get('/api/config/properties', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [p['name'] for p in response.json['properties']] == ['Score']
+
+
+def test_parser_rules(client):
+    """Test de l'activation et de l'ordre des règles de parsing"""
+    save_config('secret', 'db', 'Name', 'Date')
+    assert client.get('/api/config').json['parserRules'][0] == 'code'
+
+    response = client.post('/api/config/parser-rules', json={'parserRules': ['heading', 'code']})
+    assert response.status_code == 200
+    assert client.get('/api/config').json['parserRules'] == ['heading', 'code']
+    rules = client.get('/api/config/parser-rules').json['rules']
+    assert rules[:3] == [
+        {"name": "heading", "enabled": True},
+        {"name": "code", "enabled": True},
+        {"name": "divider", "enabled": False}
+    ]
+
+    # Les autres sauvegardes conservent les règles
+    client.post('/api/config/dynamic-fields', json={'dynamicFields': []})
+    assert client.get('/api/config').json['parserRules'] == ['heading', 'code']
+
+    assert client.post('/api/config/parser-rules', json={'parserRules': ['inconnue']}).status_code == 400
+    assert client.post('/api/config/parser-rules', json={'parserRules': ['code', 'code']}).status_code == 400
+
+    client.post('/api/config/parser-rules', json={'parserRules': None})
+    assert 'image_url' in client.get('/api/config').json['parserRules']
+
+
+def test_config_routes_fetch_schema_once(client, mocker):
+    """Test : l'enregistrement de la configuration et les validations réutilisent un seul databases.retrieve"""
+    invalidate_database_schema()
+    notion = mocker.MagicMock()
+    notion.options.auth = 'secret'
+    notion.databases.retrieve.return_value = {
+        "title": [],
+        "properties": {
+            "Name": {"id": "title", "type": "title"},
+            "Date": {"id": "d", "type": "date", "date": {}}
+        }
+    }
+    mocker.patch('routes.config_routes.get_notion_client', return_value=notion)
+
+    response = client.post('/api/config', json={'apiKey': 'secret', 'databaseId': 'db'})
+    assert response.status_code == 200
+    assert response.json['titleProperty'] == 'Name'
+    assert response.json['dateProperty'] == 'Date'
+    assert notion.databases.retrieve.call_count == 1
+
+    response = client.post('/api/config/validate-properties', json={'properties': [{'name': 'Date', 'type': 'date'}]})
+    assert response.json['validation']['Date']['matches'] is True
+    assert client.get('/api/config/database-structure').status_code == 200
+    assert notion.databases.retrieve.call_count == 1
@@ -0,0 +1,135 @@
+"""
+Tests fonctionnels pour les routes d'historique des chats envoyés
+"""
+import threading
+import pytest
+from app import app
+from db import get_db_connection
+from services.chat_index import build_match_query
+from services.chat_history import record_sent_chat, flush_history
+
+
+@pytest.fixture
+def client():
+    """Fixture pour créer un client de test Flask avec un index vide"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        with get_db_connection() as conn:
+            conn.execute('DELETE FROM chat_search')
+            conn.execute('DELETE FROM sent_chats')
+            conn.commit()
+        yield client
+
+
+def _record(page_id, title, content, date='2024-01-15', database_id='db'):
+    record_sent_chat(page_id, database_id, {"title": title, "content": content, "date": date}, 3, 0.25)
+    flush_history()
+
+
+def test_search_requires_query(client):
+    """Test recherche sans paramètre q"""
+    assert client.get('/api/chats/search').status_code == 400
+    assert client.get('/api/chats/search?q=a&limit=0').status_code == 400
+
+
+def test_search_sent_chats(client):
+    """Test que la recherche retrouve la page Notion d'un chat envoyé"""
+    _record('page-1', 'Déploiement Kubernetes', 'User: comment déployer un pod ?\nAssistant: kubectl apply')
+    _record('page-2', 'Recette de crêpes', 'User: une recette de crêpes ?')
+
+    response = client.get('/api/chats/search?q=kubectl')
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [r['notionPageId'] for r in results] == ['page-1']
+    assert results[0]['title'] == 'Déploiement Kubernetes'
+    assert results[0]['date'] == '2024-01-15'
+    assert '[kubectl]' in results[0]['snippet']
+
+    # Sans accents, en préfixe (saisie en cours) et sur le titre
+    assert [r['notionPageId'] for r in client.get('/api/chats/search?q=crepe').json['results']] == ['page-2']
+    assert [r['notionPageId'] for r in client.get('/api/chats/search?q=deploiement kube').json['results']] == ['page-1']
+
+
+def test_search_ignores_fts_syntax(client):
+    """Test qu'une saisie contenant de la syntaxe FTS5 ne provoque pas d'erreur"""
+    _record('page-1', 'Titre', 'contenu "cité" AND NOT')
+    response = client.get('/api/chats/search?q="cité" AND (NOT')
+    assert response.status_code == 200
+    assert len(response.json['results']) == 1
+    assert build_match_query('  ') is None
+    assert build_match_query('a "b"') == '"a" "b"*'
+
+
+def test_list_sent_chats_keyset_pagination(client):
+    """Test la liste paginée par curseur, du plus récent au plus ancien"""
+    for i in range(5):
+        _record(f'page-{i}', f'Chat {i}', 'é' * 10)
+
+    first = client.get('/api/chats?limit=2').json
+    assert [c['notionPageId'] for c in first['chats']] == ['page-4', 'page-3']
+    assert first['chats'][0]['bytes'] == 20
+    assert first['chats'][0]['durationMs'] == 250
+    assert first['chats'][0]['blocksCount'] == 3
+    assert first['chats'][0]['status'] == 'sent'
+
+    second = client.get(f"/api/chats?limit=2&cursor={first['nextCursor']}").json
+    assert [c['notionPageId'] for c in second['chats']] == ['page-2', 'page-1']
+    last = client.get(f"/api/chats?limit=2&cursor={second['nextCursor']}").json
+    assert [c['notionPageId'] for c in last['chats']] == ['page-0']
+    assert last['nextCursor'] is None
+
+    assert client.get('/api/chats?cursor=abc').status_code == 400
+
+
+def test_list_sent_chats_filters_and_stats(client):
+    """Test les filtres par date/base et les agrégats par date"""
+    _record('page-1', 'a', 'x', date='2024-01-14')
+    _record('page-2', 'b', 'xy', date='2024-01-15')
+    _record('page-3', 'c', 'xyz', date='2024-01-15', database_id='autre')
+
+    chats = client.get('/api/chats?from=2024-01-15&to=2024-01-15').json['chats']
+    assert [c['notionPageId'] for c in chats] == ['page-3', 'page-2']
+    chats = client.get('/api/chats?databaseId=db').json['chats']
+    assert [c['notionPageId'] for c in chats] == ['page-2', 'page-1']
+    assert client.get('/api/chats?from=15/01/2024').status_code == 400
+
+    days = client.get('/api/chats/stats').json['days']
+    assert days == [
+        {"date": "2024-01-15", "chats": 2, "sent": 2, "blocksCount": 6, "bytes": 5, "durationMs": 500},
+        {"date": "2024-01-14", "chats": 1, "sent": 1, "blocksCount": 3, "bytes": 1, "durationMs": 250}
+    ]
+
+
+def test_history_queries_use_indexes():
+    """Test que les filtres par date et par base utilisent les index"""
+    with get_db_connection() as conn:
+        for column in ('date', 'database_id'):
+            plan = conn.execute(
+                f'EXPLAIN QUERY PLAN SELECT * FROM sent_chats WHERE {column} = ? ORDER BY id DESC LIMIT 10', ('x',)
+            ).fetchall()
+            assert any('USING INDEX' in row[3] for row in plan)
+
+
+def test_history_writer_survives_bad_records(client, monkeypatch):
+    """Test qu'une erreur d'écriture (hors SQLite) ne tue pas le thread d'historique"""
+    from services import chat_history
+
+    # Enregistrement invalide : ignoré, sans perdre le reste du lot
+    record_sent_chat('page-bad', 'db', {"title": "Invalide", "content": None, "date": '2024-01-15'}, 0, 0.1)
+    _record('page-1', 'Valide', 'User: premier')
+
+    def broken_insert(records, index_content):
+        raise TypeError("ligne non sérialisable")
+
+    monkeypatch.setattr(chat_history, 'insert_sent_chats', broken_insert)
+    _record('page-2', 'Perdu', 'User: perdu')
+    monkeypatch.undo()
+
+    record_sent_chat('page-3', 'db', {"title": "Après", "content": "User: après", "date": '2024-01-15'}, 3, 0.1)
+    flushed = threading.Thread(target=flush_history, daemon=True)
+    flushed.start()
+    flushed.join(5)
+    assert not flushed.is_alive()
+
+    page_ids = [chat['notionPageId'] for chat in client.get('/api/chats').json['chats']]
+    assert sorted(page_ids) == ['page-1', 'page-3']
@@ -0,0 +1,91 @@
+"""
+Tests unitaires pour async_notion_service
+"""
+import asyncio
+import json
+import httpx
+import pytest
+from notion_client import AsyncClient
+from services import async_notion_service
+
+
+DATABASE = {
+    "object": "database",
+    "title": [{"plain_text": "Chats"}],
+    "properties": {
+        "Name": {"id": "title", "type": "title"},
+        "Date": {"id": "date", "type": "date"}
+    }
+}
+
+
+def _make_client(handler):
+    return AsyncClient(auth="secret", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def test_detect_database_properties():
+    """Test détection des propriétés title et date en asynchrone"""
+    notion = _make_client(lambda request: httpx.Response(200, json=DATABASE))
+    title, date, properties = asyncio.run(async_notion_service.detect_database_properties(notion, "db"))
+    assert (title, date) == ("Name", "Date")
+    assert set(properties) == {"Name", "Date"}
+
+
+def test_get_database_structure():
+    """Test récupération de la structure en asynchrone"""
+    notion = _make_client(lambda request: httpx.Response(200, json=DATABASE))
+    structure = asyncio.run(async_notion_service.get_database_structure(notion, "db"))
+    assert structure["database_info"]["title"] == "Chats"
+    assert [p["name"] for p in structure["properties"]] == ["Name", "Date"]
+
+
+def test_create_notion_pages_concurrently():
+    """Test création de plusieurs pages avec leurs lots de blocs"""
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path, json.loads(request.content)))
+        if request.url.path == '/v1/pages':
+            return httpx.Response(200, json={"id": f"page-{len(requests)}"})
+        return httpx.Response(200, json={"results": []})
+
+    notion = _make_client(handler)
+    long_content = "\n".join("ligne %d" % i for i in range(120))
+    pages = [({"Name": {"title": []}}, "court"), ({"Name": {"title": []}}, long_content)]
+    results = asyncio.run(async_notion_service.create_notion_pages(notion, "db", pages, max_concurrency=2))
+
+    assert [count for _, count in results] == [1, 120]
+    assert len([r for r in requests if r[1] == '/v1/pages']) == 2
+    appends = [r for r in requests if r[0] == 'PATCH']
+    assert len(appends) == 1
+    assert appends[0][1] == f"/v1/blocks/{results[1][0]}/children"
+    assert len(appends[0][2]["children"]) == 20
+
+
+def test_create_page_uploads_local_images(tmp_path, monkeypatch):
+    """Test que le chemin asynchrone envoie aussi les images locales (remplaçant local de Notion)"""
+    from services import image_uploads
+
+    store = tmp_path / "store"
+    monkeypatch.setattr(image_uploads, 'IMAGE_LOCAL_ROOT', None)
+    monkeypatch.setattr(image_uploads, 'IMAGE_STORE_DIR', str(store))
+    monkeypatch.setattr(image_uploads, 'IMAGE_STORE_URL', 'https://images.test/')
+    image_uploads.clear_upload_cache()
+    (tmp_path / "shot.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"id": "page-1"})
+
+    notion = _make_client(handler)
+    page_id, _ = asyncio.run(async_notion_service.create_notion_page_with_blocks(
+        notion, "db", {"Name": {"title": []}}, "![Capture](shot.png)", image_base_dir=str(tmp_path)
+    ))
+
+    assert page_id == "page-1"
+    image = requests[0]["children"][0]["image"]
+    assert image["type"] == "external"
+    assert image["external"]["url"].startswith("https://images.test/")
+    assert len(list(store.iterdir())) == 1
+    image_uploads.clear_upload_cache()
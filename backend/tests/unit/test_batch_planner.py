@@ -0,0 +1,113 @@
+"""
+Tests unitaires pour batch_planner
+"""
+import json
+import httpx
+import pytest
+from notion_client import Client
+from parsers.block_types import TextBlock
+from services.batch_planner import (
+    plan_block_batches,
+    build_children_payload,
+    count_block_elements,
+    serialize_block,
+    serialize_json
+)
+from services.notion_service import create_notion_page_with_blocks
+
+
+def _paragraph(text):
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {"rich_text": [{"type": "text", "text": {"content": text}}]}
+    }
+
+
+def test_plan_respects_block_count():
+    """Test que les lots ne dépassent pas 100 blocs"""
+    blocks = [_paragraph("x") for _ in range(250)]
+    batches = plan_block_batches(blocks)
+    assert [len(b) for b in batches] == [100, 100, 50]
+
+
+def test_plan_respects_byte_budget():
+    """Test que les lots respectent le budget en octets"""
+    blocks = [_paragraph("a" * 2000) for _ in range(10)]
+    batches = plan_block_batches(blocks, max_bytes=5000)
+    assert len(batches) == 5
+    assert all(len(build_children_payload(b)) <= 5000 + 20 for b in batches)
+
+
+def test_plan_first_batch_overhead():
+    """Test que l'espace occupé par les propriétés réduit le premier lot"""
+    blocks = [_paragraph("a" * 100) for _ in range(10)]
+    size = len(json.dumps(blocks[0], separators=(',', ':'))) + 1
+    batches = plan_block_batches(blocks, max_bytes=size * 5, first_batch_overhead=size * 2)
+    assert len(batches[0]) == 3
+    assert len(batches[1]) == 5
+
+
+def test_plan_respects_element_count():
+    """Test que les enfants imbriqués comptent dans la limite d'éléments"""
+    parent = _paragraph("parent")
+    parent["paragraph"]["children"] = [_paragraph("child") for _ in range(9)]
+    assert count_block_elements(parent) == 10
+    batches = plan_block_batches([parent] * 5, max_elements=20)
+    assert [len(b) for b in batches] == [2, 2, 1]
+
+
+def test_build_children_payload_is_valid_json():
+    """Test que le payload assemblé est du JSON valide"""
+    blocks = [_paragraph("é"), _paragraph("b")]
+    batch = plan_block_batches(blocks)[0]
+    payload = build_children_payload(batch, {"parent": {"database_id": "db"}})
+    assert json.loads(payload) == {"parent": {"database_id": "db"}, "children": blocks}
+    assert json.loads(build_children_payload([])) == {"children": []}
+
+
+def test_create_page_retries_with_same_payload(mocker):
+    """Test que les nouvelles tentatives renvoient exactement les mêmes octets"""
+    mocker.patch('services.notion_service.time.sleep')
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.content)
+        if len(bodies) == 1:
+            return httpx.Response(429, json={"object": "error", "code": "rate_limited", "message": "slow down"})
+        if request.url.path.endswith('/pages'):
+            return httpx.Response(200, json={"id": "page-1"})
+        return httpx.Response(200, json={"results": []})
+
+    notion = Client(auth="secret", client=httpx.Client(transport=httpx.MockTransport(handler)))
+    content = "\n".join("ligne %d" % i for i in range(150))
+    page_id, count = create_notion_page_with_blocks(notion, "db", {"Name": {"title": []}}, content)
+
+    assert page_id == "page-1"
+    assert count == 150
+    assert len(bodies) == 3
+    assert bodies[0] == bodies[1]
+    assert len(json.loads(bodies[1])["children"]) == 100
+    assert len(json.loads(bodies[2])["children"]) == 50
+
+
+def test_compact_block_json_matches_dict():
+    """Test que les blocs compacts se sérialisent comme le dict Notion équivalent"""
+    blocks = [
+        TextBlock("paragraph"),
+        TextBlock("paragraph", 'Texte "entre guillemets" \\ é 🚀\n'),
+        TextBlock("heading_2", "Titre"),
+        TextBlock("bulleted_list_item", "élément"),
+        TextBlock("code", "print('x')", language="python"),
+        TextBlock("code", ("x" * 2000, "y"), language="plain text")
+    ]
+    for block in blocks:
+        assert serialize_block(block) == serialize_json(block.to_dict())
+        assert json.loads(block.to_json()) == block.to_dict()
+
+
+def test_plan_mixes_compact_and_dict_blocks():
+    """Test que les lots acceptent blocs compacts et dicts (images)"""
+    blocks = [TextBlock("paragraph", "a"), {"object": "block", "type": "image", "image": {}}]
+    batches = plan_block_batches(blocks)
+    assert json.loads(build_children_payload(batches[0]))["children"] == [blocks[0].to_dict(), blocks[1]]
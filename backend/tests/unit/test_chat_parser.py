@@ -3,7 +3,7 @@ Tests unitaires pour chat_parser
 """
 import pytest
 from datetime import datetime
-from parsers.chat_parser import parse_chat
+from parsers.chat_parser import parse_chat, split_chat_turns
 
 
 def test_parse_chat_with_date():
@@ -52,3 +52,19 @@ def test_parse_chat_long_title():
     
     assert len(result['title']) == 100
 
+
+
+def test_split_chat_turns():
+    """Test découpage d'une conversation en tours de parole"""
+    content = "Contexte\nUser: Bonjour\nsuite\nAssistant: Salut\n\nUser: Merci"
+    turns = split_chat_turns(content)
+
+    assert [t['role'] for t in turns] == ['User', 'Assistant', 'User']
+    assert turns[0]['content'] == "Contexte\nUser: Bonjour\nsuite"
+    assert turns[1]['content'] == "Assistant: Salut"
+
+
+def test_split_chat_turns_without_prefix():
+    """Test qu'un texte sans préfixe donne un seul tour"""
+    turns = split_chat_turns("Juste du texte\nsur deux lignes")
+    assert turns == [{"role": None, "content": "Juste du texte\nsur deux lignes"}]
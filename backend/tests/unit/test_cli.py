@@ -0,0 +1,82 @@
+"""
+Tests unitaires pour l'import en ligne de commande
+"""
+import io
+import json
+import threading
+import pytest
+import cli
+from services import outbox
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Remplace l'envoi à Notion : enregistre (contenu, date, priorité, dossier des images)"""
+    calls = []
+    lock = threading.Lock()
+
+    def fake_deliver_chat(payload, priority, image_base_dir):
+        if 'échec' in payload['content']:
+            raise ValueError("refusé par Notion")
+        with lock:
+            calls.append((payload['content'], payload['date'], priority, image_base_dir))
+            return f"page-{len(calls)}"
+
+    monkeypatch.setattr(outbox, 'deliver_chat', fake_deliver_chat)
+    return calls
+
+
+@pytest.fixture
+def transcripts(tmp_path):
+    """Arborescence d'exports : deux transcriptions, une à ignorer, une en sous-dossier"""
+    source = tmp_path / "exports"
+    (source / "2024").mkdir(parents=True)
+    (source / "a.md").write_text("User: bonjour\nAssistant: salut")
+    (source / "notes.json").write_text("{}")
+    (source / ".cache.md").write_text("caché")
+    (source / "2024" / "b.txt").write_text("User: question\nAssistant: réponse")
+    return source
+
+
+def test_directory_import_and_resume(tmp_path, transcripts, sent):
+    """Test du parcours récursif, du fichier d'état et de la reprise"""
+    state = str(tmp_path / "state.jsonl")
+    out = io.StringIO()
+
+    stats = cli.run_import(str(transcripts), workers=2, state_path=state, date='2024-05-01', out=out)
+    assert (stats['sent'], stats['skipped'], stats['failed']) == (2, 0, 0)
+    assert sorted(call[0][:10] for call in sent) == ["User: bonj", "User: ques"]
+    assert {call[1:3] for call in sent} == {('2024-05-01', 'bulk')}
+    assert str(transcripts / "2024") in {call[3] for call in sent}
+    assert "2 importé(s), 0 déjà importé(s), 0 en échec" in out.getvalue()
+
+    (transcripts / "c.md").write_text("User: nouveau")
+    stats = cli.run_import(str(transcripts), workers=2, state_path=state, out=io.StringIO())
+    assert (stats['sent'], stats['skipped']) == (1, 2)
+    assert sent[-1][0] == "User: nouveau"
+    with open(state, encoding='utf-8') as state_file:
+        assert [json.loads(line)['status'] for line in state_file] == ['sent'] * 3
+
+
+def test_failures_are_retried_on_resume(tmp_path, transcripts, sent):
+    """Test qu'un fichier en échec (ou vide) est signalé puis retenté à la relance"""
+    state = str(tmp_path / "state.jsonl")
+    (transcripts / "b.md").write_text("User: échec")
+    (transcripts / "vide.md").write_text("  \n")
+    out = io.StringIO()
+
+    stats = cli.run_import(str(transcripts / "*.md"), state_path=state, out=out)
+    assert (stats['sent'], stats['failed']) == (1, 2)
+    assert "ÉCHEC" in out.getvalue() and "refusé par Notion" in out.getvalue()
+
+    (transcripts / "b.md").write_text("User: corrigé")
+    stats = cli.run_import(str(transcripts / "*.md"), state_path=state, out=io.StringIO())
+    assert (stats['sent'], stats['skipped'], stats['failed']) == (1, 1, 1)
+    assert sent[-1][0] == "User: corrigé"
+
+
+def test_main_requires_configuration(monkeypatch, capsys):
+    """Test du refus d'importer sans configuration Notion"""
+    monkeypatch.setattr(cli, 'get_config', lambda: None)
+    assert cli.main(['import', 'exports']) == 2
+    assert "pas configuré" in capsys.readouterr().err
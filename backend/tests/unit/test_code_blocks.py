@@ -0,0 +1,92 @@
+"""
+Tests unitaires pour les blocs de code (langage, découpage)
+"""
+import json
+from parsers.block_creators import create_code_blocks, MAX_CODE_BLOCK_BYTES
+from parsers.code_languages import normalize_code_language, detect_code_language, NOTION_CODE_LANGUAGES
+from parsers.content_parser import parse_content_to_notion_blocks
+from services.batch_planner import MAX_PAYLOAD_BYTES, plan_block_batches, build_children_payload
+
+
+def test_normalize_code_language():
+    """Test de la normalisation du langage d'un fence"""
+    assert normalize_code_language("python") == "python"
+    assert normalize_code_language("py") == "python"
+    assert normalize_code_language("JS") == "javascript"
+    assert normalize_code_language("{.yml}") == "yaml"
+    assert normalize_code_language("ts title=app.ts") == "typescript"
+    assert normalize_code_language("language-rs") == "rust"
+    # INI n'est pas du TOML (commentaires ;, sections répétées) : pas de coloration
+    assert normalize_code_language("ini") == "plain text"
+    assert normalize_code_language("cfg") == "plain text"
+    assert normalize_code_language("plain text") == "plain text"
+    assert normalize_code_language("brainfuck") is None
+    assert normalize_code_language("") is None
+
+
+def test_aliases_target_notion_languages():
+    """Test que tous les alias pointent vers un langage accepté par Notion"""
+    from parsers.code_languages import CODE_LANGUAGE_ALIASES
+    assert set(CODE_LANGUAGE_ALIASES.values()) <= NOTION_CODE_LANGUAGES
+
+
+def test_detect_code_language():
+    """Test de la détection heuristique"""
+    assert detect_code_language("#!/bin/bash\necho hi") == "bash"
+    assert detect_code_language('{\n  "a": 1\n}') == "json"
+    assert detect_code_language("import os\n\ndef main():\n    pass") == "python"
+    assert detect_code_language("SELECT * FROM users;") == "sql"
+    assert detect_code_language("package main\n\nfunc main() {}") == "go"
+    assert detect_code_language("diff --git a/x b/x") == "diff"
+    assert detect_code_language("Bonjour, ceci est du texte.") is None
+
+
+def test_code_block_language_fallbacks():
+    """Test : langage inconnu détecté ou « plain text », jamais transmis tel quel"""
+    assert create_code_blocks(["x = 1"], "brainfuck")[0].language == "plain text"
+    assert create_code_blocks(["def f():", "    pass"], "")[0].language == "python"
+    assert create_code_blocks(["def f():", "    pass"], "", detect_language=False)[0].language == "plain text"
+
+
+def test_large_code_block_packs_segments():
+    """Test qu'un long log tient dans un bloc à plusieurs segments, sans légende"""
+    lines = [f"2024-01-01 12:00:{i % 60:02d} INFO ligne de log numéro {i}" for i in range(2000)]
+    blocks = create_code_blocks(lines, "log")
+
+    assert len(blocks) == 1
+    block = blocks[0].to_dict()
+    segments = block["code"]["rich_text"]
+    assert 1 < len(segments) <= 100
+    assert all(len(segment["text"]["content"]) <= 2000 for segment in segments)
+    assert "".join(segment["text"]["content"] for segment in segments) == "\n".join(lines)
+    assert block["code"]["caption"] == []
+    assert json.loads(blocks[0].to_json()) == block
+
+
+def test_code_block_split_over_segment_and_byte_limits():
+    """Test du découpage en plusieurs blocs (100 segments, taille d'un lot)"""
+    ascii_blocks = create_code_blocks(["a" * 250_000], "")
+    assert [len(block.text) for block in ascii_blocks] == [100, 25]
+
+    wide_blocks = create_code_blocks(["é" * 150_000], "")
+    assert len(wide_blocks) == 2
+    assert all(len(''.join(block.text).encode('utf-8')) <= MAX_CODE_BLOCK_BYTES for block in wide_blocks)
+
+
+def test_escape_heavy_code_block_fits_payload():
+    """Test que l'échappement JSON (guillemets, antislashs, contrôles) est compté dans la taille"""
+    content = '"\\\x01' * 100_000
+    blocks = create_code_blocks([content], "")
+    assert len(blocks) > 1
+    assert "".join("".join(block.text) for block in blocks) == content
+    for block in blocks:
+        assert len(block.to_json()) <= MAX_CODE_BLOCK_BYTES + 200
+
+    batches = plan_block_batches(blocks)
+    assert all(len(build_children_payload(batch)) <= MAX_PAYLOAD_BYTES for batch in batches)
+
+
+def test_fence_language_in_content():
+    """Test du langage normalisé depuis le contenu markdown"""
+    blocks = parse_content_to_notion_blocks("```sh\nls -la\n```")
+    assert blocks[0].to_dict()["code"]["language"] == "bash"
@@ -0,0 +1,50 @@
+"""
+Tests unitaires pour l'enregistrement différé des propriétés détectées
+"""
+import pytest
+from services import config_writer
+from services.config_writer import save_discovered_properties, flush_discovered_properties
+
+
+CONFIG = {'api_key': 'secret', 'database_id': 'db', 'title_property': 'Name', 'date_property': None}
+
+
+@pytest.fixture
+def saves(mocker, monkeypatch):
+    """Écritures de configuration (save_config simulé), sans délai automatique"""
+    monkeypatch.setattr(config_writer, 'DISCOVERY_SAVE_DELAY', 60)
+    mocker.patch('services.config_writer.get_config', return_value=dict(CONFIG))
+    save = mocker.patch('services.config_writer.save_config')
+    yield save
+    flush_discovered_properties()
+
+
+def test_unchanged_values_are_not_written(saves):
+    """Test qu'une valeur identique à la configuration ne déclenche aucune écriture"""
+    assert save_discovered_properties(CONFIG, 'Name', None) is False
+    flush_discovered_properties()
+    saves.assert_not_called()
+
+
+def test_repeated_discoveries_coalesced(saves):
+    """Test que des détections répétées ne donnent qu'une écriture, avec la dernière valeur"""
+    assert save_discovered_properties(CONFIG, 'Name', 'Date') is True
+    assert save_discovered_properties(CONFIG, 'Name', 'Date') is False
+    assert save_discovered_properties(CONFIG, 'Name', 'Créé le') is True
+    saves.assert_not_called()
+
+    flush_discovered_properties()
+    saves.assert_called_once_with('secret', 'db', 'Name', 'Créé le')
+    flush_discovered_properties()
+    assert saves.call_count == 1
+
+
+def test_debounced_write(saves, monkeypatch):
+    """Test de l'écriture automatique après le délai"""
+    import time
+    monkeypatch.setattr(config_writer, 'DISCOVERY_SAVE_DELAY', 0.05)
+    save_discovered_properties(CONFIG, 'Name', 'Date')
+    deadline = time.monotonic() + 2
+    while not saves.called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    saves.assert_called_once_with('secret', 'db', 'Name', 'Date')
@@ -0,0 +1,82 @@
+"""
+Tests unitaires pour le parsing du contenu en blocs Notion (tableaux, citations, listes)
+"""
+import json
+from parsers.content_parser import parse_content_to_notion_blocks
+from services.batch_planner import serialize_block, count_block_elements
+
+
+def as_dicts(blocks):
+    """Blocs sous forme de dicts Notion (via leur JSON)"""
+    return [json.loads(serialize_block(block)) for block in blocks]
+
+
+def cell_texts(row):
+    return ["".join(part["text"]["content"] for part in cell) for cell in row["table_row"]["cells"]]
+
+
+def test_table_becomes_single_block():
+    """Test qu'un tableau markdown devient un bloc table avec ses lignes"""
+    rows = "\n".join(f"| {i} | valeur \\| {i} |" for i in range(20))
+    content = f"Avant\n| Col A | Col B |\n|:---|---:|\n{rows}\nAprès"
+    blocks = as_dicts(parse_content_to_notion_blocks(content))
+
+    assert [block["type"] for block in blocks] == ["paragraph", "table", "paragraph"]
+    table = blocks[1]["table"]
+    assert table["table_width"] == 2
+    assert table["has_column_header"] is True
+    assert len(table["children"]) == 21
+    assert cell_texts(table["children"][0]) == ["Col A", "Col B"]
+    assert cell_texts(table["children"][1]) == ["0", "valeur | 0"]
+    assert count_block_elements(blocks[1]) == 22
+
+
+def test_table_rows_padded_and_split():
+    """Test des lignes incomplètes et des tableaux de plus de 100 lignes"""
+    rows = "\n".join(f"| {i} |" for i in range(150))
+    blocks = as_dicts(parse_content_to_notion_blocks(f"| a | b |\n|---|---|\n{rows}"))
+
+    assert [block["type"] for block in blocks] == ["table", "table"]
+    assert [len(block["table"]["children"]) for block in blocks] == [100, 52]
+    assert cell_texts(blocks[1]["table"]["children"][0]) == ["a", "b"]
+    assert cell_texts(blocks[0]["table"]["children"][1]) == ["0", ""]
+
+
+def test_pipe_without_separator_is_paragraph():
+    """Test qu'une ligne contenant « | » sans ligne de séparation reste un paragraphe"""
+    blocks = as_dicts(parse_content_to_notion_blocks("a | b\nsuite"))
+    assert [block["type"] for block in blocks] == ["paragraph", "paragraph"]
+
+
+def test_quote_and_divider():
+    """Test des citations sur plusieurs lignes et des séparateurs"""
+    blocks = as_dicts(parse_content_to_notion_blocks("> première\n> seconde\n---\n* * *\ntexte"))
+
+    assert [block["type"] for block in blocks] == ["quote", "divider", "divider", "paragraph"]
+    assert blocks[0]["quote"]["rich_text"][0]["text"]["content"] == "première\nseconde"
+
+
+def test_todo_items():
+    """Test des cases à cocher"""
+    blocks = as_dicts(parse_content_to_notion_blocks("- [ ] à faire\n- [x] fait\n- [lien](https://a.b)"))
+
+    assert [block["type"] for block in blocks] == ["to_do", "to_do", "bulleted_list_item"]
+    assert blocks[0]["to_do"]["checked"] is False
+    assert blocks[1]["to_do"]["checked"] is True
+    assert blocks[1]["to_do"]["rich_text"][0]["text"]["content"] == "fait"
+
+
+def test_nested_lists():
+    """Test de l'imbrication des listes selon l'indentation"""
+    content = "- parent\n  1. enfant\n    - petit-enfant\n      - trop profond\n- second"
+    blocks = as_dicts(parse_content_to_notion_blocks(content))
+
+    assert [block["type"] for block in blocks] == ["bulleted_list_item", "bulleted_list_item"]
+    child = blocks[0]["bulleted_list_item"]["children"][0]
+    assert child["type"] == "numbered_list_item"
+    grandchildren = child["numbered_list_item"]["children"]
+    # Notion n'accepte que deux niveaux d'imbrication par requête
+    assert [block["bulleted_list_item"]["rich_text"][0]["text"]["content"] for block in grandchildren] == [
+        "petit-enfant", "trop profond"
+    ]
+    assert "children" not in grandchildren[0]["bulleted_list_item"]
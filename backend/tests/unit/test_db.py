@@ -0,0 +1,84 @@
+"""
+Tests unitaires pour la couche d'accès SQLite (pool, WAL, thread d'écriture)
+"""
+import sqlite3
+import threading
+import pytest
+from db import init_db, get_db_connection, run_write, add_outbox_entry, get_outbox_entry
+
+
+@pytest.fixture(autouse=True)
+def empty_outbox():
+    """Outbox vide avant et après chaque test"""
+    init_db()
+    with get_db_connection() as conn:
+        conn.execute('DELETE FROM chat_outbox')
+        conn.commit()
+    yield
+    with get_db_connection() as conn:
+        conn.execute('DELETE FROM chat_outbox')
+        conn.commit()
+
+
+def test_pooled_connection_settings():
+    """Test que les connexions sont réutilisées, en WAL avec un busy_timeout"""
+    with get_db_connection() as conn:
+        first = conn
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+        conn.execute("INSERT INTO chat_outbox (payload) VALUES ('{}')")
+    with get_db_connection() as conn:
+        assert conn is first
+        # La transaction non validée a été annulée au retour dans le pool
+        assert not conn.in_transaction
+        assert conn.execute('SELECT COUNT(*) FROM chat_outbox').fetchone()[0] == 0
+
+
+def test_concurrent_writes():
+    """Test d'écritures simultanées depuis plusieurs threads, sans « database is locked »"""
+    ids = []
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(25):
+                ids.append(add_outbox_entry({"thread": n, "i": i}))
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(ids)) == 200
+    assert get_outbox_entry(ids[0])['status'] == 'pending'
+
+
+def test_failed_write_is_isolated():
+    """Test qu'une écriture en échec n'annule pas les autres écritures du lot"""
+    with pytest.raises(sqlite3.OperationalError):
+        run_write(lambda conn: conn.execute('INSERT INTO table_absente VALUES (1)'))
+    entry_id = add_outbox_entry({"content": "ok"})
+    assert get_outbox_entry(entry_id)['payload'] == {"content": "ok"}
+
+
+def test_writer_failure_is_raised_and_recovered(monkeypatch):
+    """Test qu'un thread d'écriture incapable de se connecter fait échouer les écritures sans bloquer"""
+    import db
+
+    def unreachable():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    db.close_db_connections()
+    with monkeypatch.context() as patch:
+        patch.setattr(db, '_connect', unreachable)
+        patch.setattr(db, 'DB_WRITE_TIMEOUT', 5)
+        with pytest.raises(sqlite3.OperationalError):
+            add_outbox_entry({"content": "perdu"})
+
+    # Le thread suivant, relancé par run_write, écrit normalement
+    entry_id = add_outbox_entry({"content": "ok"})
+    assert get_outbox_entry(entry_id)['payload'] == {"content": "ok"}
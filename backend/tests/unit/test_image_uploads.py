@@ -0,0 +1,118 @@
+"""
+Tests unitaires pour l'envoi des images locales et data URI
+"""
+import base64
+import httpx
+import pytest
+from notion_client import Client
+from parsers.content_parser import parse_content_to_notion_blocks
+from services import image_uploads
+from services.image_uploads import resolve_block_images, clear_upload_cache
+
+
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+DATA_URI = "data:image/png;base64," + base64.b64encode(PNG).decode()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    """Cache vide, sans dossier local ni remplaçant de Notion"""
+    monkeypatch.setattr(image_uploads, 'IMAGE_LOCAL_ROOT', None)
+    monkeypatch.setattr(image_uploads, 'IMAGE_STORE_DIR', None)
+    clear_upload_cache()
+    yield
+    clear_upload_cache()
+
+
+@pytest.fixture
+def notion_api():
+    """Fausse API Notion (file_uploads) : enregistre les requêtes reçues"""
+    calls = []
+
+    def handler(request):
+        calls.append((request.method, request.url.path))
+        if request.url.path == '/v1/file_uploads':
+            return httpx.Response(200, json={"object": "file_upload", "id": f"upload-{len(calls)}"})
+        assert b'filename="shot.png"' in request.content
+        return httpx.Response(200, json={"object": "file_upload", "status": "uploaded"})
+
+    notion = Client(auth='secret', client=httpx.Client(transport=httpx.MockTransport(handler)))
+    return notion, calls
+
+
+def test_local_images_uploaded_once(tmp_path, notion_api):
+    """Test : mêmes octets sous deux noms = un seul envoi, réutilisé au chat suivant"""
+    notion, calls = notion_api
+    (tmp_path / "shot.png").write_bytes(PNG)
+    (tmp_path / "copie.png").write_bytes(PNG)
+    blocks = parse_content_to_notion_blocks("![Capture](shot.png)\ntexte\n![](copie.png)")
+
+    assert resolve_block_images(notion, blocks, base_dir=str(tmp_path)) == 1
+    assert calls == [('POST', '/v1/file_uploads'), ('POST', '/v1/file_uploads/upload-1/send')]
+    assert blocks[0]["image"] == {
+        "caption": [{"type": "text", "text": {"content": "Capture"}}],
+        "type": "file_upload",
+        "file_upload": {"id": "upload-1"}
+    }
+    assert blocks[2]["image"]["file_upload"] == {"id": "upload-1"}
+
+    again = parse_content_to_notion_blocks("![](shot.png)")
+    resolve_block_images(notion, again, base_dir=str(tmp_path))
+    assert len(calls) == 2
+    assert again[0]["image"]["file_upload"] == {"id": "upload-1"}
+
+
+def test_data_uris_use_local_store(tmp_path, monkeypatch, notion_api):
+    """Test du remplaçant local de Notion (IMAGE_STORE_DIR)"""
+    notion, calls = notion_api
+    monkeypatch.setattr(image_uploads, 'IMAGE_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(image_uploads, 'IMAGE_STORE_URL', 'https://images.test/')
+    blocks = parse_content_to_notion_blocks(f"![a]({DATA_URI})\n![b]({DATA_URI})")
+
+    resolve_block_images(notion, blocks)
+    assert calls == []
+    assert len(list(tmp_path.iterdir())) == 1
+    url = blocks[0]["image"]["external"]["url"]
+    assert url.startswith("https://images.test/") and url.endswith(".png")
+    assert blocks[1]["image"] == {
+        "caption": [{"type": "text", "text": {"content": "b"}}], "type": "external", "external": {"url": url}
+    }
+
+
+def test_unavailable_images_become_paragraphs(tmp_path, notion_api):
+    """Test : image hors dossier autorisé, sans dossier, ou data URI invalide"""
+    notion, calls = notion_api
+    (tmp_path / "shot.png").write_bytes(PNG)
+    content = f"![](shot.png)\n![]({tmp_path}/../secret.png)\n![](data:text/html,<b>x</b>)"
+
+    blocks = parse_content_to_notion_blocks(content)
+    resolve_block_images(notion, blocks)
+    assert [block.type for block in blocks] == ["paragraph"] * 3
+    assert blocks[2].text == "[Image indisponible : data URI]"
+
+    blocks = parse_content_to_notion_blocks(content)
+    resolve_block_images(notion, blocks, base_dir=str(tmp_path))
+    assert blocks[0]["image"]["type"] == "file_upload"
+    assert blocks[1].type == "paragraph"
+    assert len(calls) == 2
+
+
+def test_uncomparable_paths_become_paragraphs(tmp_path, monkeypatch, notion_api):
+    """Test : chemin non comparable (autre lecteur Windows, octet nul) = image indisponible"""
+    notion, calls = notion_api
+    (tmp_path / "shot.png").write_bytes(PNG)
+
+    blocks = parse_content_to_notion_blocks("![](shot\x00.png)")
+    resolve_block_images(notion, blocks, base_dir=str(tmp_path))
+    assert blocks[0].type == "paragraph"
+
+    def other_drive(paths):
+        raise ValueError("Paths don't have the same drive")
+
+    monkeypatch.setattr(image_uploads.os.path, 'commonpath', other_drive)
+    blocks = parse_content_to_notion_blocks("![](shot.png)")
+    resolve_block_images(notion, blocks, base_dir=str(tmp_path))
+    assert blocks[0].type == "paragraph"
+    assert calls == []
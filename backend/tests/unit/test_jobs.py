@@ -0,0 +1,62 @@
+"""
+Tests unitaires pour le suivi des envois (jobs)
+"""
+import time
+import threading
+import pytest
+from services.jobs import JobCancelled, start_job, get_job, cancel_job, end_job
+from services.rate_limiter import RateLimiter
+from parsers.content_parser import parse_content_to_notion_blocks
+
+
+def test_cancel_job():
+    """Test qu'un job annulé lève JobCancelled"""
+    job = start_job()
+    job.check()
+    assert cancel_job(job.id)
+    with pytest.raises(JobCancelled) as error:
+        job.check()
+    assert error.value.reason == 'cancelled'
+    end_job(job)
+    assert get_job(job.id) is None
+
+
+def test_duplicate_job_id():
+    """Test qu'un même id ne peut pas être utilisé par deux envois en cours"""
+    job = start_job('dup')
+    with pytest.raises(ValueError):
+        start_job('dup')
+    end_job(job)
+
+
+def test_job_deadline():
+    """Test qu'un job dépasse son délai"""
+    job = start_job(timeout=0.01)
+    time.sleep(0.02)
+    with pytest.raises(JobCancelled) as error:
+        job.check()
+    assert error.value.reason == 'deadline'
+    end_job(job)
+
+
+def test_rate_limiter_wait_interrupted_by_cancel():
+    """Test que l'attente d'un jeton s'interrompt à l'annulation, sans jeton consommé"""
+    limiter = RateLimiter(rate=0.5, burst=1)
+    limiter.acquire()
+    job = start_job()
+    threading.Timer(0.05, job.cancel).start()
+
+    start = time.monotonic()
+    with pytest.raises(JobCancelled):
+        limiter.acquire(job)
+    assert time.monotonic() - start < 1
+    end_job(job)
+
+
+def test_parsing_checks_job():
+    """Test que le parsing vérifie l'annulation"""
+    job = start_job()
+    job.cancel()
+    with pytest.raises(JobCancelled):
+        parse_content_to_notion_blocks("ligne\n" * 2000, check=job.check)
+    end_job(job)
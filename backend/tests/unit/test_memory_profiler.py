@@ -0,0 +1,30 @@
+"""
+Tests unitaires pour le profilage mémoire par étape
+"""
+import threading
+import tracemalloc
+from services.memory_profiler import MemoryProfile
+
+
+def test_stages_of_concurrent_requests_overlap():
+    """Test que deux étapes profilées (envoi à Notion par ex.) s'exécutent en parallèle"""
+    both_inside = threading.Barrier(2, timeout=5)
+    profiles = [MemoryProfile(), MemoryProfile()]
+
+    def run(profile):
+        with profile.stage('upload'):
+            data = [bytearray(1024) for _ in range(10)]
+            both_inside.wait()
+            del data
+
+    threads = [threading.Thread(target=run, args=(profile,)) for profile in profiles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not both_inside.broken
+    assert [profile.stages[0]["stage"] for profile in profiles] == ['upload', 'upload']
+    assert all(profile.stages[0]["peakBytes"] > 0 for profile in profiles)
+    # tracemalloc est arrêté par la dernière étape terminée
+    assert not tracemalloc.is_tracing()
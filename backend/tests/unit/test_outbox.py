@@ -0,0 +1,73 @@
+"""
+Tests unitaires pour l'outbox des envois différés
+"""
+import time
+import httpx
+import pytest
+from db import get_db_connection, init_db, add_outbox_entry, get_outbox_entry
+from services.outbox import drain_outbox, is_transient_error, OutboxNotReady
+
+
+@pytest.fixture(autouse=True)
+def empty_outbox():
+    init_db()
+    with get_db_connection() as conn:
+        conn.execute('DELETE FROM chat_outbox')
+        conn.commit()
+
+
+def test_drain_delivers_in_order(mocker):
+    """Test que les entrées sont livrées dans l'ordre d'acceptation"""
+    delivered = []
+    mocker.patch('services.outbox.deliver_chat', side_effect=lambda p: delivered.append(p['content']) or 'page')
+    ids = [add_outbox_entry({"content": c}) for c in ('a', 'b', 'c')]
+
+    assert drain_outbox() is None
+    assert delivered == ['a', 'b', 'c']
+    assert all(get_outbox_entry(i)['status'] == 'sent' for i in ids)
+
+
+def test_transient_error_blocks_queue(mocker):
+    """Test qu'une erreur temporaire est retentée plus tard sans livrer les entrées suivantes"""
+    deliver = mocker.patch('services.outbox.deliver_chat', side_effect=httpx.ConnectError('down'))
+    first = add_outbox_entry({"content": "a"})
+    second = add_outbox_entry({"content": "b"})
+
+    delay = drain_outbox()
+    assert delay == 2.0
+    assert deliver.call_count == 1
+    entry = get_outbox_entry(first)
+    assert (entry['status'], entry['attempts'], entry['last_error']) == ('pending', 1, 'down')
+    assert entry['next_attempt_at'] > time.time()
+    assert get_outbox_entry(second)['attempts'] == 0
+
+    # Avant l'échéance, rien n'est retenté
+    assert 0 < drain_outbox() <= 2.0
+    assert deliver.call_count == 1
+
+
+def test_permanent_error_fails_entry(mocker):
+    """Test qu'une erreur définitive marque l'entrée en échec et la file continue"""
+    mocker.patch('services.outbox.deliver_chat', side_effect=[ValueError('invalide'), 'page'])
+    first = add_outbox_entry({"content": "a"})
+    second = add_outbox_entry({"content": "b"})
+
+    assert drain_outbox() is None
+    assert get_outbox_entry(first)['status'] == 'failed'
+    assert get_outbox_entry(second)['notion_page_id'] == 'page'
+
+
+def test_is_transient_error():
+    """Test la classification des erreurs de livraison"""
+    from notion_client.errors import APIResponseError
+
+    def api_error(status, code):
+        response = httpx.Response(status, request=httpx.Request('POST', 'https://api.notion.com/v1/pages'))
+        return APIResponseError(response, 'erreur', code)
+
+    assert is_transient_error(OutboxNotReady())
+    assert is_transient_error(httpx.ReadTimeout('lent'))
+    assert is_transient_error(api_error(429, 'rate_limited'))
+    assert is_transient_error(api_error(502, 'internal_server_error'))
+    assert not is_transient_error(api_error(400, 'validation_error'))
+    assert not is_transient_error(ValueError())
@@ -0,0 +1,58 @@
+"""
+Tests unitaires pour le registre des règles de parsing
+"""
+import pytest
+from parsers.block_types import TextBlock
+from parsers.content_parser import parse_content_to_notion_blocks
+from parsers.parser_rules import (
+    PARSER_RULES,
+    ParserRule,
+    register_parser_rule,
+    validate_parser_rules,
+    compile_parser_rules
+)
+
+
+def block_types(blocks):
+    return [block["type"] if isinstance(block, dict) else block.type for block in blocks]
+
+
+def test_disabled_rules_fall_back_to_paragraphs():
+    """Test qu'une règle désactivée laisse la ligne en paragraphe"""
+    content = "# Titre\nhttps://exemple.fr/image.png\n- élément"
+    assert block_types(parse_content_to_notion_blocks(content)) == ["heading_1", "image", "bulleted_list_item"]
+    assert block_types(parse_content_to_notion_blocks(content, rules=["heading"])) == [
+        "heading_1", "paragraph", "paragraph"
+    ]
+    assert block_types(parse_content_to_notion_blocks(content, rules=[])) == ["paragraph"] * 3
+
+
+def test_rule_order():
+    """Test que la première règle (dans l'ordre configuré) qui consomme la ligne l'emporte"""
+    assert block_types(parse_content_to_notion_blocks("---", rules=["divider", "list"])) == ["divider"]
+    assert block_types(parse_content_to_notion_blocks("- - -", rules=["list", "divider"])) == ["bulleted_list_item"]
+
+
+def test_dispatch_skips_rules_by_prefix(mocker):
+    """Test que seules les règles dont le préfixe peut correspondre sont essayées"""
+    parse = mocker.Mock(return_value=([TextBlock("quote", "!")], 1))
+    register_parser_rule(ParserRule('bang', parse, '!'))
+    try:
+        blocks = parse_content_to_notion_blocks("texte\n!important\nautre", rules=["bang"])
+        assert block_types(blocks) == ["paragraph", "quote", "paragraph"]
+        assert parse.call_count == 1
+
+        by_char, anywhere = compile_parser_rules(("bang", "image_url"))
+        assert [rule.name for rule in by_char['!']] == ["bang", "image_url"]
+        assert [rule.name for rule in anywhere] == ["image_url"]
+    finally:
+        del PARSER_RULES['bang']
+        compile_parser_rules.cache_clear()
+
+
+def test_validate_parser_rules():
+    """Test de la validation des règles configurées"""
+    assert validate_parser_rules(["code", "table"]) == ["code", "table"]
+    for invalid in (["inconnue"], ["code", "code"], "code", [1]):
+        with pytest.raises(ValueError):
+            validate_parser_rules(invalid)
@@ -2,7 +2,7 @@
 Tests unitaires pour property_formatter
 """
 import pytest
-from utils.property_formatter import format_notion_property
+from utils.property_formatter import format_notion_property, compile_property_formatters
 
 
 def test_format_rich_text():
@@ -81,3 +81,30 @@ def test_format_default_type():
         }]
     }
 
+
+def test_compile_property_formatters():
+    """Test formateurs compilés à partir d'un schéma"""
+    db_properties = {
+        'Tags': {'type': 'multi_select', 'multi_select': {'options': [{'name': 'a'}, {'name': 'b'}]}},
+        'Status': {'type': 'select', 'select': {'options': [{'name': 'Done'}]}},
+        'Score': {'type': 'number'}
+    }
+    formatters = compile_property_formatters(db_properties)
+
+    assert formatters['Tags']('a, c, b') == {"multi_select": [{"name": "a"}, {"name": "b"}]}
+    assert formatters['Status']('Done') == {"select": {"name": "Done"}}
+    assert formatters['Status']('Todo') is None
+    assert formatters['Score']('3') == {"number": 3.0}
+    assert formatters['Score']('') is None
+
+
+def test_format_property_without_compiling(monkeypatch):
+    """Test qu'un formatage isolé ne compile pas de formateur (même résultat)"""
+    from utils import property_formatter
+    prop_data = {'type': 'multi_select', 'multi_select': {'options': [{'name': 'a'}, {'name': 'b'}]}}
+    expected = compile_property_formatters({'Tags': prop_data})['Tags']('a, c, b')
+
+    monkeypatch.setattr(property_formatter, 'compile_property_formatter', None)
+    assert format_notion_property('multi_select', 'a, c, b', prop_data) == expected
+    assert format_notion_property('multi_select', 'c', prop_data) is None
+    assert format_notion_property('relation', 'page-1', {}) == {"relation": [{"id": "page-1"}]}
@@ -0,0 +1,63 @@
+"""
+Tests unitaires pour le limiteur de débit et son ordonnancement équitable
+"""
+import threading
+import time
+from services.jobs import Job
+from services.rate_limiter import RateLimiter, PRIORITY_INTERACTIVE, PRIORITY_BULK, PRIORITY_BACKGROUND
+
+
+def _run_flows(limiter, flows, requests_per_flow, stagger=0.03):
+    """Lance un thread par flux (démarrés en décalé) et retourne l'ordre d'attribution des jetons"""
+    order = []
+    order_lock = threading.Lock()
+
+    def worker(name, priority, flow):
+        job = Job(name, priority=priority, flow=flow)
+        for _ in range(requests_per_flow):
+            limiter.acquire(job)
+            with order_lock:
+                order.append(name)
+
+    threads = [threading.Thread(target=worker, args=flow) for flow in flows]
+    for thread in threads:
+        thread.start()
+        time.sleep(stagger)
+    for thread in threads:
+        thread.join(5)
+    return order
+
+
+def test_interactive_overtakes_background():
+    """Test qu'un envoi interactif passe devant un envoi de fond déjà en attente"""
+    limiter = RateLimiter(rate=50, burst=1)
+    order = _run_flows(limiter, [
+        ('background', PRIORITY_BACKGROUND, 'db'),
+        ('interactive', PRIORITY_INTERACTIVE, 'db')
+    ], requests_per_flow=6)
+
+    first = order.index('interactive')
+    assert order[first:first + 6] == ['interactive'] * 6
+    assert order.count('background') == 6
+
+
+def test_same_priority_flows_share_tokens():
+    """Test que deux bases de même priorité se partagent équitablement le débit"""
+    limiter = RateLimiter(rate=50, burst=1)
+    order = _run_flows(limiter, [
+        ('a', PRIORITY_BULK, 'db-a'),
+        ('b', PRIORITY_BULK, 'db-b')
+    ], requests_per_flow=8)
+
+    first = order.index('b')
+    window = order[first:first + 8]
+    assert window.count('a') == window.count('b') == 4
+
+
+def test_acquire_without_job():
+    """Test que les jetons de la rafale sont attribués sans attente"""
+    limiter = RateLimiter(rate=1, burst=3)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.1
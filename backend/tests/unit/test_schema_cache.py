@@ -0,0 +1,107 @@
+"""
+Tests unitaires pour schema_cache et les validateurs compilés
+"""
+from unittest.mock import MagicMock
+import pytest
+from services.schema_cache import get_database_schema, invalidate_database_schema, ensure_select_options
+from services.property_validator import validate_properties_batch
+
+
+DATABASE = {
+    "title": [],
+    "properties": {
+        "Name": {"id": "title", "type": "title"},
+        "Status": {"id": "s", "type": "select", "select": {"options": [{"name": "Done"}, {"name": "Todo"}]}},
+        "Tags": {"id": "t", "type": "multi_select", "multi_select": {"options": [{"name": "a"}]}}
+    }
+}
+
+
+@pytest.fixture
+def notion():
+    invalidate_database_schema()
+    client = MagicMock()
+    client.options.auth = 'secret'
+    client.databases.retrieve.return_value = DATABASE
+    yield client
+    invalidate_database_schema()
+
+
+def test_schema_is_cached(notion):
+    """Test que le schéma n'est récupéré qu'une fois tant qu'il est récent"""
+    first = get_database_schema(notion, 'db')
+    second = get_database_schema(notion, 'db')
+    assert first is second
+    assert notion.databases.retrieve.call_count == 1
+
+    get_database_schema(notion, 'db', max_age=0)
+    assert notion.databases.retrieve.call_count == 2
+
+
+def test_invalidate_schema(notion):
+    """Test que l'invalidation force une nouvelle récupération"""
+    get_database_schema(notion, 'db')
+    invalidate_database_schema('db')
+    get_database_schema(notion, 'db')
+    assert notion.databases.retrieve.call_count == 2
+
+
+def test_compiled_helpers_are_reused(notion):
+    """Test que formateurs et validateurs sont compilés une seule fois par schéma"""
+    schema = get_database_schema(notion, 'db')
+    assert schema.formatters is schema.formatters
+    assert schema.validators is schema.validators
+    assert schema.detect()[0] == 'Name'
+
+
+def test_validate_with_compiled_validators(notion):
+    """Test validation avec les validateurs compilés du schéma"""
+    schema = get_database_schema(notion, 'db')
+    results = validate_properties_batch(
+        schema.structure['properties'],
+        {'Status': 'Done', 'Tags': ['a', 'z'], 'Name': '', 'Unknown': 'x'},
+        schema.validators
+    )
+    assert results['Status'] == {"valid": True, "error": None}
+    assert results['Tags']['valid'] is False
+    assert 'z' in results['Tags']['error']
+    assert results['Name'] == {"valid": False, "error": "Property 'Name' is required"}
+    assert results['Unknown']['valid'] is False
+
+
+def test_multi_select_rejects_unhashable_items(notion):
+    """Test qu'un élément non textuel (liste, dict) est une valeur invalide, pas une erreur"""
+    schema = get_database_schema(notion, 'db')
+    for value in ([["a"]], [{"name": "a"}], ["a", 3]):
+        results = validate_properties_batch(schema.structure['properties'], {'Tags': value}, schema.validators)
+        assert results['Tags']['valid'] is False
+        assert "Invalid options for 'Tags'" in results['Tags']['error']
+
+
+def test_select_options_update_uses_live_schema(notion):
+    """Test que la création d'options part du schéma actuel (option ajoutée dans Notion conservée)"""
+    get_database_schema(notion, 'db')
+    live = {"title": [], "properties": dict(DATABASE["properties"], Tags={
+        "id": "t", "type": "multi_select", "multi_select": {"options": [{"name": "a"}, {"name": "b"}]}
+    })}
+    notion.databases.retrieve.return_value = live
+    notion.databases.update.return_value = live
+
+    _, created = ensure_select_options(notion, 'db', [{"Tags": ["b", "c"]}])
+    assert created == {"Tags": ["c"]}
+    options = notion.databases.update.call_args.kwargs["properties"]["Tags"]["multi_select"]["options"]
+    assert options == [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+
+
+def test_schema_calls_go_through_rate_limiter(notion, monkeypatch):
+    """Test que la lecture du schéma et l'ajout d'options prennent un jeton du limiteur partagé"""
+    from services.rate_limiter import get_rate_limiter
+    limiter = get_rate_limiter('secret')
+    acquired = []
+    monkeypatch.setattr(limiter, 'acquire', lambda job=None: acquired.append(job))
+    notion.databases.update.return_value = DATABASE
+
+    ensure_select_options(notion, 'db', [{"Tags": ["z"]}])
+    # Lecture initiale, relecture avant mise à jour, mise à jour
+    assert len(acquired) == 3
+    assert notion.databases.retrieve.call_count == 2 and notion.databases.update.call_count == 1
@@ -0,0 +1,109 @@
+"""
+Tests unitaires pour le serveur de production (serve)
+"""
+import http.client
+import threading
+import time
+import pytest
+from serve import parse_args, create_production_server, run_until_drained, LazyApplication
+
+
+def slow_app(environ, start_response):
+    """Application WSGI lente pour simuler une requête en cours"""
+    time.sleep(0.5)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'done']
+
+
+def test_parse_args_defaults():
+    """Test des options par défaut"""
+    options = parse_args([])
+    assert options.port == 5000
+    assert options.threads == 8
+    assert options.host == '127.0.0.1'
+
+
+def test_parse_args_tuning():
+    """Test des options de réglage threads/backlog/keep-alive"""
+    options = parse_args(['--threads', '16', '--backlog', '64', '--channel-timeout', '30', '--port', '0'])
+    server = create_production_server(slow_app, options)
+    try:
+        assert server.adj.threads == 16
+        assert server.adj.backlog == 64
+        assert server.adj.channel_timeout == 30
+    finally:
+        run_until_drained(server, _set_event(), drain_timeout=0)
+
+
+def _set_event():
+    event = threading.Event()
+    event.set()
+    return event
+
+
+def test_graceful_drain_finishes_in_flight_request():
+    """Test que l'arrêt termine la requête en cours puis refuse les nouvelles"""
+    server = create_production_server(slow_app, parse_args(['--port', '0', '--threads', '2']))
+    port = server.effective_port
+    stop_event = threading.Event()
+    runner = threading.Thread(target=run_until_drained, args=(server, stop_event, 5))
+    runner.start()
+
+    result = {}
+
+    def do_request():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', '/')
+        response = conn.getresponse()
+        result['status'] = response.status
+        result['body'] = response.read()
+
+    client = threading.Thread(target=do_request)
+    client.start()
+    time.sleep(0.2)
+    stop_event.set()
+    client.join(5)
+    runner.join(5)
+
+    assert result == {'status': 200, 'body': b'done'}
+    assert not runner.is_alive()
+    with pytest.raises(OSError):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+        conn.request('GET', '/')
+        conn.getresponse()
+
+
+def test_lazy_application_serves_health_before_loading():
+    """Test que /api/health répond sans charger l'application"""
+    loaded = []
+
+    def loader():
+        loaded.append(True)
+        return slow_app
+
+    lazy = LazyApplication(loader)
+    statuses = []
+    body = lazy({'PATH_INFO': '/api/health'}, lambda status, headers: statuses.append(status))
+    assert statuses == ['200 OK']
+    assert b'healthy' in b''.join(body)
+    assert loaded == []
+
+    lazy.load()
+    lazy.load()
+    assert loaded == [True]
+
+
+def test_lazy_application_reports_load_failure():
+    """Test qu'un échec de chargement donne une 503 sur health et sur les autres routes"""
+    def loader():
+        raise ImportError("No module named 'flask'")
+
+    lazy = LazyApplication(loader)
+    with pytest.raises(ImportError):
+        lazy.load()
+
+    for path in ('/api/health', '/api/config'):
+        statuses = []
+        body = b''.join(lazy({'PATH_INFO': path}, lambda status, headers: statuses.append(status)))
+        assert statuses == ['503 Service Unavailable']
+        assert "No module named 'flask'" in body.decode('utf-8')
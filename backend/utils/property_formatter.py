@@ -7,82 +7,90 @@ from datetime import datetime
 def format_notion_property(prop_type, value, prop_data):
     """
     Formate une valeur selon le type de propriété Notion
+
+    Pour un appel isolé, la dispatch est directe (aucun formateur compilé) ;
+    pour formater de nombreuses valeurs d'un même schéma, voir
+    compile_property_formatters.
     """
     if not value:
         return None
-    
-    if prop_type == 'rich_text' or prop_type == 'title':
-        return {
-            "rich_text": [
-                {
-                    "type": "text",
-                    "text": {
-                        "content": str(value)
-                    }
-                }
-            ]
-        }
-    elif prop_type == 'number':
-        try:
-            return {"number": float(value)}
-        except (ValueError, TypeError):
-            return None
-    elif prop_type == 'select':
-        return _format_select_property(value, prop_data)
-    elif prop_type == 'multi_select':
-        return _format_multi_select_property(value, prop_data)
-    elif prop_type == 'checkbox':
-        return {"checkbox": bool(value)}
-    elif prop_type == 'date':
-        return _format_date_property(value)
-    elif prop_type == 'url':
-        return {"url": str(value)}
-    elif prop_type == 'email':
-        return {"email": str(value)}
-    elif prop_type == 'phone_number':
-        return {"phone_number": str(value)}
-    elif prop_type == 'people':
-        return {"people": [{"id": str(value)}]} if value else None
-    elif prop_type == 'files':
-        return None  # Format complexe, non supporté pour l'instant
-    elif prop_type == 'relation':
-        return {"relation": [{"id": str(value)}]} if value else None
+    format_options = _OPTION_FORMATTERS.get(prop_type)
+    if format_options:
+        return format_options(value, _option_names(prop_type, prop_data))
+    return _SIMPLE_FORMATTERS.get(prop_type, _format_text_property)(value)
+
+
+def compile_property_formatter(prop_type, prop_data):
+    """
+    Compile le formateur d'une propriété : la dispatch sur le type et la
+    préparation des options ne sont faites qu'une fois par propriété
+
+    Returns:
+        function: value -> propriété Notion formatée (ou None)
+    """
+    format_options = _OPTION_FORMATTERS.get(prop_type)
+    if format_options:
+        option_names = frozenset(_option_names(prop_type, prop_data))
+
+        def formatter(value):
+            return format_options(value, option_names)
     else:
-        # Par défaut, traiter comme du texte
-        return {
-            "rich_text": [
-                {
-                    "type": "text",
-                    "text": {
-                        "content": str(value)
-                    }
+        formatter = _SIMPLE_FORMATTERS.get(prop_type, _format_text_property)
+
+    def format_value(value):
+        if not value:
+            return None
+        return formatter(value)
+
+    return format_value
+
+
+def compile_property_formatters(db_properties):
+    """Compile les formateurs de toutes les propriétés d'un schéma {nom: formateur}"""
+    return {
+        prop_name: compile_property_formatter(prop_data.get('type', ''), prop_data)
+        for prop_name, prop_data in db_properties.items()
+    }
+
+
+def _format_text_property(value):
+    """Formate une propriété texte (rich_text, title, et types inconnus)"""
+    return {
+        "rich_text": [
+            {
+                "type": "text",
+                "text": {
+                    "content": str(value)
                 }
-            ]
-        }
+            }
+        ]
+    }
+
+
+def _format_number_property(value):
+    """Formate une propriété de type number"""
+    try:
+        return {"number": float(value)}
+    except (ValueError, TypeError):
+        return None
+
 
+def _option_names(prop_type, prop_data):
+    """Noms des options d'une propriété select ou multi_select"""
+    return [opt['name'] for opt in prop_data.get(prop_type, {}).get('options', [])]
 
-def _format_select_property(value, prop_data):
-    """Formate une propriété de type select"""
-    options = prop_data.get('select', {}).get('options', [])
-    option_names = [opt['name'] for opt in options]
+
+def _format_select_property(value, option_names):
+    """Formate une propriété select (option existante uniquement)"""
     if str(value) in option_names:
         return {"select": {"name": str(value)}}
     return None
 
 
-def _format_multi_select_property(value, prop_data):
-    """Formate une propriété de type multi_select"""
-    if isinstance(value, str):
-        values = [v.strip() for v in value.split(',')]
-    elif isinstance(value, list):
-        values = [str(v) for v in value]
-    else:
-        values = [str(value)]
-    
-    options = prop_data.get('multi_select', {}).get('options', [])
-    option_names = [opt['name'] for opt in options]
+def _format_multi_select_property(value, option_names):
+    """Formate une propriété multi_select (options existantes uniquement)"""
+    values = split_multi_select_value(value)
     valid_values = [v for v in values if v in option_names]
-    
     if valid_values:
         return {
             "multi_select": [{"name": v} for v in valid_values]
@@ -90,6 +98,15 @@ def _format_multi_select_property(value, prop_data):
     return None
 
 
+def split_multi_select_value(value):
+    """Retourne la liste des noms d'options d'une valeur multi_select (liste ou 'a, b')"""
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(',')]
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
 def _format_date_property(value):
     """Formate une propriété de type date"""
     try:
@@ -102,3 +119,23 @@ def _format_date_property(value):
     except (ValueError, TypeError):
         return None
 
+
+_SIMPLE_FORMATTERS = {
+    'rich_text': _format_text_property,
+    'title': _format_text_property,
+    'number': _format_number_property,
+    'checkbox': lambda value: {"checkbox": bool(value)},
+    'date': _format_date_property,
+    'url': lambda value: {"url": str(value)},
+    'email': lambda value: {"email": str(value)},
+    'phone_number': lambda value: {"phone_number": str(value)},
+    'people': lambda value: {"people": [{"id": str(value)}]},
+    'files': lambda value: None,  # Format complexe, non supporté pour l'instant
+    'relation': lambda value: {"relation": [{"id": str(value)}]},
+}
+
+# Formateurs (value, option_names) des propriétés à options
+_OPTION_FORMATTERS = {
+    'select': _format_select_property,
+    'multi_select': _format_multi_select_property,
+}
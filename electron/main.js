@@ -61,7 +61,8 @@ function startBackend() {
       console.log('Backend executable:', backendPath);
       console.log('User data path:', userDataPath);
       
-      backendProcess = spawn(backendPath, [], {
+      // The executable runs the production WSGI server (backend/serve.py)
+      backendProcess = spawn(backendPath, ['--port', String(BACKEND_PORT)], {
         env: {
           ...process.env,
           DB_PATH: path.join(userDataPath, 'notion_config.db')
@@ -2,7 +2,7 @@
  * Tests pour le composant ChatPage
  */
 import React from 'react';
-import { render, screen } from '@testing-library/react';
+import { render, screen, fireEvent, waitFor } from '@testing-library/react';
 import ChatPage from '../../components/ChatPage';
 import { ToastProvider } from '../../contexts/ToastContext';
 import '../../i18n/config';
@@ -34,11 +34,14 @@ jest.mock('../../hooks/useDynamicFields', () => ({
   })
 }));
 
+const mockSubmitChat = jest.fn(() => Promise.resolve({ success: true, message: 'Success' }));
+
 jest.mock('../../hooks/useChatSubmission', () => ({
   useChatSubmission: () => ({
     loading: false,
     progress: 0,
-    submitChat: jest.fn(() => Promise.resolve({ success: true, message: 'Success' })),
+    cancelSubmission: jest.fn(),
+    submitChat: mockSubmitChat,
     resetProgress: jest.fn()
   })
 }));
@@ -65,5 +68,14 @@ describe('ChatPage', () => {
     
     expect(screen.getByText(/Veuillez d'abord configurer/)).toBeInTheDocument();
   });
-});
 
+  it('should send deferred when background sending is checked', async () => {
+    const { container } = renderWithProvider(<ChatPage isConfigured={true} />);
+
+    fireEvent.click(screen.getByLabelText('Envoyer en arrière-plan'));
+    fireEvent.submit(container.querySelector('form'));
+
+    await waitFor(() => expect(mockSubmitChat).toHaveBeenCalled());
+    expect(mockSubmitChat.mock.calls[0][5]).toEqual({ deferred: true });
+  });
+});
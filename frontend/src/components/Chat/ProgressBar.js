@@ -3,7 +3,7 @@
  */
 import React from 'react';
 
-function ProgressBar({ progress, loading }) {
+function ProgressBar({ progress, loading, onCancel, cancelLabel }) {
   if (!loading) return null;
 
   const getProgressText = () => {
@@ -31,6 +31,15 @@ function ProgressBar({ progress, loading }) {
       </div>
       <div style={{ color: 'rgba(255, 255, 255, 0.7)', fontSize: '0.875rem', marginTop: '5px', textAlign: 'center' }}>
         {getProgressText()}
+        {onCancel && (
+          <button
+            type="button"
+            onClick={onCancel}
+            style={{ marginLeft: '10px', background: 'none', border: 'none', color: '#C4B5FD', cursor: 'pointer', textDecoration: 'underline' }}
+          >
+            {cancelLabel}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -1,7 +1,7 @@
 /**
  * Page principale pour envoyer des chats vers Notion
  */
-import React from 'react';
+import React, { useState } from 'react';
 import { useTranslation } from 'react-i18next';
 import { LightBulbIcon, PaperAirplaneIcon, ArrowPathIcon } from '@heroicons/react/24/outline';
 import { useToast } from '../contexts/ToastContext';
@@ -16,6 +16,7 @@ import LoadingSpinner from './LoadingSpinner';
 function ChatPage({ isConfigured }) {
   const { t } = useTranslation();
   const { success, error } = useToast();
+  const [deferred, setDeferred] = useState(false);
   
   const {
     content,
@@ -47,6 +48,7 @@ function ChatPage({ isConfigured }) {
     loading,
     progress,
     submitChat,
+    cancelSubmission,
     resetProgress
   } = useChatSubmission();
 
@@ -64,7 +66,7 @@ function ChatPage({ isConfigured }) {
       return;
     }
 
-    const result = await submitChat(content, date, propertyValues, dynamicFields, availableProperties);
+    const result = await submitChat(content, date, propertyValues, dynamicFields, availableProperties, { deferred });
 
     if (result.success) {
       success(result.message);
@@ -158,7 +160,28 @@ function ChatPage({ isConfigured }) {
           disabled={loading}
         />
 
-        <ProgressBar progress={progress} loading={loading} />
+        <div className="form-group">
+          <label style={{ display: 'flex', alignItems: 'center', gap: '8px', color: '#ffffff', cursor: 'pointer' }}>
+            <input
+              type="checkbox"
+              checked={deferred}
+              onChange={(e) => setDeferred(e.target.checked)}
+              disabled={loading}
+              style={{ width: '20px', height: '20px', cursor: 'pointer' }}
+            />
+            {t('chat.form.deferredLabel')}
+          </label>
+          <small style={{ display: 'block', marginTop: '6px', fontSize: '0.875rem', color: 'rgba(255, 255, 255, 0.8)' }}>
+            {t('chat.form.deferredHelp')}
+          </small>
+        </div>
+
+        <ProgressBar
+          progress={progress}
+          loading={loading}
+          onCancel={cancelSubmission}
+          cancelLabel={t('chat.form.cancel')}
+        />
 
         <button
           type="submit"
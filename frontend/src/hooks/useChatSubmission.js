@@ -1,17 +1,77 @@
 /**
  * Hook pour gérer la soumission du formulaire de chat
  */
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import axios from 'axios';
 import i18n from '../i18n/config';
 import { translateBackendError } from '../utils/errorTranslator';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
+function backendError(data) {
+  const error = new Error(data.error);
+  error.response = { data };
+  return error;
+}
+
+/**
+ * Envoie le chat en mode stream : le backend renvoie un événement NDJSON par étape
+ * (parsed, page_created, batch k/n, done). Retourne les données de l'événement "done" ;
+ * un flux terminé sans cet événement est une erreur.
+ */
+async function postChatWithProgress(payload, signal, onEvent) {
+  const response = await fetch(`${API_BASE_URL}/api/chat`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ...payload, stream: true }),
+    signal
+  });
+
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}));
+    throw backendError(data);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let done = null;
+
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    const event = JSON.parse(line);
+    if (event.event === 'error') {
+      throw backendError({ error: event.error });
+    }
+    if (event.event === 'done') {
+      done = event;
+    }
+    onEvent(event);
+  };
+
+  while (true) {
+    const { value, done: finished } = await reader.read();
+    if (finished) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffer);
+
+  // Flux terminé sans "done" (serveur arrêté, connexion coupée) : l'envoi n'a pas abouti
+  if (!done) {
+    throw backendError({ error: i18n.t('chat.streamInterrupted') });
+  }
+  return done;
+}
+
 export function useChatSubmission() {
   const [loading, setLoading] = useState(false);
   const [progress, setProgress] = useState(0);
   const [missingProperties, setMissingProperties] = useState([]);
+  const abortControllerRef = useRef(null);
+  const jobIdRef = useRef(null);
 
   const validateDynamicFields = async (dynamicFields) => {
     if (dynamicFields.length === 0) return { valid: true, missing: [] };
@@ -45,7 +105,7 @@ export function useChatSubmission() {
     }
   };
 
-  const submitChat = async (content, date, propertyValues, dynamicFields, availableProperties = []) => {
+  const submitChat = async (content, date, propertyValues, dynamicFields, availableProperties = [], { deferred = false } = {}) => {
     setLoading(true);
     setProgress(10);
 
@@ -128,43 +188,88 @@ export function useChatSubmission() {
 
       setProgress(60);
 
-      const response = await axios.post(`${API_BASE_URL}/api/chat`, {
+      if (deferred) {
+        // Envoi différé : le backend écrit le chat dans son outbox et répond 202 sans attendre Notion
+        const response = await axios.post(`${API_BASE_URL}/api/chat`, {
+          content,
+          date,
+          additionalProperties: filledProperties,
+          deferred: true
+        });
+        setProgress(100);
+        return {
+          success: true,
+          message: i18n.t('chat.deferredAccepted', { id: response.data.outboxId }),
+          missingProperties: []
+        };
+      }
+
+      const controller = new AbortController();
+      abortControllerRef.current = controller;
+
+      const data = await postChatWithProgress({
         content,
         date,
         additionalProperties: filledProperties,
+      }, controller.signal, (event) => {
+        if (event.event === 'started') {
+          jobIdRef.current = event.jobId;
+        } else if (event.event === 'cancelled') {
+          throw backendError({ error: event.error });
+        } else if (event.event === 'parsed') {
+          setProgress(65);
+        } else if (event.event === 'batch') {
+          setProgress(65 + Math.round((30 * event.batch) / event.batches));
+        }
       });
 
-      setProgress(90);
-
       // Vérifier s'il y a des propriétés manquantes dans la réponse
-      if (response.data.missingProperties && response.data.missingProperties.length > 0) {
-        setMissingProperties(response.data.missingProperties);
+      if (data.missingProperties && data.missingProperties.length > 0) {
+        setMissingProperties(data.missingProperties);
         setProgress(100);
         return {
           success: false,
-          error: i18n.t('chat.missingProperties') + ' ' + response.data.missingProperties.join(', '),
-          missingProperties: response.data.missingProperties
+          error: i18n.t('chat.missingProperties') + ' ' + data.missingProperties.join(', '),
+          missingProperties: data.missingProperties
         };
       }
 
       setProgress(100);
       return {
         success: true,
-        message: response.data.message,
+        message: data.message,
         missingProperties: []
       };
     } catch (err) {
       setProgress(0);
+      if (err.name === 'AbortError') {
+        return {
+          success: false,
+          error: i18n.t('chat.cancelled')
+        };
+      }
       const errorMessage = err.response?.data?.error;
       return {
         success: false,
         error: translateBackendError(errorMessage)
       };
     } finally {
+      abortControllerRef.current = null;
+      jobIdRef.current = null;
       setLoading(false);
     }
   };
 
+  const cancelSubmission = () => {
+    // Annuler côté serveur (libère le quota Notion) puis fermer la connexion
+    if (jobIdRef.current) {
+      axios.post(`${API_BASE_URL}/api/chat/jobs/${jobIdRef.current}/cancel`).catch(() => {});
+    }
+    if (abortControllerRef.current) {
+      abortControllerRef.current.abort();
+    }
+  };
+
   const resetProgress = () => {
     setProgress(0);
   };
@@ -175,6 +280,7 @@ export function useChatSubmission() {
     missingProperties,
     setMissingProperties,
     submitChat,
+    cancelSubmission,
     resetProgress
   };
 }